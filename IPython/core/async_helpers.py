@@ -160,3 +160,29 @@ def _should_be_async(cell: str) -> bool:
         return inspect.CO_COROUTINE & code.co_flags == inspect.CO_COROUTINE
     except (SyntaxError, ValueError, MemoryError):
         return False
+
+
+_AWAIT_NODES = (ast.Await, ast.AsyncFor, ast.AsyncWith)
+_SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+
+
+def _may_await(node: ast.AST) -> bool:
+    """Whether a top-level statement may use top-level await.
+
+    This errs on the side of caution: it is True when ``await``, ``async
+    for``, ``async with`` or an asynchronous comprehension appear anywhere
+    outside of a function.
+    """
+    todo = [node]
+    while todo:
+        node = todo.pop()
+        if isinstance(node, _AWAIT_NODES):
+            return True
+        if isinstance(node, ast.comprehension) and node.is_async:
+            return True
+        todo.extend(
+            child
+            for child in ast.iter_child_nodes(node)
+            if not isinstance(child, _SCOPE_NODES)
+        )
+    return False
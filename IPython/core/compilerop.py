@@ -37,8 +37,12 @@
 import functools
 import linecache
 import operator
+import weakref
+from collections import OrderedDict
 from contextlib import contextmanager
-from collections.abc import Generator
+from collections.abc import Callable, Generator
+from types import CodeType
+from typing import Any
 
 #-----------------------------------------------------------------------------
 # Constants
@@ -66,10 +70,88 @@ def code_name(code: str, number: int = 0) -> str:
     # even with truncated hashes, and the full one makes tracebacks too long
     return f'<ipython-input-{number}-{hash_digest[:12]}>'
 
+def code_with_filename(code: CodeType, filename: str) -> CodeType:
+    """Return code, and the code objects nested in it, with another filename."""
+    if code.co_filename == filename:
+        return code
+    consts = tuple(
+        code_with_filename(const, filename) if isinstance(const, CodeType) else const
+        for const in code.co_consts
+    )
+    return code.replace(co_filename=filename, co_consts=consts)
+
+def _iter_code(code: CodeType) -> Generator[CodeType, None, None]:
+    """Yield code and the code objects nested in it."""
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            yield from _iter_code(const)
+
+# Evicted linecache entries which can be loaded back, by name: a reference to
+# the compiler which evicted them, and their execution count. Only the last
+# _EVICTED_MAX ones are kept.
+_evicted: OrderedDict[str, tuple[weakref.ref, int]] = OrderedDict()
+_EVICTED_MAX = 10000
+_linecache_getlines = linecache.getlines
+
+def _getlines(filename: str, module_globals: Any = None) -> list[str]:
+    """linecache.getlines, loading back the cells evicted by CachingCompiler."""
+    if filename in _evicted and filename not in linecache.cache:
+        ref, number = _evicted.pop(filename)
+        compiler = ref()
+        if compiler is not None:
+            compiler._restore(filename, number)
+    return _linecache_getlines(filename, module_globals)
+
 #-----------------------------------------------------------------------------
 # Classes and functions
 #-----------------------------------------------------------------------------
 
+class CellCache:
+    """A least recently used cache of the work done to run cells.
+
+    Entries are keyed on the cell and on everything the cached result depends
+    on. As the key can hold object identities (e.g. of the transformers
+    applied), each entry also holds the objects themselves, so that they are
+    not reused while the entry exists, and :meth:`get` checks that they are
+    the same.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Any, tuple[tuple, Any]] = OrderedDict()
+
+    def get(self, key: Any, objects: tuple = ()) -> Any | None:
+        """The value cached for key and objects, or None."""
+        entry = self._entries.get(key)
+        if (
+            entry is not None
+            and len(entry[0]) == len(objects)
+            and all(a is b for a, b in zip(entry[0], objects))
+        ):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key: Any, value: Any, objects: tuple = ()) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (objects, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class CachingCompiler(codeop.Compile):
     """A compiler that caches code compiled from interactive statements.
     """
@@ -82,6 +164,35 @@ def __init__(self):
         # argument used for the builtins.compile function.
         self._filename_map = {}
 
+        # The code objects compiled for recent cells, see
+        # InteractiveShell.run_cell_async
+        self.cell_cache = CellCache()
+
+        # When positive, the linecache entries of the cells run before the
+        # last `linecache_max_cells` ones are evicted, unless a live code
+        # object (e.g. of a function, or in a traceback) still comes from the
+        # cell. Evicted entries are loaded back with `source_loader`, called
+        # with the execution count, when linecache is asked for them.
+        self.linecache_max_cells = 0
+        self.source_loader: Callable[[int], str | None] | None = None
+        # name -> weak references to the code objects compiled for it, for
+        # the entries we put in linecache, oldest first
+        self._cached_names: OrderedDict[str, list[weakref.ref]] = OrderedDict()
+        self._evict_at = 0
+
+    def __call__(self, source, filename, symbol, **kwargs):
+        code = super().__call__(source, filename, symbol, **kwargs)
+        self.track_code(code)
+        return code
+
+    def track_code(self, code: CodeType) -> None:
+        """Keep the linecache entry of the cell code was compiled from
+        while code, or a code object nested in it, is alive.
+        """
+        refs = self._cached_names.get(code.co_filename)
+        if refs is not None:
+            refs.extend(weakref.ref(c) for c in _iter_code(code))
+
     def ast_parse(self, source: str, filename: str = '<unknown>', symbol: str = 'exec') -> ast.AST:
         """Parse code to an AST with the current compiler flags active.
 
@@ -179,8 +290,61 @@ def cache(self, transformed_code: str, number: int = 0, raw_code: str | None = N
             name,
         )
         linecache.cache[name] = entry
+        _evicted.pop(name, None)
+        self._cached_names.setdefault(name, [])
+        self._cached_names.move_to_end(name)
+        n_cached = len(self._cached_names)
+        if self.linecache_max_cells > 0 and n_cached > max(
+            self.linecache_max_cells, self._evict_at
+        ):
+            self.evict_linecache()
         return name
 
+    def evict_linecache(self) -> list[str]:
+        """Remove old entries from linecache, see `linecache_max_cells`.
+
+        Returns the names of the evicted entries.
+        """
+        n_old = len(self._cached_names) - max(self.linecache_max_cells, 0)
+        evicted = []
+        for name in list(self._cached_names)[:n_old]:
+            if any(ref() is not None for ref in self._cached_names[name]):
+                continue
+            del self._cached_names[name]
+            linecache.cache.pop(name, None)
+            if self.source_loader is not None and name in self._filename_map:
+                if linecache.getlines is _linecache_getlines:
+                    linecache.getlines = _getlines
+                _evicted[name] = (weakref.ref(self), self._filename_map[name])
+                while len(_evicted) > _EVICTED_MAX:
+                    _evicted.popitem(last=False)
+            evicted.append(name)
+        # The entries still in use are checked again once as many new cells
+        # have run as there are such entries (or a quarter of the limit), so
+        # that checking them costs no more than a few checks per cell.
+        n_kept = len(self._cached_names) - max(self.linecache_max_cells, 0)
+        self._evict_at = len(self._cached_names) + max(
+            self.linecache_max_cells // 4, n_kept, 1
+        )
+        return evicted
+
+    def _restore(self, name: str, number: int) -> None:
+        """Put the evicted linecache entry for cell `number` back."""
+        if self.source_loader is None:
+            return
+        try:
+            source = self.source_loader(number)
+        except Exception:
+            return
+        if source is None:
+            return
+        # The source must be the one the cell was compiled from. The history
+        # strips the final newline of cells.
+        for candidate in (source, source + "\n"):
+            if self.get_code_name(candidate, candidate, number) == name:
+                self.cache(candidate, number)
+                return
+
     @contextmanager
     def extra_flags(self, flags: int) -> Generator[None, None, None]:
         ## bits that we'll set to 1
@@ -187,14 +187,16 @@
 import keyword
 import ast
 import os
+import queue
 import re
 import string
 import sys
+import threading
 import tokenize
 import time
 import warnings
 from ast import literal_eval
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from contextlib import contextmanager
 from dataclasses import dataclass
 from functools import cached_property, lru_cache, partial
@@ -206,7 +208,8 @@
     TypeVar,
     Literal,
 )
-from collections.abc import Iterable, Iterator, Sequence, Sized
+from collections.abc import Callable, Iterable, Iterator, Sequence, Sized
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 
 from IPython.core.error import TryNext, UsageError
 from IPython.core.inputtransformer2 import (
@@ -224,6 +227,7 @@
 from traitlets import (
     Bool,
     Enum,
+    Float,
     Int,
     List as ListTrait,
     Unicode,
@@ -729,6 +733,21 @@ def _is_sizable(value: Any) -> TypeGuard[Sized]:
     return hasattr(value, "__len__")
 
 
+def _safe_len(value: Any) -> int | None:
+    try:
+        return len(value)
+    except Exception:
+        return None
+
+
+def _last_key(mapping: Any) -> Any:
+    try:
+        return next(reversed(mapping), None)
+    except TypeError:
+        # not reversible
+        return None
+
+
 def _is_iterator(value: Any) -> TypeGuard[Iterator]:
     """Determines whether objects is sizable"""
     return hasattr(value, "__next__")
@@ -760,6 +779,7 @@ def completion_matcher(
     priority: float | None = None,
     identifier: str | None = None,
     api_version: int = 1,
+    parallel: bool = True,
 ) -> Callable[[Matcher], Matcher]:
     """Adds attributes describing the matcher.
 
@@ -779,12 +799,17 @@ def completion_matcher(
         version of the Matcher API used by this matcher.
         Currently supported values are 1 and 2.
         Defaults to 1.
+    parallel: Optional[bool]
+        Whether the matcher can run on another thread, concurrently with
+        other matchers, when ``IPCompleter.parallel_matchers`` is enabled.
+        Only matchers using API version 2 can. Defaults to True.
     """
 
     def wrapper(func: Matcher):
         func.matcher_priority = priority or 0  # type: ignore
         func.matcher_identifier = identifier or func.__qualname__  # type: ignore
         func.matcher_api_version = api_version  # type: ignore
+        func.matcher_parallel = parallel  # type: ignore
         if TYPE_CHECKING:
             if api_version == 1:
                 func = cast(MatcherAPIv1, func)
@@ -807,6 +832,80 @@ def _get_matcher_api_version(matcher):
     return getattr(matcher, "matcher_api_version", 1)
 
 
+def _is_matcher_parallel(matcher: Matcher) -> bool:
+    return _is_matcher_v2(matcher) and getattr(matcher, "matcher_parallel", True)
+
+
+class _MatcherPool:
+    """A minimal thread pool to run matchers.
+
+    Unlike ``concurrent.futures.ThreadPoolExecutor``, whose workers are joined
+    when the interpreter exits, the workers are daemon threads: a matcher
+    stuck on e.g. a network file system must not prevent IPython from
+    exiting.
+
+    The workers running a task past its deadline (as a ``time.monotonic()``
+    value) do not count towards ``max_workers``, so that stuck matchers do not
+    hold up the others.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._tasks: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        # the workers not running a task, and the tasks no worker took yet
+        self._idle = 0
+        self._queued = 0
+        self._workers: list[threading.Thread] = []
+        # the deadlines of the tasks being run, by worker
+        self._deadlines: dict[threading.Thread, float | None] = {}
+
+    def _stuck(self) -> int:
+        now = time.monotonic()
+        return sum(
+            1
+            for deadline in self._deadlines.values()
+            if deadline is not None and deadline < now
+        )
+
+    def submit(
+        self, fn: Callable[..., Any], *args: Any, deadline: float | None = None
+    ) -> Future:
+        future: Future = Future()
+        with self._lock:
+            self._tasks.put((future, fn, args, deadline))
+            self._queued += 1
+            if (
+                self._queued > self._idle
+                and len(self._workers) - self._stuck() < self.max_workers
+            ):
+                worker = threading.Thread(
+                    target=self._work, name="IPythonCompleterWorker", daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+                self._idle += 1
+        return future
+
+    def _work(self) -> None:
+        worker = threading.current_thread()
+        while True:
+            future, fn, args, deadline = self._tasks.get()
+            with self._lock:
+                self._idle -= 1
+                self._queued -= 1
+                self._deadlines[worker] = deadline
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+            del future, fn, args
+            with self._lock:
+                del self._deadlines[worker]
+                self._idle += 1
+
+
 context_matcher = partial(completion_matcher, api_version=2)
 
 
@@ -973,6 +1072,50 @@ def split_line(self, line, cursor_pos=None):
         return self._delim_re.split(cut_line)[-1]
 
 
+class _CompletionCache:
+    """LRU cache of completion candidates.
+
+    Each entry holds the candidates computed for a prefix of the token being
+    completed. They are a superset of the candidates for any longer prefix, so
+    an entry is a hit for any token starting with its prefix, and the caller
+    narrows the candidates down. Entries are keyed on what else the
+    candidates depend on, e.g. the namespace generation. It can be used by
+    matchers running concurrently (see ``IPCompleter.parallel_matchers``).
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Any, tuple[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, prefix: str) -> Any | None:
+        """The candidates for a prefix of ``prefix``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and prefix.startswith(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key: Any, prefix: str, candidates: Any) -> None:
+        with self._lock:
+            self._entries[key] = (prefix, candidates)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class Completer(Configurable):
 
     greedy = Bool(
@@ -1067,6 +1210,24 @@ class Completer(Configurable):
         """,
     ).tag(config=True)
 
+    completion_cache_size = Int(
+        256,
+        help="""Number of sets of candidates kept by the completion cache.
+
+        The names in the namespaces, the attributes of objects and the keys of
+        dictionaries are cached until the namespace changes (code is run, or
+        variables are pushed or deleted), so that completing a longer prefix
+        filters the cached candidates instead of computing them again. Set to
+        0 to disable the cache.
+        """,
+    ).tag(config=True)
+
+    @observe("completion_cache_size")
+    def _completion_cache_size_changed(self, change):
+        self._completion_cache.maxsize = change["new"]
+        if change["new"] <= 0:
+            self._completion_cache.clear()
+
     @observe("evaluation")
     def _evaluation_changed(self, _change):
         from IPython.core.guarded_eval import _validate_policy_overrides
@@ -1128,6 +1289,7 @@ def __init__(self, namespace=None, global_namespace=None, **kwargs):
             self.global_namespace = global_namespace
 
         self.custom_matchers = []
+        self._completion_cache = _CompletionCache(256)
 
         super().__init__(**kwargs)
 
@@ -1151,6 +1313,87 @@ def complete(self, text, state):
         except IndexError:
             return None
 
+    def _namespace_generation(self) -> tuple:
+        """Changes whenever the completion namespaces may have changed."""
+        shell = getattr(self, "shell", None)
+        # The namespaces can also be changed directly, e.g. by other threads.
+        # Their size and last inserted name tell whether names were added or
+        # removed since, at no cost.
+        return (
+            getattr(shell, "namespace_generation", None),
+            getattr(getattr(shell, "lazy_ns", None), "generation", None),
+            id(self.namespace),
+            len(self.namespace),
+            _last_key(self.namespace),
+            id(self.global_namespace),
+            len(self.global_namespace),
+            _last_key(self.global_namespace),
+        )
+
+    def _cached_candidates(
+        self,
+        key: Any,
+        prefix: str,
+        compute: Callable[[str], Any],
+        narrow: Callable[[Any, str], Any],
+    ) -> Any:
+        """Candidates for prefix, from the completion cache if possible.
+
+        ``compute(prefix)`` computes them, ``narrow(candidates, prefix)``
+        filters the candidates of a shorter prefix.
+        """
+        if self.completion_cache_size <= 0:
+            return compute(prefix)
+        key = (key, self._namespace_generation())
+        candidates = self._completion_cache.get(key, prefix)
+        if candidates is None:
+            candidates = compute(prefix)
+            self._completion_cache.put(key, prefix, candidates)
+            return candidates
+        return narrow(candidates, prefix)
+
+    def _global_candidates(self, text: str) -> tuple[list[str], list[tuple[str, str]]]:
+        """Names starting with text, and (abbreviation, name) pairs of the
+        snake_case names whose abbreviation starts with text."""
+        n = len(text)
+        lazy = self._lazy_globals
+        names = [
+            word
+            for lst in (
+                keyword.kwlist,
+                builtin_mod.__dict__.keys(),
+                list(self.namespace.keys()),
+                list(self.global_namespace.keys()),
+                lazy.names() if lazy else (),
+            )
+            for word in lst
+            if word[:n] == text and word != "__builtins__"
+        ]
+        abbreviations = []
+        for lst in [list(self.namespace.keys()), list(self.global_namespace.keys())]:
+            shortened = {
+                "_".join([sub[0] for sub in word.split("_")]): word
+                for word in lst
+                if _SNAKE_CASE_RE.match(word)
+            }
+            abbreviations.extend(
+                (short, word)
+                for short, word in shortened.items()
+                if short[:n] == text and short != "__builtins__"
+            )
+        return names, abbreviations
+
+    @staticmethod
+    def _narrow_global_candidates(
+        candidates: tuple[list[str], list[tuple[str, str]]], text: str
+    ) -> tuple[list[str], list[tuple[str, str]]]:
+        n = len(text)
+        names, abbreviations = candidates
+        return (
+            [word for word in names if word[:n] == text],
+            [pair for pair in abbreviations if pair[0][:n] == text],
+        )
+
     def global_matches(self, text: str, context: CompletionContext | None = None):
         """Compute matches when text is a simple name.
 
@@ -1160,16 +1403,13 @@ def global_matches(self, text: str, context: CompletionContext | None = None):
         """
         from IPython.core.guarded_eval import EvaluationContext, guarded_eval
 
-        matches = []
-        match_append = matches.append
+        names, abbreviations = self._cached_candidates(
+            "global", text, self._global_candidates, self._narrow_global_candidates
+        )
+        matches = list(names)
         n = len(text)
 
-        search_lists = [
-            keyword.kwlist,
-            builtin_mod.__dict__.keys(),
-            list(self.namespace.keys()),
-            list(self.global_namespace.keys()),
-        ]
+        search_lists = []
         if context and context.full_text.count("\n") > 1:
             # try to evaluate on full buffer
             previous_lines = "\n".join(
@@ -1184,6 +1424,7 @@ def global_matches(self, text: str, context: CompletionContext | None = None):
                     locals=self.namespace,
                     evaluation=self.evaluation,
                     auto_import=self._auto_import,
+                    lazy_globals=self._lazy_globals,
                     policy_overrides=self.policy_overrides,
                 )
                 try:
@@ -1200,18 +1441,9 @@ def global_matches(self, text: str, context: CompletionContext | None = None):
         for lst in search_lists:
             for word in lst:
                 if word[:n] == text and word != "__builtins__":
-                    match_append(word)
-
-        for lst in [list(self.namespace.keys()), list(self.global_namespace.keys())]:
-            shortened = {
-                "_".join([sub[0] for sub in word.split("_")]): word
-                for word in lst
-                if _SNAKE_CASE_RE.match(word)
-            }
-            for word in shortened.keys():
-                if word[:n] == text and word != "__builtins__":
-                    match_append(shortened[word])
+                    matches.append(word)
 
+        matches.extend(word for _, word in abbreviations)
         return matches
 
     def attr_matches(self, text):
@@ -1309,19 +1541,26 @@ def _attr_matches(
             if obj is not_found:
                 return [], ""
 
-        words = dir2(obj)
+        def object_attributes(attr: str) -> list[str]:
+            words = dir2(obj)
+            try:
+                words = generics.complete_object(obj, words)
+            except TryNext:
+                pass
+            except AssertionError:
+                raise
+            except Exception:
+                # Silence errors from completion function
+                pass
+            return narrow(words, attr)
 
-        try:
-            words = generics.complete_object(obj, words)
-        except TryNext:
-            pass
-        except AssertionError:
-            raise
-        except Exception:
-            # Silence errors from completion function
-            pass
-        # Build match list to return
-        n = len(attr)
+        def narrow(words: Sequence[str], attr: str) -> list[str]:
+            n = len(attr)
+            return [w for w in words if w[:n] == attr]
+
+        words = self._cached_candidates(
+            ("attr", expr, id(obj), type(obj)), attr, object_attributes, narrow
+        )
 
         # Note: ideally we would just return words here and the prefix
         # reconciliator would know that we intend to append to rather than
@@ -1354,7 +1593,7 @@ def _attr_matches(
             prefix_after_space = ""
 
         return (
-            ["{}.{}".format(prefix_after_space, w) for w in words if w[:n] == attr],
+            ["{}.{}".format(prefix_after_space, w) for w in words],
             "." + attr,
         )
 
@@ -1398,6 +1637,7 @@ def _evaluate_expr(self, expr):
                         locals=self.namespace,
                         evaluation=self.evaluation,
                         auto_import=self._auto_import,
+                        lazy_globals=self._lazy_globals,
                         policy_overrides=self.policy_overrides,
                     ),
                 )
@@ -1421,6 +1661,11 @@ def _evaluate_expr(self, expr):
             warnings.warn(f"Resolved to {obj}")
         return obj
 
+    @property
+    def _lazy_globals(self):
+        """The names of the user namespace bound on first use, if any"""
+        return getattr(getattr(self, "shell", None), "lazy_ns", None)
+
     @property
     def _auto_import(self):
         if self.auto_import_method is None:
@@ -2053,6 +2298,37 @@ def _greedy_changed(self, change):
         When 0: nothing will be excluded.
         """
     ).tag(config=True)
+    parallel_matchers = Bool(
+        False,
+        help="""Run the matchers concurrently, on a pool of threads.
+
+        Each matcher then has ``matcher_timeout`` seconds to return its
+        results, and a matcher which takes longer (e.g. a file matcher on a
+        slow network file system) is skipped, without holding up the others,
+        and is not run again until it returns.
+        Results are merged in the same order, and suppressed in the same way,
+        as when the matchers run one after the other.
+
+        Only matchers using API version 2 which do not opt out (see
+        :any:`completion_matcher`) run concurrently; Jedi always runs on the
+        main thread.
+        """,
+    ).tag(config=True)
+
+    matcher_timeout = Float(
+        0.5,
+        help="""Time, in seconds, each matcher has to return its results when
+        ``parallel_matchers`` is enabled. 0 means no limit.""",
+    ).tag(config=True)
+
+    matcher_timeouts = DictTrait(
+        value_trait=Float(),
+        key_trait=Unicode(),
+        help="""Overrides of ``matcher_timeout`` for some matchers, keyed by
+        matcher identifier (see :any:`completion_matcher`), e.g.
+        ``{'IPCompleter.file_matcher': 0.1}``.""",
+    ).tag(config=True)
+
     profile_completions = Bool(
         default_value=False,
         help="If True, emit profiling data for completion subsystem using cProfile."
@@ -2132,6 +2408,11 @@ def __init__(
         # This is set externally by InteractiveShell
         self.custom_completers = None
 
+        # Threads running the matchers, if parallel_matchers is enabled, and
+        # the last future of each matcher run on them
+        self._matcher_pool: _MatcherPool | None = None
+        self._matcher_futures: dict[str, Future] = {}
+
         # This is a list of names of unicode characters that can be completed
         # into their corresponding unicode value. The list is large, so we
         # lazily initialize it on first use. Consuming code should access this
@@ -2506,7 +2787,7 @@ def magic_color_matcher(self, context: CompletionContext) -> SimpleMatcherResult
             suppress=False,
         )
 
-    @context_matcher(identifier="IPCompleter.jedi_matcher")
+    @context_matcher(identifier="IPCompleter.jedi_matcher", parallel=False)
     def _jedi_matcher(self, context: CompletionContext) -> _JediMatcherResult:
         matches = self._jedi_matches(
             cursor_column=context.cursor_position,
@@ -3063,7 +3344,16 @@ def dict_key_matches(self, text: str) -> list[str]:
         if obj is not_found:
             return []
 
-        keys = self._get_keys(obj)
+        if type(obj) is dict:
+            # as fast as a cache lookup, and can't be stale
+            keys = self._get_keys(obj)
+        else:
+            keys = self._cached_candidates(
+                ("keys", expr, id(obj), type(obj), _safe_len(obj)),
+                "",
+                lambda _: self._get_keys(obj),
+                lambda keys, _: keys,
+            )
         if not keys:
             return keys
 
@@ -3373,6 +3663,11 @@ def completions(self, text: str, offset: int)->Iterator[Completion]:
                 output_path = os.path.join(self.profiler_output_dir, str(uuid.uuid4()))
                 print("Writing profiler output to", output_path)
                 profiler.dump_stats(output_path)
+                cache = self._completion_cache
+                print(
+                    "Completion cache: %d hits, %d misses, %d entries"
+                    % (cache.hits, cache.misses, len(cache))
+                )
 
     def _completions(self, full_text: str, offset: int, *, _timeout) -> Iterator[Completion]:
         """
@@ -3683,12 +3978,23 @@ def _complete(self, *, cursor_line, cursor_pos, line_buffer=None, text=None,
             )
         }
 
+        started: dict[str, tuple[Future, float | None] | None] = {}
+        if self.parallel_matchers:
+            started = self._start_matchers(matchers, context)
+
         for matcher_id, matcher in matchers.items():
             matcher_id = _get_matcher_id(matcher)
 
             if matcher_id in self.disable_matchers:
                 continue
 
+            run = started.get(matcher_id)
+            if matcher_id in started and run is None:
+                # still running for a previous completion
+                if self.debug:
+                    warnings.warn(f"Matcher {matcher_id} is still running.")
+                continue
+
             if matcher_id in results:
                 warnings.warn(f"Duplicate matcher ID: {matcher_id}.")
 
@@ -3697,7 +4003,21 @@ def _complete(self, *, cursor_line, cursor_pos, line_buffer=None, text=None,
 
             result: MatcherResult
             try:
-                if _is_matcher_v1(matcher):
+                if run is not None:
+                    future, deadline = run
+                    timeout = (
+                        None
+                        if deadline is None
+                        else max(0, deadline - time.monotonic())
+                    )
+                    try:
+                        result = future.result(timeout=timeout)
+                    except FutureTimeoutError:
+                        # leave it running, its result will be ignored
+                        if self.debug:
+                            warnings.warn(f"Matcher {matcher_id} timed out.")
+                        continue
+                elif _is_matcher_v1(matcher):
                     result = _convert_matcher_v1_result_to_v2_no_no(
                         matcher(text), type=_UNKNOWN_TYPE
                     )
@@ -3748,6 +4068,11 @@ def _complete(self, *, cursor_line, cursor_pos, line_buffer=None, text=None,
 
             results[matcher_id] = result
 
+        for run in started.values():
+            # those which are still waiting for a thread, e.g. suppressed ones
+            if run is not None:
+                run[0].cancel()
+
         _, matches = self._arrange_and_extract(
             results,
             # TODO Jedi completions non included in legacy stateful API; was this deliberate or omission?
@@ -3761,6 +4086,40 @@ def _complete(self, *, cursor_line, cursor_pos, line_buffer=None, text=None,
 
         return results
 
+    def _start_matchers(
+        self, matchers: dict[str, Matcher], context: CompletionContext
+    ) -> dict[str, tuple[Future, float | None] | None]:
+        """Start the matchers which can run concurrently on the matcher pool.
+
+        Returns their futures and deadlines (as ``time.monotonic()`` values),
+        by matcher identifier, or None for the matchers not started because
+        they are still running for a previous completion (e.g. hung on a
+        network file system), so that a stuck matcher never takes more than
+        one thread.
+        """
+        if self._matcher_pool is None:
+            self._matcher_pool = _MatcherPool(max_workers=len(matchers))
+        self._matcher_pool.max_workers = max(
+            self._matcher_pool.max_workers, len(matchers)
+        )
+        now = time.monotonic()
+        started: dict[str, tuple[Future, float | None] | None] = {}
+        for matcher_id, matcher in matchers.items():
+            if matcher_id in self.disable_matchers or not _is_matcher_parallel(
+                matcher
+            ):
+                continue
+            previous = self._matcher_futures.get(matcher_id)
+            if previous is not None and previous.running():
+                started[matcher_id] = None
+                continue
+            timeout = self.matcher_timeouts.get(matcher_id, self.matcher_timeout)
+            deadline = now + timeout if timeout > 0 else None
+            future = self._matcher_pool.submit(matcher, context, deadline=deadline)
+            self._matcher_futures[matcher_id] = future
+            started[matcher_id] = (future, deadline)
+        return started
+
     @staticmethod
     def _deduplicate(
         matches: Sequence[AnyCompletion],
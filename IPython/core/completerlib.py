@@ -18,14 +18,16 @@
 import glob
 import inspect
 import os
+import pkgutil
 import re
 import sys
+import threading
+import time
 from importlib import import_module
 from importlib.machinery import all_suffixes
 
 
 # Third-party imports
-from time import time
 from zipimport import zipimporter
 
 # Our own imports
@@ -41,11 +43,9 @@
 #-----------------------------------------------------------------------------
 _suffixes = all_suffixes()
 
-# Time in seconds after which the rootmodules will be stored permanently in the
-# ipython ip.db database (kept in the user's .ipython dir).
+# No longer used: the modules are indexed in the background, see ModuleIndex.
+# Kept for the code importing them.
 TIMEOUT_STORAGE = 2
-
-# Time in seconds after which we give up
 TIMEOUT_GIVEUP = 20
 
 # Regular expression for the python import statement
@@ -102,51 +102,248 @@ def module_list(path: str) -> list[str]:
     return list(set(modules))
 
 
+def _mtime(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _abspath(path: str) -> str:
+    # sys.path has the cwd as an empty string
+    return os.path.abspath(path or ".")
+
+
+class ModuleIndex:
+    """Index of the modules importable from the entries of ``sys.path``.
+
+    The index is built on a background thread, which the shell starts when
+    it starts, so that completing ``import <TAB>`` never has to walk the file
+    system: the index saved by the previous sessions is read right away, and
+    until an entry of ``sys.path`` has been indexed, the modules it holds are
+    simply not offered. It is refreshed again when used more than
+    ``refresh_interval`` seconds after the last refresh, or after ``sys.path``
+    changed.
+
+    Each entry records the modules found in a directory (or zip file) together
+    with its modification time, and only the entries whose modification time
+    changed are scanned again, so that newly installed packages show up
+    without a ``%rehashx``. The submodules of the packages found are indexed
+    too, for ``import package.<TAB>``.
+
+    The index is persisted in ``ip.db['module_index']``, mapping each path to
+    ``[mtime, "module names separated by spaces", {package: [mtime,
+    "submodule names"]}]``, so that it is readily available in the next
+    sessions.
+    """
+
+    db_key = "module_index"
+    refresh_interval = 10.0
+
+    def __init__(self, shell=None):
+        self.shell = shell
+        # absolute path -> (mtime, modules, {package: (mtime, submodules)})
+        self._entries: dict[
+            str, tuple[int | None, list[str], dict[str, tuple[int | None, list[str]]]]
+        ] = {}
+        self._loaded = shell is None
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        # when the last refresh started, and the sys.path it indexed
+        self._refreshed_at: float | None = None
+        self._refreshed_path: list[str] = []
+
+    def root_modules(self) -> list[str]:
+        """The modules importable from ``sys.path``, as indexed so far.
+
+        This also starts refreshing the index in the background, if it is
+        stale.
+        """
+        self.refresh()
+        modules = set(sys.builtin_module_names)
+        with self._lock:
+            for path in sys.path:
+                entry = self._entries.get(_abspath(path))
+                if entry is not None:
+                    modules.update(entry[1])
+        return list(modules)
+
+    def submodules(self, package: str) -> list[str] | None:
+        """The indexed submodules of a top-level package, if it was indexed.
+
+        This also starts refreshing the index in the background, if it is
+        stale.
+        """
+        self.refresh()
+        with self._lock:
+            for path in sys.path:
+                entry = self._entries.get(_abspath(path))
+                if entry is not None and package in entry[2]:
+                    return list(entry[2][package][1])
+        return None
+
+    def refresh(self, force: bool = False) -> threading.Thread | None:
+        """Start updating the index on a background thread.
+
+        Unless force is true, nothing is done if the index is still fresh.
+        Returns the thread updating the index (which may have been started by
+        a previous call), if any.
+
+        The index saved by the previous sessions is read first, right away.
+        """
+        if not self._loaded:
+            self._loaded = True
+            self._load()
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self._thread
+            if (
+                not force
+                and self._refreshed_at is not None
+                and time.monotonic() - self._refreshed_at < self.refresh_interval
+                and self._refreshed_path == sys.path
+            ):
+                return None
+            self._refreshed_at = time.monotonic()
+            self._refreshed_path = list(sys.path)
+            self._thread = threading.Thread(
+                target=self._refresh, name="IPythonModuleIndex", daemon=True
+            )
+            self._thread.start()
+            return self._thread
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait for the index to be up to date. Returns False on timeout."""
+        thread = self.refresh(force=True)
+        assert thread is not None
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def clear(self) -> None:
+        """Forget the whole index, including its persisted copy.
+
+        It is rebuilt the next time it is used.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._refreshed_at = None
+        db = self._db()
+        if db is not None:
+            db.pop(self.db_key, None)
+
+    def _db(self):
+        if self.shell is None:
+            return None
+        db = self.shell.db
+        if getattr(db, "_mock", False):
+            return None
+        return db
+
+    def _refresh(self) -> None:
+        changed = False
+        for path in {_abspath(p) for p in sys.path}:
+            with self._lock:
+                old = self._entries.get(path)
+            new = self._scan(path, old)
+            if new is not old:
+                changed = True
+                with self._lock:
+                    self._entries[path] = new
+        if changed:
+            self._save()
+
+    @staticmethod
+    def _scan(path, old):
+        """The entry for path, or old if it is still up to date."""
+        mtime = _mtime(path)
+        if old is not None and mtime == old[0]:
+            packages = dict(old[2])
+            for package, (pkg_mtime, _) in old[2].items():
+                pkg_path = os.path.join(path, package)
+                if _mtime(pkg_path) != pkg_mtime:
+                    packages[package] = ModuleIndex._scan_package(pkg_path)
+            if packages == old[2]:
+                return old
+            return (old[0], old[1], packages)
+        modules = [m for m in module_list(path) if m != "__init__"]
+        packages = {}
+        if os.path.isdir(path):
+            for name in modules:
+                pkg_path = os.path.join(path, name)
+                if os.path.isdir(pkg_path):
+                    packages[name] = ModuleIndex._scan_package(pkg_path)
+        return (mtime, modules, packages)
+
+    @staticmethod
+    def _scan_package(pkg_path):
+        return (
+            _mtime(pkg_path),
+            [name for _, name, _ in pkgutil.iter_modules([pkg_path])],
+        )
+
+    def _load(self) -> None:
+        db = self._db()
+        if db is None:
+            return
+        try:
+            stored = db.get(self.db_key, {})
+            entries = {
+                path: (
+                    mtime,
+                    modules.split(),
+                    {
+                        package: (pkg_mtime, submodules.split())
+                        for package, (pkg_mtime, submodules) in packages.items()
+                    },
+                )
+                for path, (mtime, modules, packages) in stored.items()
+            }
+        except Exception:
+            # unreadable or from an incompatible version: rebuild it
+            return
+        with self._lock:
+            for path, entry in entries.items():
+                self._entries.setdefault(path, entry)
+
+    def _save(self) -> None:
+        db = self._db()
+        if db is None:
+            return
+        with self._lock:
+            stored = {
+                path: [
+                    mtime,
+                    " ".join(modules),
+                    {
+                        package: [pkg_mtime, " ".join(submodules)]
+                        for package, (pkg_mtime, submodules) in packages.items()
+                    },
+                ]
+                for path, (mtime, modules, packages) in self._entries.items()
+            }
+        try:
+            db[self.db_key] = stored
+        except Exception:
+            # e.g. a read-only profile directory: the index will be rebuilt
+            pass
+
+
 def get_root_modules():
     """
     Returns a list containing the names of all the modules available in the
     folders of the pythonpath.
 
-    ip.db['rootmodules_cache'] maps sys.path entries to list of modules.
+    The modules are looked up in the shell's :class:`ModuleIndex`, which is
+    built in the background: the modules of the folders which have not been
+    indexed yet are missing.
     """
     ip = get_ipython()
-    if ip is None:
+    index = getattr(ip, "module_index", None)
+    if index is None:
         # No global shell instance to store cached list of modules.
         # Don't try to scan for modules every time.
         return list(sys.builtin_module_names)
-
-    if getattr(ip.db, "_mock", False):
-        rootmodules_cache = {}
-    else:
-        rootmodules_cache = ip.db.get("rootmodules_cache", {})
-    rootmodules = list(sys.builtin_module_names)
-    start_time = time()
-    store = False
-    for path in sys.path:
-        try:
-            modules = rootmodules_cache[path]
-        except KeyError:
-            modules = module_list(path)
-            try:
-                modules.remove('__init__')
-            except ValueError:
-                pass
-            if path not in ('', '.'): # cwd modules should not be cached
-                rootmodules_cache[path] = modules
-            if time() - start_time > TIMEOUT_STORAGE and not store:
-                store = True
-                print("\nCaching the list of root modules, please wait!")
-                print("(This will only be done once - type '%rehashx' to "
-                      "reset cache!)\n")
-                sys.stdout.flush()
-            if time() - start_time > TIMEOUT_GIVEUP:
-                print("This is taking too long, we give up.\n")
-                return []
-        rootmodules.extend(modules)
-    if store:
-        ip.db['rootmodules_cache'] = rootmodules_cache
-    rootmodules = list(set(rootmodules))
-    return rootmodules
+    return index.root_modules()
 
 
 def is_importable(module, attr: str, only_modules) -> bool:
@@ -196,10 +393,14 @@ def try_import(mod: str, only_modules=False) -> list[str]:
         completions.extend(m_all)
 
     if m_is_init:
-        file_ = m.__file__
-        file_path = os.path.dirname(file_)  # type: ignore
-        if file_path is not None:
-            completions.extend(module_list(file_path))
+        index = getattr(get_ipython(), "module_index", None)
+        submodules = index.submodules(mod) if index is not None else None
+        if submodules is None:
+            file_ = m.__file__
+            file_path = os.path.dirname(file_)  # type: ignore
+            if file_path is not None:
+                submodules = module_list(file_path)
+        completions.extend(submodules or [])
     completions_set = {c for c in completions if isinstance(c, str)}
     completions_set.discard('__init__')
     return list(completions_set)
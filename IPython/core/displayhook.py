@@ -10,11 +10,14 @@
 import sys
 import io as _io
 import tokenize
+from contextlib import nullcontext
 
 from traitlets.config.configurable import Configurable
-from traitlets import Instance, Float
+from traitlets import Bool, Instance, Integer, Float, observe
 from warnings import warn
 
+from .outputcache import OutputCache
+
 
 # TODO: Move the various attributes (cache_size, [others now moved]). Some
 # of these are also attributes of InteractiveShell. They should be on ONE object
@@ -33,6 +36,24 @@ class DisplayHook(Configurable):
                            allow_none=True)
     cull_fraction = Float(0.2)
 
+    cache_max_bytes = Integer(
+        0,
+        help="""Maximum memory, in bytes, used by the results held by the
+        output cache (``Out``, ``_oh`` and ``_N``). When it is exceeded, the
+        least recently used results are evicted. The memory use of results is
+        estimated, see :func:`IPython.core.outputcache.estimate_size`, only
+        when there is a limit. 0 means no limit, other than the number of
+        results (``cache_size``).
+        """,
+    ).tag(config=True)
+    cache_spill = Bool(
+        False,
+        help="""Pickle the results evicted from the output cache because of
+        ``cache_max_bytes`` to a temporary directory, so that ``Out[n]`` can
+        load them back, instead of dropping them.
+        """,
+    ).tag(config=True)
+
     def __init__(self, shell=None, cache_size=1000, **kwargs):
         super().__init__(shell=shell, **kwargs)
         self._is_active = False
@@ -58,6 +79,26 @@ def __init__(self, shell=None, cache_size=1000, **kwargs):
         # these are deliberately global:
         to_user_ns = {'_':self._,'__':self.__,'___':self.___}
         self.shell.user_ns.update(to_user_ns)
+        self._setup_output_cache()
+
+    @observe("cache_max_bytes", "cache_spill")
+    def _cache_limits_changed(self, change):
+        if self.shell is not None:
+            self._setup_output_cache()
+
+    def _setup_output_cache(self):
+        """Apply the memory limits to the output cache."""
+        oh = self.shell.user_ns.get('_oh')
+        if not isinstance(oh, OutputCache):
+            return
+        oh.max_bytes = self.cache_max_bytes
+        oh.spill = self.cache_spill
+        oh.on_evict = self._output_evicted
+        oh.cull()
+
+    def _output_evicted(self, n):
+        """Drop the other reference to an output evicted from the cache."""
+        self.shell.user_ns.pop('_%i' % n, None)
 
     @property
     def prompt_count(self):
@@ -273,15 +314,17 @@ def __call__(self, result=None):
         """
         self.check_for_underscore()
         if result is not None and not self.quiet():
-            self.start_displayhook()
-            self.write_output_prompt()
-            format_dict, md_dict = self.compute_format_data(result)
-            self.update_user_ns(result)
-            self.fill_exec_result(result)
-            if format_dict:
-                self.write_format_data(format_dict, md_dict)
-                self.log_output(format_dict)
-            self.finish_displayhook()
+            phase = getattr(self.shell, "_phase", None)
+            with phase("displayhook") if phase is not None else nullcontext():
+                self.start_displayhook()
+                self.write_output_prompt()
+                format_dict, md_dict = self.compute_format_data(result)
+                self.update_user_ns(result)
+                self.fill_exec_result(result)
+                if format_dict:
+                    self.write_format_data(format_dict, md_dict)
+                    self.log_output(format_dict)
+                self.finish_displayhook()
 
     def cull_cache(self):
         """Output cache is full, cull the oldest entries"""
@@ -295,7 +338,9 @@ def cull_cache(self):
             if i >= cull_count:
                 break
             self.shell.user_ns.pop('_%i' % n, None)
-            oh.pop(n, None)
+            # not pop: that would load the entries spilled to disk
+            if n in oh:
+                del oh[n]
 
     def flush(self):
         if not self.do_full_cache:
@@ -19,7 +19,7 @@
 import sys
 
 from traitlets.config.configurable import Configurable
-from traitlets import List
+from traitlets import List, Unicode
 
 # This used to be defined here - it is imported for backwards compatibility
 from .display_functions import publish_display_data
@@ -39,6 +39,18 @@ class DisplayPublisher(Configurable):
     be accessed there.
     """
 
+    mime_types = List(
+        Unicode(),
+        default_value=None,
+        allow_none=True,
+        help="""The MIME types the frontend displays, or None if it may display
+        any of them.
+
+        With ``DisplayFormatter.negotiate_mime_types``, only the
+        representations of objects in these formats are computed.
+        """,
+    ).tag(config=True)
+
     def __init__(self, shell=None, *args, **kwargs):
         self.shell = shell
         self._is_publishing = False
@@ -15,8 +15,12 @@
 
 from __future__ import annotations
 
+import inspect
+import time
+from collections import deque
 from typing import TYPE_CHECKING, Any, TypeVar
 from collections.abc import Callable, Iterable
+from warnings import warn
 
 if TYPE_CHECKING:
     from IPython.core.interactiveshell import (
@@ -26,12 +30,68 @@
     )
 
 
+class _CallbackList(list[Callable[..., Any]]):
+    """The callbacks of an event, which records whether they changed since
+    the :class:`EventManager` took a snapshot of them."""
+
+    __slots__ = ("changed",)
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.changed = True
+
+
+def _changes(name: str) -> Callable[..., Any]:
+    method = getattr(list, name)
+
+    def changes(self: _CallbackList, *args: Any) -> Any:
+        self.changed = True
+        return method(self, *args)
+
+    changes.__name__ = name
+    return changes
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(_CallbackList, _name, _changes(_name))
+del _name
+
+
 class EventManager:
     """Manage a collection of events and a sequence of callbacks for each.
 
     This is attached to :class:`~IPython.core.interactiveshell.InteractiveShell`
     instances as an ``events`` attribute.
 
+    Callbacks can be deferred (see :meth:`register`): instead of being called
+    when the event fires, they are queued and called by :meth:`run_deferred`,
+    which the shell calls once the output of the cell has been shown.
+
+    Attributes
+    ----------
+    time_callbacks : bool
+        Record how long each callback takes, in :attr:`callback_stats`.
+    slow_callback_threshold : float
+        When positive, the time (in seconds) above which a callback is
+        considered slow: it is then timed, and a warning is shown the first
+        time it exceeds it.
+    callback_stats : dict
+        ``(event, callback name) -> [calls, total time, max time]``, for the
+        timed callbacks.
+
     .. note::
 
        This API is experimental in IPython 2.0, and may be revised in future versions.
@@ -56,11 +116,28 @@ def __init__(
         """
         self.shell = shell
         self.callbacks: dict[str, list[Callable[..., Any]]] = {
-            n: [] for n in available_events
+            n: _CallbackList() for n in available_events
         }
         self.print_on_error = print_on_error
-
-    def register(self, event: str, function: Callable[..., Any]) -> None:
+        self.time_callbacks = False
+        self.slow_callback_threshold = 0.0
+        self.callback_stats: dict[tuple[str, str], list[float]] = {}
+        # The callbacks of each event called by trigger, and the deferred
+        # ones, rebuilt when they change rather than copied for each trigger,
+        # with the list of callbacks they were built from
+        self._snapshots: dict[
+            str,
+            tuple[_CallbackList, tuple[tuple[Callable[..., Any], ...], ...]],
+        ] = {}
+        self._deferred: set[tuple[str, Callable[..., Any]]] = set()
+        self._pending: deque[
+            tuple[str, Callable[..., Any], tuple[Any, ...], dict[str, Any]]
+        ] = deque()
+        self._warned: set[tuple[str, str]] = set()
+
+    def register(
+        self, event: str, function: Callable[..., Any], *, deferred: bool = False
+    ) -> None:
         """Register a new event callback.
 
         Parameters
@@ -70,6 +147,12 @@ def register(self, event: str, function: Callable[..., Any]) -> None:
         function : callable
             A function to be called on the given event. It should take the same
             parameters as the appropriate callback prototype.
+        deferred : bool
+            If True, the function is not called when the event fires, but
+            later, by :meth:`run_deferred`, once the output of the cell has been
+            shown, so that it does not delay it. Coroutine functions are
+            always deferred, and the coroutines they return are run on the
+            asyncio event loop.
 
         Raises
         ------
@@ -82,31 +165,150 @@ def register(self, event: str, function: Callable[..., Any]) -> None:
             raise TypeError('Need a callable, got %r' % function)
         if function not in self.callbacks[event]:
             self.callbacks[event].append(function)
+        if deferred or inspect.iscoroutinefunction(function):
+            self._deferred.add((event, function))
+        else:
+            self._deferred.discard((event, function))
+        self._snapshots.pop(event, None)
 
     def unregister(self, event: str, function: Callable[..., Any]) -> None:
         """Remove a callback from the given event."""
         if function in self.callbacks[event]:
+            self._deferred.discard((event, function))
+            self._snapshots.pop(event, None)
             return self.callbacks[event].remove(function)
 
         raise ValueError(f'Function {function!r} is not registered as a {event} callback')
 
+    def _snapshot(self, event: str) -> tuple[tuple[Callable[..., Any], ...], ...]:
+        """The (immediate, deferred) callbacks of event."""
+        callbacks = self.callbacks[event]
+        cached = self._snapshots.get(event)
+        # also catch callbacks added to, replaced in or removed from the list
+        # directly, or a list replacing it
+        if cached is not None and cached[0] is callbacks and not cached[0].changed:
+            return cached[1]
+        if not isinstance(callbacks, _CallbackList):
+            callbacks = self.callbacks[event] = _CallbackList(callbacks)
+        callbacks.changed = False
+        deferred = self._deferred
+        snapshot = (
+            tuple(f for f in callbacks if (event, f) not in deferred),
+            tuple(f for f in callbacks if (event, f) in deferred),
+        )
+        self._snapshots[event] = (callbacks, snapshot)
+        return snapshot
+
     def trigger(self, event: str, *args: Any, **kwargs: Any) -> None:
         """Call callbacks for ``event``.
 
         Any additional arguments are passed to all callbacks registered for this
         event. Exceptions raised by callbacks are caught, and a message printed.
+        Deferred callbacks are queued, to be called by :meth:`run_deferred`.
         """
-        for func in self.callbacks[event][:]:
-            try:
-                func(*args, **kwargs)
-            except (Exception, KeyboardInterrupt):
-                if self.print_on_error:
-                    print(
-                        "Error in callback {} (for {}), with arguments args {},kwargs {}:".format(
-                            func, event, args, kwargs
-                        )
-                    )
-                self.shell.showtraceback()
+        callbacks, deferred = self._snapshot(event)
+        timed = self.time_callbacks or self.slow_callback_threshold > 0
+        for func in callbacks:
+            self._call(event, func, args, kwargs, timed)
+        for func in deferred:
+            self._pending.append((event, func, args, kwargs))
+
+    @property
+    def pending(self) -> int:
+        """The number of deferred callback calls waiting to be run."""
+        return len(self._pending)
+
+    def run_deferred(self) -> None:
+        """Call the deferred callbacks of the events which fired so far."""
+        timed = self.time_callbacks or self.slow_callback_threshold > 0
+        while self._pending:
+            event, func, args, kwargs = self._pending.popleft()
+            self._call(event, func, args, kwargs, timed)
+
+    def _call(
+        self,
+        event: str,
+        func: Callable[..., Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        timed: bool,
+    ) -> None:
+        start = time.perf_counter() if timed else 0.0
+        try:
+            ret = func(*args, **kwargs)
+            if inspect.iscoroutine(ret):
+                self._run_coroutine(event, func, args, kwargs, ret)
+        except (Exception, KeyboardInterrupt):
+            self._report_error(event, func, args, kwargs)
+        if timed:
+            self._record_time(event, func, time.perf_counter() - start)
+
+    def _run_coroutine(
+        self,
+        event: str,
+        func: Callable[..., Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        coro: Any,
+    ) -> None:
+        import asyncio
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            from IPython.core.async_helpers import _asyncio_runner
+
+            _asyncio_runner(coro)
+            return
+
+        def done(task: asyncio.Task[Any]) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                try:
+                    raise task.exception()  # type: ignore[misc]
+                except BaseException:
+                    self._report_error(event, func, args, kwargs)
+
+        loop.create_task(coro).add_done_callback(done)
+
+    def _report_error(
+        self,
+        event: str,
+        func: Callable[..., Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> None:
+        if self.print_on_error:
+            print(
+                "Error in callback {} (for {}), with arguments args {},kwargs {}:".format(
+                    func, event, args, kwargs
+                )
+            )
+        self.shell.showtraceback()
+
+    def _record_time(self, event: str, func: Callable[..., Any], elapsed: float) -> None:
+        name = _callback_name(func)
+        stats = self.callback_stats.setdefault((event, name), [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+        threshold = self.slow_callback_threshold
+        if 0 < threshold < elapsed and (event, name) not in self._warned:
+            self._warned.add((event, name))
+            warn(
+                f"The {event} callback {name} took {elapsed * 1e3:.0f} ms. "
+                "Consider registering it with deferred=True, so that it does not "
+                "delay the output of cells.",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+
+
+def _callback_name(func: Callable[..., Any]) -> str:
+    module = getattr(func, "__module__", None)
+    name = getattr(func, "__qualname__", None)
+    if name is None:
+        return repr(func)
+    return f"{module}.{name}" if module else name
 
 # event_name -> prototype mapping
 available_events: dict[str, Callable[..., Any]] = {}
@@ -165,6 +367,19 @@ def post_run_cell(result: ExecutionResult) -> None:
     """
     pass
 
+@_define_event
+def phase_times(result: ExecutionResult) -> None:
+    """Fires after a cell ran, with ``InteractiveShell.record_phase_times``.
+
+    Parameters
+    ----------
+    result : :class:`~IPython.core.interactiveshell.ExecutionResult`
+        The result of the cell, with the times spent in each phase of running
+        it in ``result.phase_times``, and when they happened in
+        ``result.phase_timestamps``.
+    """
+    pass
+
 @_define_event
 def shell_initialized(ip: InteractiveShell) -> None:
     """Fires after initialisation of :class:`~IPython.core.interactiveshell.InteractiveShell`.
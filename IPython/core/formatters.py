@@ -66,7 +66,11 @@
 
 import abc
 import sys
+import threading
+import time
 import warnings
+import weakref
+from collections import OrderedDict
 from io import StringIO
 
 from functools import wraps
@@ -77,7 +81,7 @@
 from ..utils.dir2 import get_real_method
 from ..lib import pretty
 from traitlets import (
-    Bool, Dict, Integer, Unicode, CUnicode, ObjectName, List,
+    All, Bool, Dict, Float, Integer, Unicode, CUnicode, ObjectName, List,
     ForwardDeclaredInstance,
     default, observe,
 )
@@ -107,6 +111,57 @@ def _active_types_changed(self, change):
             else:
                 formatter.enabled = False
 
+    negotiate_mime_types = Bool(False,
+        help="""Only compute the MIME types the frontend displays.
+
+        When the display publisher of the shell declares the MIME types its
+        frontend displays (``DisplayPublisher.mime_types``), only the
+        formatters of these types run, and ``_repr_mimebundle_`` methods are
+        asked for these types only, unless ``include`` is given.
+        """,
+    ).tag(config=True)
+
+    cache_size = Integer(32,
+        help="""Number of objects whose format data is kept, so that displaying
+        them again does not compute it again.
+
+        Only the objects known to be unchanged are cached: strings, bytes,
+        tuples and frozensets of numbers and strings, and the objects with a
+        ``_repr_version_`` method, returning a hashable value which changes
+        whenever their representation does. Objects taking, or with format
+        data taking, more than about a megabyte are not cached. Set to 0 to
+        disable the cache.
+        """,
+    ).tag(config=True)
+
+    @observe('cache_size')
+    def _cache_size_changed(self, change):
+        while len(self._cache) > max(change['new'], 0):
+            self._cache.popitem(last=False)
+
+    max_size = Integer(100_000_000,
+        help="""Maximum size of the format data of an object, in characters (or
+        bytes), or 0 for no limit.
+
+        Larger text/plain data is truncated, and larger data in other formats
+        is left out of the display of the object, which is then displayed in
+        its other formats (e.g. text/plain).
+        """,
+    ).tag(config=True)
+
+    record_stats = Bool(False,
+        help="""Record how many times each formatter runs, and how long it
+        takes, by type of the formatted objects. See ``%formatterstats``.
+        """,
+    ).tag(config=True)
+
+    def __init__(self, **kwargs):
+        # (id, version, formatters state, max_size, include, exclude) ->
+        # (reference to the object, format_dict, md_dict)
+        self._cache = OrderedDict()
+        self.stats = FormatterStats()
+        super().__init__(**kwargs)
+
     ipython_display_formatter = ForwardDeclaredInstance("FormatterABC")  # type: ignore
 
     @default("ipython_display_formatter")
@@ -196,14 +251,53 @@ def format(self, obj, include=None, exclude=None):
             not be called.
 
         """
-        format_dict = {}
-        md_dict = {}
-
         if self.ipython_display_formatter(obj):
             # object handled itself, don't proceed
             return {}, {}
 
+        if include is None:
+            include = self._negotiated_types()
+        key = self._cache_key(obj, include, exclude) if self.cache_size > 0 else None
+        if key is not None:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0]() is obj:
+                self._cache.move_to_end(key)
+                return dict(cached[1]), dict(cached[2])
+
+        timeouts = self._timeouts()
+        format_dict, md_dict = self._format(obj, include, exclude)
+
+        # incomplete format data is computed again next time
+        if key is not None and self._timeouts() == timeouts:
+            try:
+                ref = weakref.ref(obj)
+                size = 0
+            except TypeError:
+                # immutable values, kept alive by the cache
+                def ref():
+                    return obj
+
+                size = _sizeof(obj)
+            size += sum(
+                len(data) for data in format_dict.values() if isinstance(data, (str, bytes))
+            )
+            # large objects and format data are not kept around
+            if size <= _CACHE_MAX_ENTRY_SIZE:
+                self._cache[key] = ref, dict(format_dict), dict(md_dict)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return format_dict, md_dict
+
+    def _format(self, obj, include, exclude):
+        """Compute the format data of obj, see `format`."""
+        record = self.record_stats
+        if record:
+            start = time.perf_counter()
         format_dict, md_dict = self.mimebundle_formatter(obj, include=include, exclude=exclude)
+        if record:
+            self.stats.add(
+                "mimebundle", obj, time.perf_counter() - start, bool(format_dict or md_dict)
+            )
 
         if format_dict or md_dict:
             if include:
@@ -232,7 +326,12 @@ def format(self, obj, include=None, exclude=None):
                 continue
 
             md = None
+            timed = record and getattr(formatter, "enabled", True)
+            if timed:
+                start = time.perf_counter()
             data = formatter(obj)
+            if timed:
+                self.stats.add(format_type, obj, time.perf_counter() - start, data is not None)
 
             # formatters can return raw data or (data, metadata)
             if isinstance(data, tuple) and len(data) == 2:
@@ -242,14 +341,158 @@ def format(self, obj, include=None, exclude=None):
                 format_dict[format_type] = data
             if md is not None:
                 md_dict[format_type] = md
+        if self.max_size > 0:
+            self._limit_size(obj, format_dict, md_dict)
         return format_dict, md_dict
 
+    def _limit_size(self, obj, format_dict, md_dict):
+        """Truncate the text/plain data, and leave out the data in other
+        formats, larger than `max_size`."""
+        for format_type, data in list(format_dict.items()):
+            if not isinstance(data, (str, bytes)) or len(data) <= self.max_size:
+                continue
+            if format_type == "text/plain" and isinstance(data, str):
+                format_dict[format_type] = data[: self.max_size] + "..."
+                action = "truncated"
+            else:
+                del format_dict[format_type]
+                md_dict.pop(format_type, None)
+                action = "left out"
+            warnings.warn(
+                "%s data of %d characters for a %s object %s (max_size is %d)"
+                % (format_type, len(data), _get_type(obj).__name__, action, self.max_size),
+                FormatterWarning,
+            )
+
+    def _timeouts(self):
+        return sum(
+            getattr(formatter, "timeouts", 0)
+            for formatter in [*self.formatters.values(), self.mimebundle_formatter]
+        )
+
+    def _negotiated_types(self):
+        """The MIME types the frontend displays, if negotiated, or None."""
+        if not self.negotiate_mime_types:
+            return None
+        mime_types = getattr(getattr(self.parent, "display_pub", None), "mime_types", None)
+        return list(mime_types) if mime_types is not None else None
+
+    def _cache_key(self, obj, include, exclude):
+        """The key of the format data of obj in the cache, or None if obj may
+        have changed since it was formatted."""
+        version = _repr_version(obj)
+        if version is None:
+            return None
+        # the formatters, their printers and configuration
+        state = tuple(
+            (format_type, id(formatter), getattr(formatter, "_generation", None))
+            for format_type, formatter in [
+                *self.formatters.items(),
+                (None, self.mimebundle_formatter),
+            ]
+        )
+        return (
+            id(obj),
+            version,
+            state,
+            self.max_size,
+            None if include is None else frozenset(include),
+            None if exclude is None else frozenset(exclude),
+        )
+
     @property
     def format_types(self):
         """Return the format types (MIME types) of the active formatters."""
         return list(self.formatters.keys())
 
 
+class FormatterStats:
+    """How many times the formatters ran, and how long they took, for each
+    MIME type and type of the formatted objects.
+
+    See ``DisplayFormatter.record_stats``. ``mimebundle`` stands for the
+    ``_repr_mimebundle_`` methods (or the printers registered for them).
+    """
+
+    def __init__(self):
+        # (MIME type, type name) -> [calls, results, total time, max time]
+        self.calls = {}
+
+    def add(self, format_type, obj, elapsed, has_data):
+        """Record that computing the format_type data of obj took elapsed
+        seconds, and returned data if has_data."""
+        cls = _get_type(obj)
+        module = getattr(cls, "__module__", None)
+        name = getattr(cls, "__qualname__", None) or getattr(cls, "__name__", "?")
+        type_name = name if module in (None, "builtins") else f"{module}.{name}"
+        try:
+            stats = self.calls[(format_type, type_name)]
+        except KeyError:
+            stats = self.calls[(format_type, type_name)] = [0, 0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += bool(has_data)
+        stats[2] += elapsed
+        stats[3] = max(stats[3], elapsed)
+
+    def clear(self):
+        self.calls.clear()
+
+    def report(self, limit=None):
+        """A table of the slowest formatters (``limit`` of them), with times in
+        milliseconds."""
+        rows = sorted(self.calls.items(), key=lambda item: item[1][2], reverse=True)
+        lines = [
+            f"{'MIME type':<24}{'type':<32}{'calls':>7}{'data':>7}"
+            f"{'total':>11}{'mean':>10}{'max':>10}"
+        ]
+        for (format_type, type_name), (calls, results, total, longest) in rows[:limit]:
+            lines.append(
+                f"{format_type:<24}{type_name:<32}{calls:>7}{results:>7}"
+                f"{total * 1e3:>11.2f}{total / calls * 1e3:>10.3f}{longest * 1e3:>10.3f}"
+            )
+        return "\n".join(lines)
+
+
+_IMMUTABLE_ITEM_TYPES = frozenset({str, bytes, int, float, complex, bool, type(None)})
+
+# Size above which the format data of an object (and the object itself, if the
+# cache keeps it alive) is not cached, see `DisplayFormatter.cache_size`.
+_CACHE_MAX_ENTRY_SIZE = 1_000_000
+
+
+def _sizeof(obj):
+    """The approximate size of obj, one of the immutable values whose format
+    data is cached, in bytes."""
+    size = sys.getsizeof(obj)
+    if type(obj) is tuple or type(obj) is frozenset:
+        size += sum(map(sys.getsizeof, obj))
+    return size
+
+
+def _repr_version(obj):
+    """The version of the representation of obj, or None if obj may have
+    changed without a change of version.
+
+    See `DisplayFormatter.cache_size`.
+    """
+    cls = type(obj)
+    if cls is str or cls is bytes:
+        return ()
+    if cls is tuple or cls is frozenset:
+        if all(type(item) in _IMMUTABLE_ITEM_TYPES for item in obj):
+            return ()
+        return None
+    method = get_real_method(obj, "_repr_version_")
+    if method is None:
+        return None
+    try:
+        version = method()
+        hash(version)
+    except Exception:
+        return None
+    return version
+
+
 #-----------------------------------------------------------------------------
 # Formatters for specific format types (text, html, svg, etc.)
 #-----------------------------------------------------------------------------
@@ -333,6 +576,12 @@ def _get_type(obj):
     return getattr(obj, '__class__', None) or type(obj)
 
 
+_no_printer = Sentinel(
+    "_no_printer",
+    __name__,
+    "No printer is registered for a type, see `BaseFormatter.lookup_by_type`.",
+)
+
 _raise_key_error = Sentinel(
     "_raise_key_error",
     __name__,
@@ -344,6 +593,70 @@ def _get_type(obj):
 )
 
 
+class _PrinterRegistry(dict):
+    """A registry of printers of a formatter, which changes the `_generation`
+    of the formatter whenever it changes, see `BaseFormatter.lookup_by_type`.
+    """
+
+    def __init__(self, formatter, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._formatter = weakref.ref(formatter)
+
+    def _changed(self):
+        formatter = self._formatter()
+        if formatter is not None:
+            formatter._generation += 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __ior__(self, other):
+        result = super().__ior__(other)
+        self._changed()
+        return result
+
+    def pop(self, *args):
+        try:
+            return super().pop(*args)
+        finally:
+            self._changed()
+
+    def popitem(self):
+        try:
+            return super().popitem()
+        finally:
+            self._changed()
+
+    def setdefault(self, key, default=None):
+        try:
+            return super().setdefault(key, default)
+        finally:
+            self._changed()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+
+class _Printers(Dict):
+    """A `Dict` trait holding a `_PrinterRegistry`."""
+
+    def validate(self, obj, value):
+        value = super().validate(obj, value)
+        if isinstance(value, _PrinterRegistry) and value._formatter() is obj:
+            return value
+        return _PrinterRegistry(obj, value)
+
+
 class BaseFormatter(Configurable):
     """A base formatter class that is configurable.
 
@@ -378,15 +691,44 @@ class BaseFormatter(Configurable):
 
     # The singleton printers.
     # Maps the IDs of the builtin singleton objects to the format functions.
-    singleton_printers = Dict().tag(config=True)
+    singleton_printers = _Printers().tag(config=True)
 
     # The type-specific printers.
     # Map type objects to the format functions.
-    type_printers = Dict().tag(config=True)
+    type_printers = _Printers().tag(config=True)
 
     # The deferred-import type-specific printers.
     # Map (modulename, classname) pairs to the format functions.
-    deferred_printers = Dict().tag(config=True)
+    deferred_printers = _Printers().tag(config=True)
+
+    # Changes whenever the printers change, or the configuration does, see
+    # DisplayFormatter.cache_size.
+    _generation = 0
+
+    # The classes (or _no_printer) whose printer lookup_by_type returns for
+    # each type, for the _generation of _lookup_state. Keyed on the types
+    # weakly, so that it does not keep dynamically created classes alive.
+    _lookup_cache: weakref.WeakKeyDictionary | None = None
+    _lookup_state = None
+    lookup_hits = 0
+    lookup_misses = 0
+    # how many times computing the format data took longer than timeout
+    timeouts = 0
+
+    timeout = Float(0,
+        help="""Time, in seconds, after which computing the format data of an
+        object is given up, or 0 for no limit.
+
+        With a limit, the printers and the print methods run in a separate
+        thread, and must be thread-safe. The thread is abandoned when it does
+        not finish in time, and the object is displayed in its other formats
+        (e.g. text/plain).
+        """,
+    ).tag(config=True)
+
+    @observe(All)
+    def _trait_changed(self, change):
+        self._generation += 1
 
     @catch_format_error
     def __call__(self, obj):
@@ -398,15 +740,50 @@ def __call__(self, obj):
             except KeyError:
                 pass
             else:
-                return printer(obj)
+                return self._run(obj, printer, obj)
             # Finally look for special method names
             method = get_real_method(obj, self.print_method)
             if method is not None:
-                return method()
+                return self._run(obj, method)
             return None
         else:
             return None
 
+    def _run(self, obj, func, *args, **kwargs):
+        """Call func, computing the format data of obj, within `timeout`.
+
+        Returns `_timed_out` (None) if func did not return in time.
+        """
+        if self.timeout <= 0:
+            return func(*args, **kwargs)
+        outcome = []
+
+        def run():
+            try:
+                outcome.append((True, func(*args, **kwargs)))
+            except BaseException as e:
+                outcome.append((False, e))
+
+        thread = threading.Thread(target=run, name=f"{self.format_type} formatter", daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        if not outcome:
+            self.timeouts += 1
+            warnings.warn(
+                "%s did not finish within %gs for a %s object"
+                % (type(self).__name__, self.timeout, _get_type(obj).__name__),
+                FormatterWarning,
+            )
+            return self._timed_out(obj)
+        ok, value = outcome[0]
+        if not ok:
+            raise value
+        return value
+
+    def _timed_out(self, obj):
+        """The format data of obj if computing it took too long."""
+        return None
+
     def __contains__(self, typ):
         """map in to lookup_by_type"""
         try:
@@ -481,13 +858,33 @@ def lookup_by_type(self, typ):
             else:
                 return self.deferred_printers[typ_key]
         else:
-            for cls in pretty._get_mro(typ):
-                if cls in self.type_printers or self._in_deferred_types(cls):
-                    return self.type_printers[cls]
+            if self._lookup_state != self._generation or self._lookup_cache is None:
+                self._lookup_cache = weakref.WeakKeyDictionary()
+                self._lookup_state = self._generation
+            try:
+                cls = self._lookup_cache[typ]
+            except KeyError:
+                self.lookup_misses += 1
+                cls = self._lookup_cache[typ] = self._resolve_type(typ)
+                # resolving may move deferred printers to the type registry
+                self._lookup_state = self._generation
+            else:
+                self.lookup_hits += 1
+            # looked up again, in case the printer was replaced
+            if cls is not _no_printer and cls in self.type_printers:
+                return self.type_printers[cls]
 
         # If we have reached here, the lookup failed.
         raise KeyError(f"No registered printer for {typ!r}")
 
+    def _resolve_type(self, typ):
+        """The class of the MRO of typ whose printer is registered, or
+        `_no_printer`."""
+        for cls in pretty._get_mro(typ):
+            if cls in self.type_printers or self._in_deferred_types(cls):
+                return cls
+        return _no_printer
+
     def for_type(self, typ, func=None):
         """Add a format function for a given type.
 
@@ -665,6 +1062,29 @@ def dtype_pprinter(obj, p, cycle):
         """,
     ).tag(config=True)
 
+    max_chars = Integer(1_000_000,
+        help="""Cut off the representation of objects after this many characters.
+
+        Containers stop being pretty printed once this budget is spent, rather
+        than after `max_seq_length` items. Set to 0 to disable truncation.
+        """,
+    ).tag(config=True)
+
+    max_lines = Integer(10_000,
+        help="""Cut off the representation of objects after this many lines.
+
+        Set to 0 to disable truncation.
+        """,
+    ).tag(config=True)
+
+    max_depth = Integer(0,
+        help="""Print the objects nested deeper than this as ``[...]``, ``{...}``...
+
+        This is the marker of reference cycles, so deep data may then look
+        cyclic. 0 (the default) disables truncation.
+        """,
+    ).tag(config=True)
+
     # Look for a _repr_pretty_ methods to use for pretty printing.
     print_method = ObjectName('_repr_pretty_')
 
@@ -757,18 +1177,28 @@ def _deferred_printers_default(self):
     def __call__(self, obj):
         """Compute the pretty representation of the object."""
         if not self.pprint:
-            return repr(obj)
+            return self._run(obj, repr, obj)
         else:
-            stream = StringIO()
-            printer = pretty.RepresentationPrinter(stream, self.verbose,
-                self.max_width, self.newline,
-                max_seq_length=self.max_seq_length,
-                singleton_pprinters=self.singleton_printers,
-                type_pprinters=self.type_printers,
-                deferred_pprinters=self.deferred_printers)
-            printer.pretty(obj)
-            printer.flush()
-            return stream.getvalue()
+            return self._run(obj, self._pretty, obj)
+
+    def _pretty(self, obj):
+        stream = StringIO()
+        printer = pretty.RepresentationPrinter(stream, self.verbose,
+            self.max_width, self.newline,
+            max_seq_length=self.max_seq_length,
+            max_chars=self.max_chars,
+            max_lines=self.max_lines,
+            max_depth=self.max_depth,
+            singleton_pprinters=self.singleton_printers,
+            type_pprinters=self.type_printers,
+            deferred_pprinters=self.deferred_printers)
+        printer.pretty(obj)
+        printer.flush()
+        return stream.getvalue()
+
+    def _timed_out(self, obj):
+        # this one always needs to return something
+        return object.__repr__(obj)
 
 
 class HTMLFormatter(BaseFormatter):
@@ -1027,12 +1457,12 @@ def __call__(self, obj, include=None, exclude=None):
             except KeyError:
                 pass
             else:
-                return printer(obj)
+                return self._run(obj, printer, obj)
             # Finally look for special method names
             method = get_real_method(obj, self.print_method)
 
             if method is not None:
-                return method(include=include, exclude=exclude)
+                return self._run(obj, method, include=include, exclude=exclude)
             return None
         else:
             return None
@@ -42,6 +42,9 @@
 else:
     from typing import TypeAliasType
 
+if typing.TYPE_CHECKING:
+    from IPython.core.lazyns import LazyNamespace
+
 
 @undoc
 class HasGetItem(Protocol):
@@ -399,6 +402,10 @@ class EvaluationContext:
     in_subscript: bool = False
     #: Auto import method
     auto_import: Callable[[Sequence[str]], ModuleType] | None = None
+    #: Names of the global namespace bound on first use
+    #: (:class:`~IPython.core.lazyns.LazyNamespace`), evaluated only if their
+    #: modules are imported, or auto import is allowed
+    lazy_globals: "LazyNamespace | None" = None
     #: Overrides for evaluation policy
     policy_overrides: dict = field(default_factory=dict)
     #: Transient local namespace used to store mocks
@@ -1419,6 +1426,13 @@ def _eval_node_name(node_id: str, context: EvaluationContext):
         return context.locals[node_id]
     if policy.allow_globals_access and node_id in context.globals:
         return context.globals[node_id]
+    if policy.allow_globals_access and context.lazy_globals:
+        try:
+            return context.lazy_globals.peek(
+                node_id, import_=policy.allow_auto_import
+            )
+        except KeyError:
+            pass
     if policy.allow_builtins_access and hasattr(builtins, node_id):
         # note: do not use __builtins__, it is implementation detail of cPython
         return getattr(builtins, node_id)
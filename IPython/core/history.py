@@ -10,6 +10,7 @@
 import datetime
 import os
 import re
+import time
 import weakref
 
 
@@ -23,7 +24,9 @@
 from traitlets import (
     Any,
     Bool,
+    CaselessStrEnum,
     Dict,
+    Float,
     Instance,
     Integer,
     List,
@@ -35,6 +38,7 @@
 )
 from traitlets.config.configurable import LoggingConfigurable
 
+from IPython.core.outputcache import OutputCache
 from IPython.paths import locate_profile
 from IPython.utils.decorators import undoc
 from typing import TYPE_CHECKING, ParamSpec
@@ -113,6 +117,13 @@ def _operational_error() -> tuple[type[BaseException], ...]:
     return (_sqlite3().OperationalError,)
 
 
+def _is_locked(e: BaseException) -> bool:
+    """Whether e means that another connection holds a lock on the database."""
+    return isinstance(e, _operational_error()) and (
+        "locked" in str(e) or "busy" in str(e)
+    )
+
+
 InOrInOut = str | tuple[str, str | None]
 
 # -----------------------------------------------------------------------------
@@ -169,6 +180,99 @@ def wrapper(*a: _P.args, **kw: _P.kwargs) -> _R:
 # that should be at least 100 entries or so
 _SAVE_DB_SIZE = 16384
 
+# Schema changes applied by HistoryAccessor.init_db on top of the tables it
+# creates. The database's `PRAGMA user_version` is the number of entries of
+# this tuple that have been applied to it, so append to it, never edit it.
+_MIGRATIONS: tuple[tuple[str, ...], ...] = (
+    # 1: a covering index for unique searches, which group by source_raw, and
+    # an index to find sessions by date.
+    (
+        """CREATE INDEX IF NOT EXISTS history_source_raw
+            ON history (source_raw, session, line)""",
+        "CREATE INDEX IF NOT EXISTS sessions_start ON sessions (start)",
+    ),
+    # 2: sessions whose inputs and outputs were moved out of the database by
+    # `ipython history compact`, and the archive file (relative to
+    # HistoryAccessor.archive_dir) holding them.
+    (
+        """CREATE TABLE IF NOT EXISTS archived_sessions
+            (session integer primary key, path text)""",
+    ),
+)
+
+
+def read_archive(path: Path) -> Iterator[dict[str, typing.Any]]:
+    """Read the sessions stored in a history archive file.
+
+    Archives are gzipped JSON lines, one line per session, with the keys
+    ``session``, ``start``, ``inputs`` (a list of ``[line, source,
+    source_raw]``) and ``outputs`` (a list of ``[line, output]``). A session
+    can appear more than once if archiving was interrupted, the last one
+    wins.
+    """
+    import gzip
+    import json
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def write_archive(path: Path, sessions: Iterable[dict[str, typing.Any]]) -> None:
+    """Append sessions to a history archive file, see :func:`read_archive`."""
+    import gzip
+    import json
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # gzip files can be concatenated, so appending adds a new gzip member
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        for session in sessions:
+            f.write(json.dumps(session) + "\n")
+
+def _archived_rows(
+    record: dict[str, typing.Any],
+    raw: bool,
+    output: bool,
+    keep: Callable[[int, str, str], bool],
+) -> list[tuple[int, int, InOrInOut]]:
+    """The entries of an archived session for which keep(line, source,
+    source_raw) is true, as :meth:`HistoryAccessor.get_range`."""
+    session = record["session"]
+    outputs = dict(record["outputs"]) if output else {}
+    rows: list[tuple[int, int, InOrInOut]] = []
+    for line, source, source_raw in record["inputs"]:
+        if keep(line, source, source_raw):
+            entry = source_raw if raw else source
+            rows.append((session, line, (entry, outputs.get(line)) if output else entry))
+    return rows
+
+# Full-text index of the input history, see HistoryAccessor.full_text_search.
+# It is an external content table: the text lives in `history` only, and the
+# triggers keep the index in sync whichever process writes to the database.
+# The trigram tokenizer lets the index answer GLOB queries (i.e. %history -g)
+# with exactly the same results as a scan, as well as MATCH queries.
+_FTS_SCHEMA = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(source_raw,
+        content='history', content_rowid='rowid', tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history
+    BEGIN
+        INSERT INTO history_fts(rowid, source_raw)
+            VALUES (new.rowid, new.source_raw);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history
+    BEGIN
+        INSERT INTO history_fts(history_fts, rowid, source_raw)
+            VALUES ('delete', old.rowid, old.source_raw);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS history_fts_update AFTER UPDATE ON history
+    BEGIN
+        INSERT INTO history_fts(history_fts, rowid, source_raw)
+            VALUES ('delete', old.rowid, old.source_raw);
+        INSERT INTO history_fts(rowid, source_raw)
+            VALUES (new.rowid, new.source_raw);
+    END""",
+)
+
 
 def catch_corrupt_db(f: t.Callable[_P, _R]) -> t.Callable[_P, _R]:
     """A decorator which wraps HistoryAccessor method calls to catch errors from
@@ -185,6 +289,10 @@ def wrapper(*a: _P.args, **kw: _P.kwargs) -> _R:
         try:
             return f(*a, **kw)
         except _db_errors() as e:
+            if _is_locked(e):
+                # Another process is writing: the database is fine, see
+                # empty_when_locked
+                raise
             self._corrupt_db_counter += 1
             self.log.error("Failed to open SQLite history %s (%s).", self.hist_file, e)
             if self.hist_file != ":memory:":
@@ -229,6 +337,30 @@ def wrapper(*a: _P.args, **kw: _P.kwargs) -> _R:
     return wrapper
 
 
+def empty_when_locked(f: t.Callable[_P, _R]) -> t.Callable[_P, _R]:
+    """Decorator: return an empty list while another process locks the database.
+
+    For the HistoryAccessor methods returning entries, which would otherwise
+    block the caller (usually the REPL) until the other process is done
+    writing, or fail.
+    """
+
+    @functools.wraps(f)
+    def wrapper(*a: _P.args, **kw: _P.kwargs) -> _R:
+        try:
+            return f(*a, **kw)
+        except _db_errors() as e:
+            if not _is_locked(e):
+                raise
+            self = cast("HistoryAccessor", a[0])
+            self.log.warning(
+                "History database %s is busy (%s).", self.hist_file, str(e)
+            )
+            return cast(_R, [])
+
+    return wrapper
+
+
 class HistoryAccessorBase(LoggingConfigurable):
     """An abstract class for History Accessors"""
 
@@ -249,6 +381,17 @@ def search(
         output: bool = False,
         n: int | None = None,
         unique: bool = False,
+        archived: bool = True,
+    ) -> Iterable[tuple[int, int, InOrInOut]]:
+        raise NotImplementedError
+
+    def search_text(
+        self,
+        text: str,
+        raw: bool = True,
+        output: bool = False,
+        n: int | None = None,
+        archived: bool = True,
     ) -> Iterable[tuple[int, int, InOrInOut]]:
         raise NotImplementedError
 
@@ -278,6 +421,10 @@ class HistoryAccessor(HistoryAccessorBase):
     _corrupt_db_counter = 0
     # after two failures, fallback on :memory:
     _corrupt_db_limit = 2
+    # whether a usable full-text index was found by init_db
+    _fts = False
+    # whether the database can have archived sessions
+    _archive_table = False
 
     # String holding the path to the history file
     hist_file = Union(
@@ -310,6 +457,49 @@ class HistoryAccessor(HistoryAccessorBase):
         """,
     ).tag(config=True)
 
+    journal_mode = CaselessStrEnum(
+        ["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"],
+        default_value=None,
+        allow_none=True,
+        help="""SQLite journal mode for the history database.
+
+        None (the default) leaves the database's current mode alone. "WAL"
+        lets readers and the writer work concurrently and makes each commit
+        much cheaper, which helps when several IPython processes share a
+        profile. It is a persistent property of the database file, and is
+        not supported on network filesystems.
+        """,
+    ).tag(config=True)
+
+    synchronous = CaselessStrEnum(
+        ["OFF", "NORMAL", "FULL", "EXTRA"],
+        default_value=None,
+        allow_none=True,
+        help="""SQLite synchronous setting for history database connections.
+
+        None (the default) keeps SQLite's default (FULL). "NORMAL" is safe
+        with ``journal_mode = "WAL"`` (a power loss may lose the last few
+        entries, but cannot corrupt the database) and avoids an fsync on
+        every commit.
+        """,
+    ).tag(config=True)
+
+    full_text_search = Bool(
+        False,
+        help="""Maintain a full-text index of the input history.
+
+        When enabled, and if SQLite supports FTS5 with the trigram tokenizer
+        (SQLite 3.34 or later), a ``history_fts`` table is kept in sync with
+        the history, so that ``%history -g`` and ranked searches do not have to
+        scan every entry ever typed. The existing history is indexed the first
+        time the database is opened with this enabled, which can take a while
+        for a large file.
+
+        Once the index exists, every process writing to the same history file
+        needs an SQLite with FTS5 support.
+        """,
+    ).tag(config=True)
+
     @default("enabled")
     def _enabled_default(self) -> bool:
         # dynamic rather than `Bool(_sqlite3_found())`: a static default is
@@ -402,6 +592,7 @@ def init_db(self) -> None:
         kwargs.update(self.connection_options)
         self.db = sqlite3.connect(str(self.hist_file), **kwargs)
         self._finalizer = weakref.finalize(self, lambda db: db.close(), self.db)
+        self._set_pragmas(self.db)
         with self.db:
             self.db.execute(
                 """CREATE TABLE IF NOT EXISTS sessions (session integer
@@ -420,9 +611,76 @@ def init_db(self) -> None:
                             (session integer, line integer, output text,
                             PRIMARY KEY (session, line))"""
             )
+        self._migrate()
+        self._archive_table = bool(
+            self.db.execute(
+                "SELECT 1 FROM sqlite_master WHERE name == 'archived_sessions'"
+            ).fetchone()
+        )
+        if self.full_text_search:
+            self._create_fts()
+        self._fts = self._fts_available()
         # success! reset corrupt db count
         self._corrupt_db_counter = 0
 
+    def _migrate(self) -> None:
+        """Bring the database schema up to date, see ``_MIGRATIONS``."""
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version >= len(_MIGRATIONS):
+            return
+        try:
+            with self.db:
+                for statements in _MIGRATIONS[version:]:
+                    for statement in statements:
+                        self.db.execute(statement)
+                self.db.execute("PRAGMA user_version = %d" % len(_MIGRATIONS))
+        except _operational_error() as e:
+            # Locked or read-only database: it still works with the old
+            # schema, and we will try again next time.
+            self.log.warning("Could not upgrade the history database (%s).", e)
+
+    def _set_pragmas(self, conn: sqlite3.Connection) -> None:
+        """Apply the configured journal mode and synchronous setting."""
+        try:
+            if self.journal_mode is not None:
+                conn.execute("PRAGMA journal_mode=%s" % self.journal_mode)
+            if self.synchronous is not None:
+                conn.execute("PRAGMA synchronous=%s" % self.synchronous)
+        except _operational_error() as e:
+            # e.g. the database is locked by another process; not a reason to
+            # treat it as corrupt
+            self.log.warning("Could not configure the history database (%s).", e)
+
+    def _create_fts(self) -> None:
+        """Create the full-text index and its triggers, if they don't exist."""
+        exists = self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name == 'history_fts'"
+        ).fetchone()
+        try:
+            with self.db:
+                for statement in _FTS_SCHEMA:
+                    self.db.execute(statement)
+                if not exists:
+                    # index the history written before the table existed
+                    self.db.execute(
+                        "INSERT INTO history_fts(history_fts) VALUES ('rebuild')"
+                    )
+        except _operational_error() as e:
+            # most likely an SQLite built without FTS5 or trigram support
+            self.log.warning("Full-text history search is not available (%s).", e)
+
+    def _fts_available(self) -> bool:
+        """Whether this database has a full-text index we are able to query."""
+        if not self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name == 'history_fts'"
+        ).fetchone():
+            return False
+        try:
+            self.db.execute("SELECT rowid FROM history_fts LIMIT 0")
+        except _operational_error():
+            return False
+        return True
+
     def close(self) -> None:
         """Close the SQLite database connection.
 
@@ -451,11 +709,51 @@ def __exit__(
     ) -> None:
         self.close()
 
+    @property
+    def archive_dir(self) -> Path | None:
+        """Directory of the sessions archived by ``ipython history compact``.
+
+        None for an in-memory database.
+        """
+        if str(self.hist_file) == ":memory:":
+            return None
+        hist_file = Path(self.hist_file)
+        return hist_file.with_name(hist_file.stem + "-archive")
+
     def writeout_cache(self) -> None:
         """Overridden by HistoryManager to dump the cache before certain
         database lookups."""
         pass
 
+    def _pending_rows(self) -> list[tuple[int, int, str, str, str | None]]:
+        """Entries which are not in the database yet, oldest first.
+
+        Each is a (session, line, source, source_raw, output) tuple. Lookups
+        merge these into their results, so that they see the entries which
+        are still waiting to be written out by HistoryManager.
+        """
+        self.writeout_cache()
+        return []
+
+    def _merge_pending(
+        self,
+        rows: Iterable[tuple[int, int, InOrInOut]],
+        pending: list[tuple[int, int, str, str, str | None]],
+        raw: bool,
+        output: bool,
+    ) -> list[tuple[int, int, InOrInOut]]:
+        """Add pending entries to rows from the database, ordered by (session, line)."""
+        rows = list(rows)
+        found = {row[:2] for row in rows}
+        for session, line, source, source_raw, out in pending:
+            if (session, line) in found:
+                # written out while we were querying
+                continue
+            entry = source_raw if raw else source
+            rows.append((session, line, (entry, out) if output else entry))
+        rows.sort(key=lambda row: row[:2])
+        return rows
+
     ## -------------------------------
     ## Methods for retrieving history:
     ## -------------------------------
@@ -466,6 +764,7 @@ def _run_sql(
         raw: bool = True,
         output: bool = False,
         latest: bool = False,
+        match: bool = False,
     ) -> Iterable[tuple[int, int, InOrInOut]]:
         """Prepares and runs an SQL query for the history database.
 
@@ -479,6 +778,10 @@ def _run_sql(
             See :meth:`get_range`
         latest : bool
             Select rows with max (session, line)
+        match : bool
+            The first of ``params`` is an FTS5 query, and only the rows of the
+            full-text index matching it are selected. Their BM25 score is
+            available to ``sql`` as ``matches.rank``.
 
         Returns
         -------
@@ -489,6 +792,11 @@ def _run_sql(
         if output:
             sqlfrom = "history LEFT JOIN output_history USING (session, line)"
             toget = "history.%s, output_history.output" % toget
+        if match:
+            sqlfrom += (
+                " JOIN (SELECT rowid, rank FROM history_fts WHERE history_fts"
+                " MATCH ?) AS matches ON history.rowid == matches.rowid"
+            )
         if latest:
             toget += ", MAX(session * 128 * 1024 + line)"
         this_querry = "SELECT session, line, {} FROM {} ".format(toget, sqlfrom) + sql
@@ -538,6 +846,7 @@ def get_last_session_id(self) -> int | None:
             return record[0]
         return None
 
+    @empty_when_locked
     @catch_corrupt_db
     def get_tail(
         self,
@@ -548,6 +857,8 @@ def get_tail(
     ) -> Iterable[tuple[int, int, InOrInOut]]:
         """Get the last n lines from the history database.
 
+        Sessions archived by ``ipython history compact`` are not read.
+
         Parameters
         ----------
         n : int
@@ -573,6 +884,7 @@ def get_tail(
             return reversed(list(cur)[1:])
         return reversed(list(cur))
 
+    @empty_when_locked
     @catch_corrupt_db
     def search(
         self,
@@ -582,10 +894,14 @@ def search(
         output: bool = False,
         n: int | None = None,
         unique: bool = False,
+        archived: bool = True,
     ) -> Iterable[tuple[int, int, InOrInOut]]:
         """Search the database using unix glob-style matching (wildcards
         * and ?).
 
+        The sessions moved to archive files by ``ipython history compact``
+        are searched too, when fewer than n entries of the database match.
+
         Parameters
         ----------
         pattern : str
@@ -599,29 +915,205 @@ def search(
             returned entries.
         unique : bool
             When it is true, return only unique entries.
+        archived : bool
+            If False, do not search the archived sessions.
 
         Returns
         -------
         Tuples as :meth:`get_range`
         """
+        from fnmatch import fnmatchcase
+
+        result = self._search_db(pattern, raw, search_raw, output, n, unique)
+        if not archived or (n is not None and n <= 0) or not self._archive_table:
+            return result
+        rows = list(result)
+        if n is not None and len(rows) >= n:
+            return rows
+        older = self._search_archives(
+            lambda source, source_raw: fnmatchcase(
+                source_raw if search_raw else source, pattern
+            ),
+            raw,
+            output,
+        )
+        if unique:
+            seen = {row[2][0] if output else row[2] for row in rows}
+            latest = []
+            for row in reversed(older):
+                key = row[2][0] if output else row[2]
+                if key not in seen:
+                    seen.add(key)
+                    latest.append(row)
+            older = latest[::-1]
+        rows = older + rows
+        if n is not None:
+            rows = rows[len(rows) - n :]
+        return rows
+
+    def _search_db(
+        self,
+        pattern: str,
+        raw: bool,
+        search_raw: bool,
+        output: bool,
+        n: int | None,
+        unique: bool,
+    ) -> Iterable[tuple[int, int, InOrInOut]]:
+        """Like :meth:`search`, without the archived sessions."""
         tosearch = "source_raw" if search_raw else "source"
         if output:
             tosearch = "history." + tosearch
-        self.writeout_cache()
+        pending = self._pending_rows()
+        if pending:
+            from fnmatch import fnmatchcase
+
+            pending = [
+                row
+                for row in pending
+                if fnmatchcase(row[3] if search_raw else row[2], pattern)
+            ]
         sqlform = "WHERE %s GLOB ?" % tosearch
+        if self._fts and search_raw and pattern != "*":
+            # Same match, but the full-text index finds the candidates
+            sqlform = (
+                "WHERE history.rowid IN "
+                "(SELECT rowid FROM history_fts WHERE source_raw GLOB ?)"
+            )
         params: tuple[typing.Any, ...] = (pattern,)
         if unique:
             sqlform += f" GROUP BY {tosearch}"
         if n is not None:
             sqlform += " ORDER BY session DESC, line DESC LIMIT ?"
-            params += (n,)
-        elif unique:
+            # the pending entries can push some of these out
+            params += (n + len(pending),)
+        else:
             sqlform += " ORDER BY session, line"
         cur = self._run_sql(sqlform, params, raw=raw, output=output, latest=unique)
+        if not pending:
+            if n is not None:
+                return reversed(list(cur))
+            return cur
+
+        rows = self._merge_pending(cur, pending, raw, output)
+        if unique:
+            # GROUP BY kept the latest of the matching entries from the
+            # database, keep the latest of those and the pending ones
+            seen = set()
+            latest = []
+            for row in reversed(rows):
+                key = row[2][0] if output else row[2]
+                if key not in seen:
+                    seen.add(key)
+                    latest.append(row)
+            rows = latest[::-1]
         if n is not None:
-            return reversed(list(cur))
-        return cur
+            rows = rows[len(rows) - n :] if n > 0 else []
+        return rows
 
+    @empty_when_locked
+    @catch_corrupt_db
+    def search_text(
+        self,
+        text: str,
+        raw: bool = True,
+        output: bool = False,
+        n: int | None = None,
+        archived: bool = True,
+    ) -> Iterable[tuple[int, int, InOrInOut]]:
+        """Search the raw input for entries containing all the words of text.
+
+        Words can appear anywhere in an entry, in any order. When the
+        full-text index is available (see :attr:`full_text_search`), matches
+        are ranked with BM25, best match first. Otherwise, this falls back to
+        checking every entry, and the most recent matches come first.
+
+        The sessions moved to archive files by ``ipython history compact``
+        are searched too, when fewer than n entries of the database match:
+        their matches come last, most recent first.
+
+        Parameters
+        ----------
+        text : str
+            Whitespace separated words to search for.
+        raw, output : bool
+            See :meth:`get_range`
+        n : None or int
+            If an integer is given, it defines the limit of
+            returned entries.
+        archived : bool
+            If False, do not search the archived sessions.
+
+        Returns
+        -------
+        Tuples as :meth:`get_range`, best match first.
+        """
+        result = self._search_text_db(text, raw, output, n)
+        if not archived or (n is not None and n <= 0) or not self._archive_table:
+            return result
+        rows = list(result)
+        if n is not None and len(rows) >= n:
+            return rows
+        words = text.split()
+        older = self._search_archives(
+            lambda source, source_raw: all(word in source_raw for word in words),
+            raw,
+            output,
+        )
+        rows += older[::-1]
+        if n is not None:
+            rows = rows[:n]
+        return rows
+
+    def _search_text_db(
+        self, text: str, raw: bool, output: bool, n: int | None
+    ) -> Iterable[tuple[int, int, InOrInOut]]:
+        """Like :meth:`search_text`, without the archived sessions."""
+        words = text.split()
+        pending = [
+            row
+            for row in self._pending_rows()
+            if all(word in row[3] for word in words)
+        ]
+        indexed = []
+        conditions = []
+        params: tuple[typing.Any, ...] = ()
+        for word in words:
+            # trigrams can't find words shorter than 3 characters
+            if self._fts and len(word) >= 3:
+                indexed.append('"%s"' % word.replace('"', '""'))
+            else:
+                conditions.append("instr(history.source_raw, ?) > 0")
+                params += (word,)
+        sqlform = "WHERE " + " AND ".join(conditions) if conditions else ""
+        if indexed:
+            params = (" AND ".join(indexed),) + params
+            sqlform += " ORDER BY matches.rank, session DESC, line DESC"
+        else:
+            sqlform += " ORDER BY session DESC, line DESC"
+        if n is not None:
+            sqlform += " LIMIT ?"
+            params += (n + len(pending),)
+        cur = self._run_sql(
+            sqlform, params, raw=raw, output=output, match=bool(indexed)
+        )
+        if not pending:
+            return cur
+        # The pending entries are the most recent, and aren't ranked: put
+        # them first, newest first, as without the full-text index.
+        rows = list(cur)
+        found = {row[:2] for row in rows}
+        new_rows = [
+            row
+            for row in self._merge_pending([], pending, raw, output)[::-1]
+            if row[:2] not in found
+        ]
+        rows = new_rows + rows
+        if n is not None:
+            rows = rows[:n]
+        return rows
+
+    @empty_when_locked
     @catch_corrupt_db
     def get_range(
         self,
@@ -657,6 +1149,13 @@ def get_range(
             (session, line, input) if output is False, or
             (session, line, (input, output)) if output is True.
         """
+        if self._archive_table:
+            row = self.db.execute(
+                "SELECT path FROM archived_sessions WHERE session == ?", (session,)
+            ).fetchone()
+            if row is not None:
+                return self._get_archived_range(row[0], session, start, stop, raw, output)
+
         params: tuple[typing.Any, ...]
         if stop:
             lineclause = "line >= ? AND line < ?"
@@ -669,6 +1168,69 @@ def get_range(
             "WHERE session==? AND %s" % lineclause, params, raw=raw, output=output
         )
 
+    def _get_archived_range(
+        self,
+        path: str,
+        session: int,
+        start: int,
+        stop: int | None,
+        raw: bool,
+        output: bool,
+    ) -> list[tuple[int, int, InOrInOut]]:
+        """Like :meth:`get_range`, for a session moved to an archive file."""
+        record = self._read_archives({path: {session}}).get(session)
+        if record is None:
+            return []
+        return _archived_rows(
+            record,
+            raw,
+            output,
+            lambda line, source, source_raw: line >= start
+            and not (stop and line >= stop),
+        )
+
+    def _read_archives(
+        self, sessions: dict[str, set[int]]
+    ) -> dict[int, dict[str, typing.Any]]:
+        """Read the archived sessions, given by archive file, see
+        :func:`read_archive`."""
+        assert self.archive_dir is not None
+        records = {}
+        for path, wanted in sessions.items():
+            archive = self.archive_dir / path
+            try:
+                for record in read_archive(archive):
+                    if record["session"] in wanted:
+                        records[record["session"]] = record
+            except OSError as e:
+                self.log.error("Failed to read history archive %s (%s).", archive, e)
+        return records
+
+    def _search_archives(
+        self, match: Callable[[str, str], bool], raw: bool, output: bool
+    ) -> list[tuple[int, int, InOrInOut]]:
+        """The entries of the archived sessions whose (source, source_raw)
+        match, as :meth:`get_range`, oldest first."""
+        sessions: dict[str, set[int]] = defaultdict(set)
+        for session, path in self.db.execute(
+            "SELECT session, path FROM archived_sessions"
+        ):
+            sessions[path].add(session)
+        if not sessions:
+            return []
+        rows: list[tuple[int, int, InOrInOut]] = []
+        records = self._read_archives(sessions)
+        for session in sorted(records):
+            rows.extend(
+                _archived_rows(
+                    records[session],
+                    raw,
+                    output,
+                    lambda line, source, source_raw: match(source, source_raw),
+                )
+            )
+        return rows
+
     def get_range_by_str(
         self, rangestr: str, raw: bool = True, output: bool = False
     ) -> Iterable[tuple[int, int, InOrInOut]]:
@@ -702,6 +1264,149 @@ class HistoryOutput:
     bundle: dict[str, str | list[str]]
 
 
+class StreamCapture:
+    """The text written to a stream during a cell, kept within a budget.
+
+    The chunks written are coalesced, so that a loop printing many short lines
+    does not keep one string alive per line, and appended to ``parts``, which
+    is the ``"stream"`` entry of the :class:`HistoryOutput` bundle. Once
+    more than ``limit`` characters have been written, only the first
+    ``limit - tail`` characters and the last ``tail`` ones are kept, around a marker telling
+    how much was left out. If ``spill_dir`` is given, the whole text is then
+    also written to a file in that directory, named in the marker.
+    """
+
+    def __init__(
+        self,
+        limit: int | None = None,
+        tail: int = 0,
+        spill_dir: Path | None = None,
+    ):
+        self.parts: list[str] = []
+        #: number of characters written
+        self.length = 0
+        self.limit = limit
+        self.tail = min(tail, limit) if limit is not None else 0
+        self.spill_dir = spill_dir
+        self.spill_path: Path | None = None
+        # characters which can still be written before truncating
+        self._room = limit
+        # index of the truncation marker in parts, once truncated
+        self._marker: int | None = None
+        self._tail_length = 0
+        self._spill_file: typing.TextIO | None = None
+
+    @property
+    def truncated(self) -> bool:
+        return self._marker is not None
+
+    @property
+    def kept(self) -> int:
+        """Number of characters kept in memory, excluding the marker."""
+        if self.limit is None or self._marker is None:
+            return self.length
+        return self.limit - self.tail + self._tail_length
+
+    def write(self, data: str) -> None:
+        self.length += len(data)
+        if self._spill_file is not None:
+            self._spill_file.write(data)
+        if self._room is None or len(data) <= self._room:
+            if self._room is not None:
+                self._room -= len(data)
+            parts = self.parts
+            parts.append(data)
+            # Merge the last chunks while they are not smaller than the ones
+            # before them, which keeps few parts without copying the text
+            # over and over.
+            while len(parts) > 1 and len(parts[-2]) <= len(parts[-1]) * 2:
+                last = parts.pop()
+                parts[-1] += last
+            return
+        if self._marker is None:
+            assert self.limit is not None
+            self._start_truncating(data)
+            # up to limit characters are kept as they are, the head is split
+            # from the tail once there are more
+            text = "".join(self.parts) + data
+            head_length = self.limit - self.tail
+            self.parts[:] = [text[:head_length]] if head_length else []
+            self._room = 0
+            self._marker = len(self.parts)
+            self.parts.append("\n[... truncated ...]\n")
+            data = text[head_length:]
+        self._write_tail(data)
+
+    def _start_truncating(self, data: str) -> None:
+        if self.spill_dir is None:
+            return
+        import tempfile
+
+        try:
+            fd, path = tempfile.mkstemp(
+                prefix="stream-", suffix=".txt", dir=self.spill_dir
+            )
+            self._spill_file = open(fd, "w", encoding="utf-8", errors="replace")
+            self._spill_file.writelines(self.parts)
+            self._spill_file.write(data)
+        except OSError:
+            self._spill_file = None
+            return
+        self.spill_path = Path(path)
+
+    def _write_tail(self, data: str) -> None:
+        if not self.tail:
+            return
+        assert self._marker is not None
+        self.parts.append(data)
+        self._tail_length += len(data)
+        if self._tail_length > 2 * self.tail:
+            tail = "".join(self.parts[self._marker + 1 :])[-self.tail :]
+            del self.parts[self._marker + 1 :]
+            self.parts.append(tail)
+            self._tail_length = len(tail)
+
+    def close(self) -> None:
+        """Finalize the text kept, once nothing more will be written."""
+        if self._marker is None:
+            return
+        if self._tail_length > self.tail:
+            tail = "".join(self.parts[self._marker + 1 :])[-self.tail :]
+            del self.parts[self._marker + 1 :]
+            self.parts.append(tail)
+            self._tail_length = len(tail)
+        marker = f"\n[... {self.length - self.kept} characters truncated"
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+            marker += f", full output in {self.spill_path}"
+        self.parts[self._marker] = marker + " ...]\n"
+
+
+@dataclass
+class HistoryWriteStats:
+    """Counters for the database writes of a :class:`HistoryManager`.
+
+    Durations are in seconds. The latency of a write out is how long the
+    oldest of its entries waited in the queue before being committed.
+    """
+
+    flushes: int = 0
+    inputs_written: int = 0
+    outputs_written: int = 0
+    #: write outs which failed, e.g. because another process locked the
+    #: database, and were retried later
+    failures: int = 0
+    #: inputs lost because the queue was full, see ``db_queue_limit``
+    dropped: int = 0
+    max_queue_depth: int = 0
+    last_flush_time: float = 0.0
+    max_flush_time: float = 0.0
+    total_flush_time: float = 0.0
+    last_latency: float = 0.0
+    max_latency: float = 0.0
+
+
 class HistoryManager(HistoryAccessor):
     """A class to organize all history-related functionality in one place."""
 
@@ -726,8 +1431,12 @@ def _dir_hist_default(self) -> list[Path]:
             return []
 
     # A dict of output history, keyed with ints from the shell's
-    # execution count.
+    # execution count. The displayhook sets its memory limits.
     output_hist = Dict()
+
+    @default("output_hist")
+    def _output_hist_default(self) -> OutputCache:
+        return OutputCache()
     # The text/plain repr of outputs.
     output_hist_reprs: dict[int, str] = Dict()  # type: ignore [assignment]
     # Maps execution_count to MIME bundles
@@ -746,9 +1455,51 @@ def _dir_hist_default(self) -> list[Path]:
         help="Write to database every x commands (higher values save disk access & power).\n"
         "Values of 1 or less effectively disable caching.",
     ).tag(config=True)
+    db_flush_interval = Float(
+        0,
+        help="""If positive, write cached commands to the database at least
+        every x seconds, even if fewer than ``db_cache_size`` have been run.
+
+        Together with a larger ``db_cache_size``, this batches the database
+        writes (one transaction, and one fsync, for many commands) while still
+        saving the history regularly.
+        """,
+    ).tag(config=True)
+    db_queue_limit = Integer(
+        10000,
+        help="""Maximum number of commands waiting to be written to the
+        database. If the database stays locked by other processes long enough
+        for more to pile up, the oldest ones are dropped (they stay in the
+        history of the current session). 0 means no limit.
+        """,
+    ).tag(config=True)
+    stream_capture_limit = Integer(
+        1_000_000,
+        help="""Maximum number of characters of stdout and stderr output kept
+        in ``outputs`` for each cell. Output beyond that is left out of the
+        history, but still shown. 0 means no limit.
+        """,
+    ).tag(config=True)
+    stream_capture_tail = Integer(
+        0,
+        help="""Number of characters, out of ``stream_capture_limit``, taken
+        from the end of the output of a cell when it is too long, e.g. to keep
+        the end of a progress report. The rest are taken from the start.
+        """,
+    ).tag(config=True)
+    stream_capture_spill = Bool(
+        False,
+        help="""Write the whole stdout and stderr output of the cells which
+        exceed ``stream_capture_limit`` to temporary files, which are named in
+        the truncated output kept in the history and removed at exit.
+        """,
+    ).tag(config=True)
     # The input and output caches
     db_input_cache: List[tuple[int, str, str]] = List()
     db_output_cache: List[tuple[int, str]] = List()
+    # Statistics about the database writes, see queue_depth for the current
+    # number of entries waiting to be written
+    write_stats: HistoryWriteStats
 
     # History saving in separate thread
     save_thread = Instance("IPython.core.history.HistorySavingThread", allow_none=True)
@@ -786,6 +1537,18 @@ def __init__(
         super().__init__(shell=shell, config=config, **traits)
         self.db_input_cache_lock = threading.Lock()
         self.db_output_cache_lock = threading.Lock()
+        # Only one write out at a time; the caches' locks are only held to
+        # take entries out of them, never while talking to the database.
+        self._writeout_lock = threading.Lock()
+        # The entries being written out, which are in neither the caches nor
+        # the database yet, and when the oldest queued entry was stored
+        self._inputs_in_flight: list[tuple[int, str, str]] = []
+        self._outputs_in_flight: list[tuple[int, str]] = []
+        self._queued_since: float | None = None
+        self.write_stats = HistoryWriteStats()
+        # characters of stream output kept for the current cell
+        self._stream_chars = 0
+        self._stream_spill_dir: Path | None = None
 
         try:
             self.new_session()
@@ -963,6 +1726,7 @@ def get_session_info(
 
         return super().get_session_info(session=session)
 
+    @empty_when_locked
     @catch_corrupt_db
     def get_tail(
         self,
@@ -993,7 +1757,7 @@ def get_tail(
         -------
         Tuples as :meth:`get_range`
         """
-        self.writeout_cache()
+        pending = self._pending_rows()
         if not include_latest:
             n += 1
         # cursor/line/entry
@@ -1005,6 +1769,8 @@ def get_tail(
                 output=output,
             )
         )
+        if pending:
+            this_cur = self._merge_pending(this_cur, pending, raw, output)[::-1]
         other_cur = list(
             self._run_sql(
                 "WHERE session != ? ORDER BY session DESC, line DESC LIMIT ?",
@@ -1022,6 +1788,64 @@ def get_tail(
             return list(everything)[:0:-1]
         return list(everything)[::-1]
 
+    @empty_when_locked
+    @catch_corrupt_db
+    def get_tail_page(
+        self,
+        n: int = 10,
+        before: tuple[int, int] | None = None,
+        raw: bool = True,
+    ) -> list[tuple[int, int, InOrInOut]]:
+        """Get up to n lines from the history database, most recent first.
+
+        This walks the history in the same order as :meth:`get_tail` (current
+        session first, then previous sessions), but one page at a time, so
+        that callers can read old entries only when they need them.
+
+        Parameters
+        ----------
+        n : int
+            The maximum number of lines to get
+        before : (session, line) or None
+            Only return lines older than this one, usually the last row of the
+            previous page. If None, start from the most recent line.
+        raw : bool
+            See :meth:`get_range`
+
+        Returns
+        -------
+        A list of tuples as :meth:`get_range`, most recent entry first.
+        """
+        rows: list[tuple[int, int, InOrInOut]] = []
+        if before is None or before[0] == self.session_number:
+            pending = self._pending_rows()
+            sql = "WHERE session == ?"
+            params: tuple[int, ...] = (self.session_number,)
+            if before is not None:
+                sql += " AND line < ?"
+                params += (before[1],)
+                pending = [row for row in pending if row[1] < before[1]]
+            rows = list(
+                self._run_sql(
+                    sql + " ORDER BY line DESC LIMIT ?", params + (n,), raw=raw
+                )
+            )
+            if pending:
+                rows = self._merge_pending(rows, pending, raw, False)[::-1][:n]
+            before = None
+        if len(rows) < n:
+            sql = "WHERE session != ?"
+            params = (self.session_number,)
+            if before is not None:
+                sql += " AND (session < ? OR (session == ? AND line < ?))"
+                params += (before[0], before[0], before[1])
+            rows += self._run_sql(
+                sql + " ORDER BY session DESC, line DESC LIMIT ?",
+                params + (n - len(rows),),
+                raw=raw,
+            )
+        return rows
+
     def _get_range_session(
         self,
         start: int = 1,
@@ -1121,7 +1945,10 @@ def store_inputs(
         self.input_hist_raw.append(source_raw)
 
         with self.db_input_cache_lock:
+            if not self.db_input_cache:
+                self._queued_since = time.monotonic()
             self.db_input_cache.append((line_num, source, source_raw))
+            self._check_queue_limit()
             # Trigger to flush cache and write to DB.
             if len(self.db_input_cache) >= self.db_cache_size:
                 if self.using_thread:
@@ -1142,6 +1969,48 @@ def store_inputs(
         if self.shell is not None:
             self.shell.push(to_main, interactive=False)
 
+    def start_stream_output(
+        self,
+        execution_count: int,
+        output_type: typing.Literal["out_stream", "err_stream"],
+    ) -> StreamCapture:
+        """Add a stream output to the outputs of a cell.
+
+        Returns the :class:`StreamCapture` to write the text of the output to,
+        with what is left of the budget of the cell (see
+        ``stream_capture_limit`` and :meth:`reset_stream_budget`). Call
+        :meth:`end_stream_output` once done.
+        """
+        limit = None
+        if self.stream_capture_limit > 0:
+            limit = max(self.stream_capture_limit - self._stream_chars, 0)
+        spill_dir = None
+        if self.stream_capture_spill:
+            spill_dir = self._stream_spill_dir
+            if spill_dir is None:
+                import shutil
+                import tempfile
+
+                spill_dir = Path(tempfile.mkdtemp(prefix="ipython-streams-"))
+                weakref.finalize(self, shutil.rmtree, spill_dir, ignore_errors=True)
+                self._stream_spill_dir = spill_dir
+        capture = StreamCapture(
+            limit=limit, tail=self.stream_capture_tail, spill_dir=spill_dir
+        )
+        self.outputs[execution_count].append(
+            HistoryOutput(output_type=output_type, bundle={"stream": capture.parts})
+        )
+        return capture
+
+    def end_stream_output(self, execution_count: int, capture: StreamCapture) -> None:
+        """Finalize a stream output started by :meth:`start_stream_output`."""
+        capture.close()
+        self._stream_chars += capture.kept
+
+    def reset_stream_budget(self) -> None:
+        """Start counting the stream output kept for a new cell."""
+        self._stream_chars = 0
+
     def store_output(self, line_num: int) -> None:
         """If database output logging is enabled, this saves all the
         outputs from the indicated prompt number to the database. It's
@@ -1164,57 +2033,149 @@ def store_output(self, line_num: int) -> None:
             if self.save_flag is not None:
                 self.save_flag.set()
 
-    def _writeout_input_cache(self, conn: sqlite3.Connection) -> None:
-        with conn:
-            for line in self.db_input_cache:
-                conn.execute(
-                    "INSERT INTO history VALUES (?, ?, ?, ?)",
-                    (self.session_number,) + line,
+    def _check_queue_limit(self) -> None:
+        """Drop the oldest queued inputs beyond db_queue_limit.
+
+        Must be called with db_input_cache_lock held.
+        """
+        stats = self.write_stats
+        excess = len(self.db_input_cache) - self.db_queue_limit
+        if self.db_queue_limit > 0 and excess > 0:
+            del self.db_input_cache[:excess]
+            if not stats.dropped:
+                self.log.warning(
+                    "History database %s is not keeping up, dropping the oldest"
+                    " history entries (see HistoryManager.db_queue_limit).",
+                    self.hist_file,
                 )
+            stats.dropped += excess
+        depth = len(self.db_input_cache) + len(self._inputs_in_flight)
+        stats.max_queue_depth = max(stats.max_queue_depth, depth)
 
-    def _writeout_output_cache(self, conn: sqlite3.Connection) -> None:
+    @property
+    def queue_depth(self) -> int:
+        """The number of inputs waiting to be written to the database."""
+        return len(self.db_input_cache) + len(self._inputs_in_flight)
+
+    def _pending_rows(self) -> list[tuple[int, int, str, str, str | None]]:
+        if not self.using_thread:
+            # nothing else will write them: do it now
+            self.writeout_cache()
+            return []
+        with self.db_input_cache_lock:
+            inputs = self._inputs_in_flight + self.db_input_cache
+        if not inputs:
+            return []
+        with self.db_output_cache_lock:
+            outputs = dict(self._outputs_in_flight + self.db_output_cache)
+        if self.save_flag is not None:
+            # make sure they are on their way
+            self.save_flag.set()
+        session = self.session_number
+        return [
+            (session, line, source, source_raw, outputs.get(line))
+            for line, source, source_raw in inputs
+        ]
+
+    def _writeout_input_cache(
+        self, conn: sqlite3.Connection, inputs: list[tuple[int, str, str]]
+    ) -> None:
+        if not inputs:
+            return
         with conn:
-            for line in self.db_output_cache:
-                conn.execute(
-                    "INSERT INTO output_history VALUES (?, ?, ?)",
-                    (self.session_number,) + line,
-                )
+            conn.executemany(
+                "INSERT INTO history VALUES (?, ?, ?, ?)",
+                [(self.session_number,) + line for line in inputs],
+            )
+
+    def _writeout_output_cache(
+        self, conn: sqlite3.Connection, outputs: list[tuple[int, str]]
+    ) -> None:
+        if not outputs:
+            return
+        with conn:
+            conn.executemany(
+                "INSERT INTO output_history VALUES (?, ?, ?)",
+                [(self.session_number,) + line for line in outputs],
+            )
 
     @only_when_enabled
     def writeout_cache(self, conn: sqlite3.Connection | None = None) -> None:
-        """Write any entries in the cache to the database."""
+        """Write any entries in the cache to the database.
+
+        The cache locks are only held to take the entries out of the caches,
+        so storing new entries never waits for the database. If the database
+        is locked by another process, the entries are put back at the front
+        of the caches, to be written next time, and the
+        ``sqlite3.OperationalError`` is raised.
+        """
         if conn is None:
             conn = self.db
 
-        with self.db_input_cache_lock:
+        with self._writeout_lock:
+            with self.db_input_cache_lock:
+                inputs, self.db_input_cache = self.db_input_cache, []
+                self._inputs_in_flight = inputs
+                queued_since, self._queued_since = self._queued_since, None
+            with self.db_output_cache_lock:
+                outputs, self.db_output_cache = self.db_output_cache, []
+                self._outputs_in_flight = outputs
+            if not (inputs or outputs):
+                return
+
+            n_inputs, n_outputs = len(inputs), len(outputs)
+            start = time.monotonic()
             try:
-                self._writeout_input_cache(conn)
-            except _sqlite3().IntegrityError:
-                self.new_session(conn)
-                print(
-                    "ERROR! Session/line number was not unique in",
-                    "database. History logging moved to new session",
-                    self.session_number,
-                )
                 try:
-                    # Try writing to the new session. If this fails, don't
-                    # recurse
-                    self._writeout_input_cache(conn)
+                    self._writeout_input_cache(conn, inputs)
                 except _sqlite3().IntegrityError:
-                    pass
-            finally:
-                self.db_input_cache = []
-
-        with self.db_output_cache_lock:
-            try:
-                self._writeout_output_cache(conn)
-            except _sqlite3().IntegrityError:
-                print(
-                    "!! Session/line number for output was not unique",
-                    "in database. Output will not be stored.",
-                )
+                    self.new_session(conn)
+                    print(
+                        "ERROR! Session/line number was not unique in",
+                        "database. History logging moved to new session",
+                        self.session_number,
+                    )
+                    try:
+                        # Try writing to the new session. If this fails, don't
+                        # recurse
+                        self._writeout_input_cache(conn, inputs)
+                    except _sqlite3().IntegrityError:
+                        pass
+                inputs = []
+                try:
+                    self._writeout_output_cache(conn, outputs)
+                except _sqlite3().IntegrityError:
+                    print(
+                        "!! Session/line number for output was not unique",
+                        "in database. Output will not be stored.",
+                    )
+                outputs = []
+            except _operational_error():
+                self.write_stats.failures += 1
+                raise
             finally:
-                self.db_output_cache = []
+                # Whatever wasn't written goes back to the front of the queue
+                with self.db_input_cache_lock:
+                    self.db_input_cache[:0] = inputs
+                    self._inputs_in_flight = []
+                    if inputs:
+                        self._queued_since = queued_since
+                        self._check_queue_limit()
+                with self.db_output_cache_lock:
+                    self.db_output_cache[:0] = outputs
+                    self._outputs_in_flight = []
+
+            now = time.monotonic()
+            stats = self.write_stats
+            stats.flushes += 1
+            stats.inputs_written += n_inputs
+            stats.outputs_written += n_outputs
+            stats.last_flush_time = now - start
+            stats.max_flush_time = max(stats.max_flush_time, stats.last_flush_time)
+            stats.total_flush_time += stats.last_flush_time
+            if queued_since is not None:
+                stats.last_latency = now - queued_since
+                stats.max_latency = max(stats.max_latency, stats.last_latency)
 
 
 if hasattr(os, "register_at_fork"):
@@ -1239,7 +2200,10 @@ class HistorySavingThread(threading.Thread):
 
     It waits for the HistoryManager's save_flag to be set, then writes out
     the history cache. The main thread is responsible for setting the flag when
-    the cache size reaches a defined threshold."""
+    the cache size reaches a defined threshold. If the HistoryManager has a
+    ``db_flush_interval``, the cache is also written out when it has been
+    waiting for that long. If the database is locked by another process, the
+    write out is retried every ``retry_interval`` seconds."""
 
     save_flag: threading.Event
     daemon: bool = True
@@ -1248,6 +2212,8 @@ class HistorySavingThread(threading.Thread):
     history_manager: ref[HistoryManager]
     _stopped = False
     db: sqlite3.Connection | None = None
+    # seconds to wait before writing out again when the database was locked
+    retry_interval: float = 1.0
 
     def __init__(self, history_manager: HistoryManager) -> None:
         super().__init__(name="IPythonHistorySavingThread")
@@ -1268,8 +2234,12 @@ def run(self) -> None:
                         str(hm().hist_file),  # type: ignore [union-attr]
                         **cast(dict[str, t.Any], hm().connection_options),  # type: ignore [union-attr]
                     )
+                    hm()._set_pragmas(self.db)  # type: ignore [union-attr]
+            retry = False
             while True:
-                self.save_flag.wait()
+                self.save_flag.wait(
+                    self.retry_interval if retry else self._flush_interval()
+                )
                 with hold(self.history_manager) as hm:
                     if hm() is None:
                         self._stop_now = True
@@ -1277,7 +2247,17 @@ def run(self) -> None:
                         return
                     self.save_flag.clear()
                     if hm() is not None and self.db is not None:
-                        hm().writeout_cache(self.db)  # type: ignore [union-attr]
+                        try:
+                            hm().writeout_cache(self.db)  # type: ignore [union-attr]
+                        except _operational_error() as e:
+                            if not _is_locked(e):
+                                raise
+                            # Another process kept the database locked for
+                            # longer than the connection's timeout. The
+                            # entries are back in the cache, try again later.
+                            retry = True
+                        else:
+                            retry = False
 
         except Exception as e:
             print(
@@ -1298,6 +2278,13 @@ def run(self) -> None:
                 self.db = None
             atexit.unregister(self.stop)
 
+    def _flush_interval(self) -> float | None:
+        """How long to wait for save_flag before writing out anyway."""
+        hm = self.history_manager()
+        if hm is None or hm.db_flush_interval <= 0:
+            return None
+        return hm.db_flush_interval
+
     def stop(self) -> None:
         """This can be called from the main thread to safely stop this thread.
 
@@ -4,12 +4,15 @@
 To be invoked as the `ipython history` subcommand.
 """
 
+import datetime
 import sqlite3
+from collections import defaultdict
 from contextlib import closing
 from pathlib import Path
 
 from traitlets.config.application import Application
 from .application import BaseIPythonApplication
+from .history import HistoryAccessor, write_archive
 from traitlets import Bool, Int, Dict
 from ..utils.io import ask_yes_no
 
@@ -29,6 +32,19 @@
 This is an handy alias to `ipython history trim --keep=0`
 """
 
+compact_hist_help = """Compact the IPython history database, without losing its contents.
+
+Exact duplicate inputs are removed, keeping only their most recent
+occurrence, and the inputs and outputs of the sessions which started more
+than `--archive-days=` days ago (if given), and have ended, are moved to
+gzipped files in the `history-archive` directory, one per month, where
+IPython can still read and search them. The database is then vacuumed to give the space
+back.
+
+This works on the live database, so it is safe to run while IPython sessions
+are using it.
+"""
+
 
 class HistoryTrim(BaseIPythonApplication):
     description = trim_hist_help
@@ -135,6 +151,145 @@ def start(self):
             HistoryTrim.start(self)
 
 
+class HistoryCompact(BaseIPythonApplication):
+    description = compact_hist_help
+
+    backup = Bool(
+        False, help="Keep a copy of the database as history.sqlite.old.<N>"
+    ).tag(config=True)
+
+    dedupe = Bool(
+        True, help="Remove duplicate inputs, keeping the most recent one."
+    ).tag(config=True)
+
+    archive_days = Int(
+        0,
+        help="Archive the sessions that started more than this many days ago. "
+        "0 disables archiving.",
+    ).tag(config=True)
+
+    flags = Dict(  # type: ignore
+        {
+            "backup": ({"HistoryCompact": {"backup": True}}, backup.help),
+            "no-dedupe": (
+                {"HistoryCompact": {"dedupe": False}},
+                "Keep duplicate inputs.",
+            ),
+        }
+    )
+
+    aliases = Dict({"archive-days": "HistoryCompact.archive_days"})  # type: ignore
+
+    def start(self):
+        profile_dir = Path(self.profile_dir.location)
+        hist_file = profile_dir / "history.sqlite"
+        with HistoryAccessor(hist_file=hist_file, parent=self) as history:
+            db = history.db
+            if self.backup:
+                i = 1
+                backup_hist_file = profile_dir / ("history.sqlite.old.%d" % i)
+                while backup_hist_file.exists():
+                    i += 1
+                    backup_hist_file = profile_dir / ("history.sqlite.old.%d" % i)
+                # unlike copying the file, this gives a consistent snapshot
+                # even if other sessions are writing to the database
+                db.execute("VACUUM INTO ?", (str(backup_hist_file),))
+                print("Backed up history file to", backup_hist_file)
+
+            if self.archive_days > 0 and not history._archive_table:
+                # the database could not be upgraded, e.g. it is locked
+                print(
+                    "Could not archive sessions: the history database could "
+                    "not be upgraded, try again when no other IPython session "
+                    "is writing to it."
+                )
+            elif self.archive_days > 0:
+                cutoff = datetime.datetime.now() - datetime.timedelta(
+                    days=self.archive_days
+                )
+                n = self._archive(history, cutoff)
+                print("Archived %d sessions to %s" % (n, history.archive_dir))
+
+            if self.dedupe:
+                with db:
+                    n = db.execute(
+                        """DELETE FROM history WHERE EXISTS
+                        (SELECT 1 FROM history AS later
+                        WHERE later.source_raw == history.source_raw
+                        AND (later.session, later.line)
+                            > (history.session, history.line))"""
+                    ).rowcount
+                    db.execute(
+                        """DELETE FROM output_history WHERE NOT EXISTS
+                        (SELECT 1 FROM history
+                        WHERE history.session == output_history.session
+                        AND history.line == output_history.line)"""
+                    )
+                print("Removed %d duplicate entries." % n)
+
+            try:
+                db.execute("VACUUM")
+            except sqlite3.OperationalError as e:
+                # e.g. another session is writing to the database
+                print("Could not vacuum the history database (%s)." % e)
+
+    def _archive(self, history: HistoryAccessor, cutoff: datetime.datetime) -> int:
+        """Move the sessions started before cutoff to the archive files.
+
+        The sessions which have not ended are left alone, as another IPython
+        process may still add to them: the entries added to an archived
+        session would never be read. Returns the number of sessions archived.
+        """
+        db = history.db
+        assert history.archive_dir is not None
+        sessions = db.execute(
+            """SELECT session, start FROM sessions WHERE start < ?
+            AND end IS NOT NULL
+            AND session NOT IN (SELECT session FROM archived_sessions)
+            ORDER BY session""",
+            (cutoff.isoformat(" "),),
+        ).fetchall()
+        partitions = defaultdict(list)
+        for session, start in sessions:
+            inputs = db.execute(
+                "SELECT line, source, source_raw FROM history WHERE session == ?",
+                (session,),
+            ).fetchall()
+            outputs = db.execute(
+                "SELECT line, output FROM output_history WHERE session == ?",
+                (session,),
+            ).fetchall()
+            if not inputs and not outputs:
+                continue
+            partitions["%s.jsonl.gz" % start.strftime("%Y-%m")].append(
+                {
+                    "session": session,
+                    "start": start.isoformat(" "),
+                    "inputs": inputs,
+                    "outputs": outputs,
+                }
+            )
+        n = 0
+        for path, records in partitions.items():
+            # Write the archive before deleting anything: if we are interrupted
+            # in between, the sessions are archived again next time, and the
+            # last copy wins when reading.
+            write_archive(history.archive_dir / path, records)
+            with db:
+                for record in records:
+                    session = record["session"]
+                    db.execute(
+                        "INSERT OR REPLACE INTO archived_sessions VALUES (?, ?)",
+                        (session, path),
+                    )
+                    db.execute("DELETE FROM history WHERE session == ?", (session,))
+                    db.execute(
+                        "DELETE FROM output_history WHERE session == ?", (session,)
+                    )
+            n += len(records)
+        return n
+
+
 class HistoryApp(Application):
     name = "ipython-history"
     description = "Manage the IPython history database."
@@ -142,6 +297,7 @@ class HistoryApp(Application):
     subcommands = Dict(dict(
         trim = (HistoryTrim, HistoryTrim.description.splitlines()[0]),
         clear = (HistoryClear, HistoryClear.description.splitlines()[0]),
+        compact = (HistoryCompact, HistoryCompact.description.splitlines()[0]),
     ))
 
     def start(self):
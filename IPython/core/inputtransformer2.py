@@ -678,6 +678,115 @@ def make_tokens_by_line(lines: list[str]):
     return tokens_by_line
 
 
+class _TokenCache:
+    """:func:`make_tokens_by_line` for successive versions of a cell, e.g.
+    as it is being edited.
+
+    The tokens of the previous version are kept, with the top-level statements
+    where the tokenizer is back in its initial state. Only the lines from the
+    last such statement before the first line which changed are tokenized
+    again.
+    """
+
+    # tokens which don't start a statement
+    _not_statements = {
+        tokenize.INDENT,
+        tokenize.DEDENT,
+        tokenize.NL,
+        tokenize.NEWLINE,
+        tokenize.COMMENT,
+        tokenize.ENDMARKER,
+        tokenize.ERRORTOKEN,
+    }
+
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+        self.tokens_by_line: list[list[tokenize.TokenInfo]] = []
+        # (index in tokens_by_line, line number, number of DEDENT tokens
+        # before it) of the statements tokenizing can restart from, in order
+        self.restarts: list[tuple[int, int, int]] = [(0, 0, 0)]
+
+    def get(self, lines: list[str]) -> list[list[tokenize.TokenInfo]]:
+        """The tokens of lines, grouped by line like make_tokens_by_line.
+
+        The last two lists of tokens are copies, which the caller can modify.
+        """
+        n_same = 0
+        for old, new in zip(self.lines, lines):
+            if old != new:
+                break
+            n_same += 1
+        if n_same == len(lines) == len(self.lines):
+            tokens_by_line = list(self.tokens_by_line)
+        else:
+            tokens_by_line = self._update(lines, n_same)
+        tokens_by_line[-2:] = [list(tokens) for tokens in tokens_by_line[-2:]]
+        return tokens_by_line
+
+    def _update(self, lines: list[str], n_same: int) -> list[list[tokenize.TokenInfo]]:
+        # the last statement which starts at the latest on the first changed
+        # line: the lines before it, and their tokens, are the same (there
+        # must be lines left though, for the end of the tokens)
+        n_same = min(n_same, len(lines) - 1)
+        i = len(self.restarts) - 1
+        while i > 0:
+            # the DEDENT tokens are kept, so their line must not have changed
+            line, n_dedents = self.restarts[i][1:]
+            if line < n_same or (line == n_same and not n_dedents):
+                break
+            i -= 1
+        restarts = self.restarts[: i + 1]
+        n_tokens, n_lines, n_dedents = restarts[-1]
+        tail = make_tokens_by_line(lines[n_lines:])
+        if n_lines:
+            tail = [
+                [
+                    token._replace(
+                        start=(token.start[0] + n_lines, token.start[1]),
+                        end=(token.end[0] + n_lines, token.end[1]),
+                    )
+                    for token in tokens
+                ]
+                for tokens in tail
+            ]
+        if n_dedents:
+            dedents = self.tokens_by_line[n_tokens][:n_dedents]
+            if tail:
+                tail[0] = dedents + tail[0]
+            else:
+                tail = [dedents]
+        tokens_by_line = self.tokens_by_line[:n_tokens] + tail
+
+        # the bracket level of the tokenizer, and the one of
+        # make_tokens_by_line, which does not go below 0
+        parenlev = grouping_parenlev = 0
+        for ix, tokens in enumerate(tail, n_tokens):
+            n_dedents = 0
+            while n_dedents < len(tokens) - 1 and tokens[n_dedents].type == tokenize.DEDENT:
+                n_dedents += 1
+            first = tokens[n_dedents]
+            if (
+                ix > n_tokens
+                and parenlev == grouping_parenlev == 0
+                and first.start[1] == 0
+                and first.type not in self._not_statements
+            ):
+                restarts.append((ix, first.start[0] - 1, n_dedents))
+            for token in tokens:
+                if token.type == tokenize.OP:
+                    if token.string in {"(", "[", "{"}:
+                        parenlev += 1
+                        grouping_parenlev += 1
+                    elif token.string in {")", "]", "}"}:
+                        parenlev -= 1
+                        grouping_parenlev = max(grouping_parenlev - 1, 0)
+
+        self.lines = list(lines)
+        self.tokens_by_line = tokens_by_line
+        self.restarts = restarts
+        return list(tokens_by_line)
+
+
 def has_sunken_brackets(tokens: list[tokenize.TokenInfo]):
     """Check if the depth of brackets in the list of tokens drops below 0"""
     parenlev = 0
@@ -691,9 +800,47 @@ def has_sunken_brackets(tokens: list[tokenize.TokenInfo]):
     return False
 
 
+def _is_self_contained(token_line) -> bool:
+    """Whether the tokenizer is in the same state after token_line as after
+    a complete Python statement, so that the tokens which follow are the same
+    as after the line is transformed."""
+    if token_line[-1].type != tokenize.NEWLINE:
+        return False
+    parenlev = 0
+    for token in token_line:
+        if token.string in {"(", "[", "{"}:
+            parenlev += 1
+        elif token.string in {")", "]", "}"}:
+            parenlev -= 1
+            if parenlev < 0:
+                return False
+    if parenlev:
+        return False
+    # Before Python 3.12, ! and ? are error tokens, which don't upset the
+    # tokenizer, unlike e.g. an unterminated string.
+    return all(
+        token.type != tokenize.ERRORTOKEN
+        or token.string in {"!", "?"}
+        or (token.string and token.string.isspace())
+        for token in token_line
+    )
+
+
 # Arbitrary limit to prevent getting stuck in infinite loops
 TRANSFORM_LOOP_LIMIT = 500
 
+# The token transformers whose special syntax _maybe_special_re finds, and
+# which only look at one logical line at a time.
+_LINE_TOKEN_TRANSFORMERS = (MagicAssign, SystemAssign, EscapedCommand, HelpEnd)
+
+# Matches wherever the special syntax of _LINE_TOKEN_TRANSFORMERS might start:
+# an escape at the start of a line (%foo, !foo, ,foo...), an assignment from a
+# magic or a command (a = %foo, a = !foo), or a question mark (foo?). Cells it
+# does not match don't need to be tokenized.
+_maybe_special_re = re.compile(
+    r"^[ \t\f]*[!?%,;/]|=[ \t\f\\\r\n]*[%!]|\?", re.MULTILINE
+)
+
 
 class TransformerManager:
     """Applies various transformations to a cell or code block.
@@ -718,6 +865,8 @@ def __init__(self):
             EscapedCommand,
             HelpEnd,
         ]
+        # the tokens of the last cell check_complete was called with
+        self._check_tokens = _TokenCache()
 
     def do_one_token_transform(self, lines):
         """Find and run the transform earliest in the code.
@@ -752,6 +901,64 @@ def do_one_token_transform(self, lines):
         return False, lines
 
     def do_token_transforms(self, lines):
+        if all(cls in _LINE_TOKEN_TRANSFORMERS for cls in self.token_transformers):
+            if not _maybe_special_re.search("".join(lines)):
+                # plain Python
+                return lines
+            return self._do_line_token_transforms(lines)
+        return self._do_token_transforms_loop(lines)
+
+    def _do_line_token_transforms(self, lines):
+        """Apply the transforms of ``_LINE_TOKEN_TRANSFORMERS`` in one pass.
+
+        Gives the same result as :meth:`_do_token_transforms_loop`, but only
+        tokenizes the cell once, unless the special syntax throws off the
+        tokenizer (e.g. ``!echo "``): the transformed line is then a complete
+        Python statement which the rest of the cell must be tokenized after.
+        """
+        tokens_by_line = make_tokens_by_line(lines)
+        # lines added (or removed) by the transforms so far, before the tokens
+        # which are left
+        offset = 0
+        # the transformers which raised SyntaxError on a line left as is: the
+        # loop keeps finding the same syntax, and never gets to the next one
+        failed = set()
+        for token_line in tokens_by_line:
+            candidates = []
+            for transformer_cls in self.token_transformers:
+                if transformer_cls in failed:
+                    continue
+                transformer = transformer_cls.find([token_line])
+                if transformer:
+                    transformer.start_line += offset
+                    if isinstance(transformer, HelpEnd):
+                        transformer.q_line += offset
+                    candidates.append(transformer)
+            if not candidates:
+                continue
+            for transformer in sorted(candidates, key=TokenTransformBase.sortby):
+                try:
+                    new_lines = transformer.transform(lines)
+                except SyntaxError:
+                    continue
+                break
+            else:
+                failed.update(type(transformer) for transformer in candidates)
+                continue
+            # the transform replaced the lines from start_line to last_line by
+            # one line
+            last_line = transformer.start_line + len(lines) - len(new_lines)
+            if not (
+                _is_self_contained(token_line)
+                and last_line - offset == token_line[-1].start[0] - 1
+            ):
+                # the tokens of the rest of the cell can't be trusted
+                return self._do_token_transforms_loop(new_lines)
+            offset += len(new_lines) - len(lines)
+            lines = new_lines
+        return lines
+
+    def _do_token_transforms_loop(self, lines):
         for _ in range(TRANSFORM_LOOP_LIMIT):
             changed, lines = self.do_one_token_transform(lines)
             if not changed:
@@ -841,7 +1048,12 @@ def check_complete(self, cell: str):
         except SyntaxError:
             return "invalid", None
 
-        tokens_by_line = make_tokens_by_line(lines)
+        try:
+            tokens_by_line = self._check_tokens.get(lines)
+        except SyntaxError:
+            # e.g. inconsistent indentation, if the token transforms had
+            # nothing to tokenize
+            return "invalid", None
 
         # Bail if we got one line and there are more closing parentheses than
         # the opening ones
@@ -21,7 +21,7 @@
 import types
 import warnings
 from ast import stmt
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 from io import open as io_open
 from pathlib import Path
 from typing import Any as AnyType
@@ -37,6 +37,7 @@
     CaselessStrEnum,
     Dict,
     Enum,
+    Float,
     Instance,
     Integer,
     List,
@@ -54,7 +55,7 @@
 from IPython.core.alias import Alias, AliasManager
 from IPython.core.autocall import ExitAutocall
 from IPython.core.builtin_trap import BuiltinTrap
-from IPython.core.compilerop import CachingCompiler
+from IPython.core.compilerop import CachingCompiler, CellCache, code_with_filename
 from IPython.core.display_trap import DisplayTrap
 from IPython.core.displayhook import DisplayHook
 from IPython.core.displaypub import DisplayPublisher
@@ -62,10 +63,17 @@
 from IPython.core.events import EventManager, available_events
 from IPython.core.extensions import ExtensionManager
 from IPython.core.formatters import DisplayFormatter
-from IPython.core.history import HistoryManager, HistoryOutput
+from IPython.core.history import (
+    HistoryAccessor,
+    HistoryManager,
+    HistoryOutput,
+    StreamCapture,
+)
 from IPython.core.inputtransformer2 import ESC_MAGIC, ESC_MAGIC2
+from IPython.core.lazyns import LazyNamespace, code_names
 from IPython.core.macro import Macro
 from IPython.core.payload import PayloadManager
+from IPython.core.phases import PhaseStats, PhaseTimer
 from IPython.core.prefilter import PrefilterManager
 from IPython.core.profiledir import ProfileDir
 from IPython.core.tips import pick_tip
@@ -128,6 +136,7 @@ class ProvisionalWarning(DeprecationWarning):
 from .async_helpers import (
     _asyncio_runner,
     _curio_runner,
+    _may_await,
     _pseudo_sync_runner,
     _should_be_async,
     _trio_runner,
@@ -306,6 +315,11 @@ class ExecutionResult:
     error_in_exec: BaseException | None = None
     info = None
     result = None
+    #: With ``InteractiveShell.record_phase_times``, the time spent in each
+    #: phase of running the cell, see :class:`~IPython.core.phases.PhaseTimer`.
+    phase_times: dict[str, float] | None = None
+    #: ... and the ``(phase, start, end)`` of each phase.
+    phase_timestamps: list[tuple[str, float, float]] | None = None
 
     def __init__(self, info):
         self.info = info
@@ -341,6 +355,8 @@ def _modified_open(file, *args, **kwargs):
 
 _dollar_formatter = DollarFormatter()
 
+_no_phase = nullcontext()
+
 
 class InteractiveShell(SingletonConfigurable):
     """An enhanced, interactive shell for Python."""
@@ -567,6 +583,99 @@ def input_transformers_cleanup(self):
         """
     ).tag(config=True)
 
+    lazy_pylab_imports = Bool(
+        True,
+        help="""
+        With %pylab, bind the names of the modules which are not imported yet
+        (e.g. everything from ``matplotlib.pylab``) when they are first used,
+        rather than importing the modules right away. Names bound this way do
+        not replace the variables defined in the meantime.
+        """,
+    ).tag(config=True)
+
+    cell_cache_size = Integer(
+        128,
+        help="""
+        Number of recently run cells for which the result of the input
+        transformations and the compiled code are kept, so that running the
+        same cell again skips that work. Cached results are only reused as long
+        as the input transformers and the compiler flags are the same, and the
+        compiled code is not cached while there are AST transformers. Lazy
+        names (see ``lazy_pylab_imports``) the cell uses are still bound.
+        0 disables the cache.
+        """,
+    ).tag(config=True)
+
+    @observe("cell_cache_size")
+    def _cell_cache_size_changed(self, change):
+        for cache in (self._transform_cache, getattr(self.compile, "cell_cache", None)):
+            if cache is not None:
+                cache.maxsize = change["new"]
+                cache.clear()
+
+    record_phase_times = Bool(
+        False,
+        help="""
+        Record how long each phase of running a cell takes (input
+        transformations, parsing, compiling, running the code, displaying the
+        result, writing history and calling the event callbacks). The times
+        are set on the ExecutionResult, passed to the ``phase_times`` event,
+        and summarised by ``%phasetimes``.
+        """,
+    ).tag(config=True)
+
+    time_event_callbacks = Bool(
+        False,
+        help="""
+        Time the event callbacks (e.g. ``pre_run_cell`` and ``post_run_cell``
+        ones registered by extensions), in ``shell.events.callback_stats``.
+        """,
+    ).tag(config=True)
+
+    slow_callback_threshold = Float(
+        0.0,
+        help="""
+        Warn (once per callback) when an event callback takes longer than this
+        many seconds. Slow callbacks can be registered as deferred, to run
+        after the output of the cell has been shown. 0 disables the warning.
+        """,
+    ).tag(config=True)
+
+    @observe("time_event_callbacks", "slow_callback_threshold")
+    def _callback_timing_changed(self, change):
+        if hasattr(self, "events"):
+            self.events.time_callbacks = self.time_event_callbacks
+            self.events.slow_callback_threshold = self.slow_callback_threshold
+
+    linecache_max_cells = Integer(
+        1000,
+        help="""
+        Number of recently run cells whose source is always kept in
+        ``linecache``, for tracebacks and debuggers. The source of older cells
+        is dropped from it once no code object from the cell is alive (e.g. no
+        function defined in the cell, and no traceback through it, remains),
+        and loaded back from the history if it is asked for again.
+        0 keeps the source of all cells.
+        """,
+    ).tag(config=True)
+
+    @observe("linecache_max_cells")
+    def _linecache_max_cells_changed(self, change):
+        if hasattr(self.compile, "linecache_max_cells"):
+            self.compile.linecache_max_cells = change["new"]
+
+    batch_statements = Bool(
+        True,
+        help="""
+        Compile the consecutive statements of a cell which are not run
+        interactively as a single code object, instead of compiling and running
+        each of them separately, which is faster for cells with many
+        statements. Statements using top-level await, and statements which
+        do not compile together (e.g. a misplaced ``from __future__ import``),
+        are still run one at a time.
+        """,
+    ).tag(config=True)
+
     warn_venv = Bool(
         True,
         help="Warn if running in a virtual environment with no IPython installed (so IPython from the global environment is used).",
@@ -618,6 +727,11 @@ def profile(self):
 
     last_execution_result = Instance('IPython.core.interactiveshell.ExecutionResult', help='Result of executing the last command', allow_none=True)
 
+    # Incremented whenever the user namespace may have changed (running code,
+    # push, del_var...), so that e.g. the completer can tell whether what it
+    # cached about the namespace is still valid.
+    namespace_generation: int = 0
+
     def __init__(self, ipython_dir=None, profile_dir=None,
                  user_module=None, user_ns=None,
                  custom_exceptions=((), None), **kwargs):
@@ -765,6 +879,17 @@ def init_instance_attrs(self):
 
         # command compiler
         self.compile = self.compiler_class()
+        if hasattr(self.compile, "cell_cache"):
+            self.compile.cell_cache.maxsize = self.cell_cache_size
+        if hasattr(self.compile, "linecache_max_cells"):
+            self.compile.linecache_max_cells = self.linecache_max_cells
+            self.compile.source_loader = self._cell_source
+        # static input transformations of recent cells
+        self._transform_cache = CellCache(self.cell_cache_size)
+
+        # see record_phase_times
+        self._phase_timer = None
+        self.phase_stats = PhaseStats()
 
         # Make an empty namespace, which extension writers can rely on both
         # existing and NEVER being used by ipython itself.  This gives them a
@@ -1156,6 +1281,8 @@ def set_hook(self, name, hook, priority=50, str_key=None, re_key=None):
 
     def init_events(self):
         self.events = EventManager(self, available_events)
+        self.events.time_callbacks = self.time_event_callbacks
+        self.events.slow_callback_threshold = self.slow_callback_threshold
 
         self.events.register("pre_execute", self._clear_warning_registry)
 
@@ -1326,6 +1453,9 @@ def init_create_namespaces(self, user_module=None, user_ns=None):
         # we can list later only variables defined in actual interactive use.
         self.user_ns_hidden = {}
 
+        # Names of the user namespace bound the first time they are used.
+        self.lazy_ns = LazyNamespace(self)
+
         # Now that FakeModule produces a real module, we've run into a nasty
         # problem: after script execution (via %run), the module where the user
         # code ran is deleted.  Now that this object is a true module (needed
@@ -1511,6 +1641,7 @@ def reset(self, new_session=True, aggressive=False):
         # Reset last execution result
         self.last_execution_succeeded = True
         self.last_execution_result = None
+        self.namespace_generation += 1
 
         # Flush cached output items
         if self.displayhook.do_full_cache:
@@ -1530,6 +1661,7 @@ def reset(self, new_session=True, aggressive=False):
             del ns[k]
 
         self.user_ns_hidden.clear()
+        self.lazy_ns.clear()
 
         # Restore the user namespaces to minimal usability
         self.init_user_ns()
@@ -1575,6 +1707,7 @@ def del_var(self, varname, by_name=False):
         if varname in ('__builtin__', '__builtins__'):
             raise ValueError("Refusing to delete %s" % varname)
 
+        self.namespace_generation += 1
         ns_refs = self.all_ns_refs
 
         if by_name:                    # Delete by name
@@ -1666,6 +1799,7 @@ def push(self, variables, interactive=True):
 
         # Propagate variables to user namespace
         self.user_ns.update(vdict)
+        self.namespace_generation += 1
 
         # And configure interactive visibility
         user_ns_hidden = self.user_ns_hidden
@@ -2376,6 +2510,7 @@ def init_completer(self):
         """
         from IPython.core.completer import IPCompleter
         from IPython.core.completerlib import (
+            ModuleIndex,
             cd_completer,
             magic_run_completer,
             module_completer,
@@ -2401,6 +2536,11 @@ def init_completer(self):
         self.set_hook('complete_command', cd_completer, str_key = '%cd')
         self.set_hook('complete_command', reset_completer, str_key = '%reset')
 
+        # Index the importable modules in the background, so that it is ready
+        # by the time the user completes an import.
+        self.module_index = ModuleIndex(self)
+        self.module_index.refresh()
+
     @skip_doctest
     def complete(self, text, line=None, cursor_pos=None):
         """Return the completed text and a list of completions.
@@ -2991,7 +3131,15 @@ def ev(self, expr):
         with self.builtin_trap:
             return eval(expr, self.user_global_ns, self.user_ns)
 
-    def safe_execfile(self, fname, *where, exit_ignore=False, raise_exceptions=False, shell_futures=False):
+    def safe_execfile(
+        self,
+        fname,
+        *where,
+        exit_ignore=False,
+        raise_exceptions=False,
+        shell_futures=False,
+        compiler=None,
+    ):
         """A safe version of the builtin execfile().
 
         This version will never throw an exception, but instead print
@@ -3015,6 +3163,10 @@ def safe_execfile(self, fname, *where, exit_ignore=False, raise_exceptions=False
             shell. It will both be affected by previous __future__ imports, and
             any __future__ imports in the code will affect the shell. If False,
             __future__ imports are not shared in either direction.
+        compiler : callable, optional
+            Used instead of the builtin compile() to compile the file (e.g. a
+            :class:`~IPython.core.startupfiles.StartupCodeCache`). Takes
+            precedence over shell_futures.
 
         """
         fname = Path(fname).expanduser().resolve()
@@ -3035,6 +3187,11 @@ def safe_execfile(self, fname, *where, exit_ignore=False, raise_exceptions=False
         def execfile(fname, glob, loc=None, compiler=None):
             __tracebackhide__ = "__ipython_bottom__"
             loc = loc if (loc is not None) else glob
+            if self.lazy_ns and (glob is self.user_ns or loc is self.user_ns):
+                try:
+                    self.lazy_ns.visit(ast.parse(Path(fname).read_bytes()))
+                except (OSError, SyntaxError):
+                    pass
             with open(fname, "rb") as f:
                 compiler = compiler or compile
                 exec(compiler(f.read(), fname, "exec"), glob, loc)
@@ -3044,7 +3201,7 @@ def execfile(fname, glob, loc=None, compiler=None):
                 glob, loc = (where + (None, ))[:2]
                 execfile(
                     fname, glob, loc,
-                    self.compile if shell_futures else None)
+                    compiler or (self.compile if shell_futures else None))
             except SystemExit as status:
                 # If the call was made with 0 or None exit status (sys.exit(0)
                 # or sys.exit() ), don't bother showing a traceback, as both of
@@ -3165,39 +3322,47 @@ def _tee(self, channel: Literal["stdout", "stderr"]):
         stream = getattr(sys, channel)
         original_write = stream.write
         execution_count = self.execution_count
+        history_manager = self.history_manager
+        outputs_by_counter = history_manager.outputs
+        display_pub = self.display_pub
+        displayhook = self.displayhook
+        output_type: Literal["out_stream", "err_stream"] = (
+            "out_stream" if channel == "stdout" else "err_stream"
+        )
+        # the stream output being written to, as long as no other output came
+        # after it, and its capture
+        output: HistoryOutput | None = None
+        capture: StreamCapture | None = None
 
         def write(data, *args, **kwargs):
             """Write data to both the original destination and the capture dictionary."""
+            nonlocal output, capture
             result = original_write(data, *args, **kwargs)
-            if any(
-                [
-                    self.display_pub.is_publishing,
-                    self.displayhook.is_active,
-                    self.showing_traceback,
-                ]
+            if (
+                not data
+                or display_pub.is_publishing
+                or displayhook.is_active
+                or self.showing_traceback
             ):
                 return result
-            if not data:
-                return result
-            output_stream = None
-            outputs_by_counter = self.history_manager.outputs
-            output_type = "out_stream" if channel == "stdout" else "err_stream"
-            if execution_count in outputs_by_counter:
-                outputs = outputs_by_counter[execution_count]
-                if outputs[-1].output_type == output_type:
-                    output_stream = outputs[-1]
-            if output_stream is None:
-                output_stream = HistoryOutput(
-                    output_type=output_type, bundle={"stream": []}
+            outputs = outputs_by_counter.get(execution_count)
+            if capture is None or not outputs or outputs[-1] is not output:
+                if capture is not None:
+                    history_manager.end_stream_output(execution_count, capture)
+                capture = history_manager.start_stream_output(
+                    execution_count, output_type
                 )
-                outputs_by_counter[execution_count].append(output_stream)
-
-            output_stream.bundle["stream"].append(data)  # Append to existing stream
+                output = outputs_by_counter[execution_count][-1]
+            capture.write(data)
             return result
 
         stream.write = write
-        yield
-        stream.write = original_write
+        try:
+            yield
+        finally:
+            stream.write = original_write
+            if capture is not None:
+                history_manager.end_stream_output(execution_count, capture)
 
     def run_cell(
         self,
@@ -3243,17 +3408,64 @@ def run_cell(
         result : :class:`ExecutionResult`
         """
         result = None
-        with self._tee(channel="stdout"), self._tee(channel="stderr"):
-            try:
-                result = self._run_cell(
-                    raw_cell, store_history, silent, shell_futures, cell_id, cell_meta
-                )
-            finally:
-                self.events.trigger("post_execute")
-                if not silent:
-                    self.events.trigger("post_run_cell", result)
+        # deferred callbacks of the events of the previous cell, if the
+        # frontend did not run them yet
+        self.events.run_deferred()
+        outer_timer = self._phase_timer
+        timer = self._phase_timer = PhaseTimer() if self.record_phase_times else None
+        self.history_manager.reset_stream_budget()
+        try:
+            with self._tee(channel="stdout"), self._tee(channel="stderr"):
+                try:
+                    result = self._run_cell(
+                        raw_cell, store_history, silent, shell_futures, cell_id, cell_meta
+                    )
+                finally:
+                    with self._phase("events"):
+                        self.events.trigger("post_execute")
+                        if not silent:
+                            self.events.trigger("post_run_cell", result)
+        finally:
+            self._phase_timer = outer_timer
+        if timer is not None and result is not None:
+            self._finish_phases(timer, result)
+        self._schedule_deferred_callbacks()
         return result
 
+    def _schedule_deferred_callbacks(self):
+        """Run the deferred event callbacks once the running event loop (e.g.
+        of a kernel) is done with the cell.
+
+        Without a running event loop, frontends should call
+        ``self.events.run_deferred()`` once the output of the cell is shown;
+        they are otherwise run before the next cell.
+        """
+        if not self.events.pending:
+            return
+        import asyncio
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.call_soon(self.events.run_deferred)
+
+    def _phase(self, name):
+        """A context manager timing a phase of running the current cell, if
+        ``record_phase_times`` is enabled."""
+        timer = self._phase_timer
+        if timer is None:
+            return _no_phase
+        return timer.phase(name)
+
+    def _finish_phases(self, timer, result):
+        """Record the phase times of the cell which ran, see
+        ``record_phase_times``."""
+        result.phase_times = timer.stop()
+        result.phase_timestamps = timer.timestamps
+        self.phase_stats.add(result.phase_times)
+        self.events.trigger("phase_times", result)
+
     def _run_cell(
         self,
         raw_cell: str,
@@ -3407,6 +3619,40 @@ async def run_cell_async(
             ``transformed_cell`` is now required; the deprecated fallback that
             called ``transform_cell`` automatically has been removed.
         """
+        kwargs = dict(
+            transformed_cell=transformed_cell,
+            preprocessing_exc_tuple=preprocessing_exc_tuple,
+            cell_id=cell_id,
+            cell_meta=cell_meta,
+        )
+        if not self.record_phase_times or self._phase_timer is not None:
+            # not timed, or timed by run_cell
+            return await self._run_cell_async(
+                raw_cell, store_history, silent, shell_futures, **kwargs
+            )
+        timer = self._phase_timer = PhaseTimer()
+        try:
+            result = await self._run_cell_async(
+                raw_cell, store_history, silent, shell_futures, **kwargs
+            )
+        finally:
+            self._phase_timer = None
+        self._finish_phases(timer, result)
+        return result
+
+    async def _run_cell_async(
+        self,
+        raw_cell: str,
+        store_history: bool,
+        silent: bool,
+        shell_futures: bool,
+        *,
+        transformed_cell: str | None,
+        preprocessing_exc_tuple: AnyType | None,
+        cell_id,
+        cell_meta,
+    ) -> ExecutionResult:
+        """Implementation of :meth:`run_cell_async`."""
         if transformed_cell is None:
             raise TypeError(
                 "`run_cell_async` no longer calls `transform_cell` "
@@ -3451,9 +3697,10 @@ def error_before_exec(value):
             self.last_execution_result = result
             return result
 
-        self.events.trigger('pre_execute')
-        if not silent:
-            self.events.trigger('pre_run_cell', info)
+        with self._phase("events"):
+            self.events.trigger('pre_execute')
+            if not silent:
+                self.events.trigger('pre_run_cell', info)
 
         if preprocessing_exc_tuple is None:
             cell = transformed_cell
@@ -3467,7 +3714,8 @@ def error_before_exec(value):
         # Store raw and processed history
         if store_history:
             assert self.history_manager is not None
-            self.history_manager.store_inputs(execution_count, cell, raw_cell)
+            with self._phase("history"):
+                self.history_manager.store_inputs(execution_count, cell, raw_cell)
         if not silent:
             self.logger.log(cell, raw_cell)
 
@@ -3481,42 +3729,86 @@ def error_before_exec(value):
         # compiler
         compiler = self.compile if shell_futures else self.compiler_class()
 
+        # Our cache of the code compiled for recently run cells. Cached code
+        # skips transform_ast, so it is not used while AST transformers (which
+        # may have side effects, or reject the input) are registered, and the
+        # names of the cell are kept with it, to bind the lazy names it uses.
+        interactivity = "none" if silent else self.ast_node_interactivity
+        cell_cache = getattr(compiler, "cell_cache", None)
+        if self.ast_transformers:
+            cell_cache = None
+        cache_key = (
+            cell,
+            compiler.flags,
+            interactivity,
+            self.autoawait,
+            self.batch_statements,
+        )
+        cached = None
+        if cell_cache is not None:
+            cached = cell_cache.get(cache_key)
+            if cached is not None and self.lazy_ns:
+                self.lazy_ns.prepare(cached[2])
+
         with self.builtin_trap:
             cell_name = compiler.cache(cell, execution_count, raw_code=raw_cell)
 
             with self.display_trap:
-                # Compile to bytecode
-                try:
-                    code_ast = compiler.ast_parse(cell, filename=cell_name)
-                except self.custom_exceptions as e:
-                    etype, value, tb = sys.exc_info()
-                    self.CustomTB(etype, value, tb)
-                    return error_before_exec(e)
-                except IndentationError as e:
-                    self.showindentationerror()
-                    return error_before_exec(e)
-                except (OverflowError, SyntaxError, ValueError, TypeError,
-                        MemoryError) as e:
-                    self.showsyntaxerror()
-                    return error_before_exec(e)
-
-                # Apply AST transformations
-                try:
-                    code_ast = self.transform_ast(code_ast)
-                except InputRejected as e:
-                    self.showtraceback()
-                    return error_before_exec(e)
+                if cached is None:
+                    # Compile to bytecode
+                    try:
+                        with self._phase("ast_parse"):
+                            code_ast = compiler.ast_parse(cell, filename=cell_name)
+                    except self.custom_exceptions as e:
+                        etype, value, tb = sys.exc_info()
+                        self.CustomTB(etype, value, tb)
+                        return error_before_exec(e)
+                    except IndentationError as e:
+                        self.showindentationerror()
+                        return error_before_exec(e)
+                    except (OverflowError, SyntaxError, ValueError, TypeError,
+                            MemoryError) as e:
+                        self.showsyntaxerror()
+                        return error_before_exec(e)
+
+                    # Apply AST transformations
+                    try:
+                        with self._phase("transform_ast"):
+                            code_ast = self.transform_ast(code_ast)
+                    except InputRejected as e:
+                        self.showtraceback()
+                        return error_before_exec(e)
 
                 # Give the displayhook a reference to our ExecutionResult so it
                 # can fill in the output value.
                 self.displayhook.exec_result = result
 
                 # Execute the user code
-                interactivity = "none" if silent else self.ast_node_interactivity
-
-
-                has_raised = await self.run_ast_nodes(code_ast.body, cell_name,
-                       interactivity=interactivity, compiler=compiler, result=result)
+                if cached is None:
+                    compiled: list[tuple[types.CodeType, bool]] = []
+                    has_raised = await self.run_ast_nodes(
+                        code_ast.body,
+                        cell_name,
+                        interactivity=interactivity,
+                        compiler=compiler,
+                        result=result,
+                        compiled=compiled,
+                    )
+                    if not has_raised and cell_cache is not None:
+                        cell_cache.put(
+                            cache_key, (compiled, compiler.flags, code_names(code_ast))
+                        )
+                else:
+                    codes, compiler.flags, _ = cached
+                    codes = [
+                        (code_with_filename(code, cell_name), is_async)
+                        for code, is_async in codes
+                    ]
+                    if hasattr(compiler, "track_code"):
+                        for code, _ in codes:
+                            compiler.track_code(code)
+                    has_raised = await self._run_compiled(codes, result)
+                self.namespace_generation += 1
 
                 self.last_execution_succeeded = not has_raised
                 self.last_execution_result = result
@@ -3527,14 +3819,15 @@ def error_before_exec(value):
 
         if store_history:
             assert self.history_manager is not None
-            # Write output to the database. Does nothing unless
-            # history output logging is enabled.
-            self.history_manager.store_output(execution_count)
-            if result.error_in_exec:
-                # Store formatted traceback and error details
-                self.history_manager.exceptions[
-                    execution_count
-                ] = self._format_exception_for_storage(result.error_in_exec)
+            with self._phase("history"):
+                # Write output to the database. Does nothing unless
+                # history output logging is enabled.
+                self.history_manager.store_output(execution_count)
+                if result.error_in_exec:
+                    # Store formatted traceback and error details
+                    self.history_manager.exceptions[
+                        execution_count
+                    ] = self._format_exception_for_storage(result.error_in_exec)
 
         return result
 
@@ -3595,6 +3888,26 @@ def contains_exceptiongroup(val):
 
         return {"ename": etype.__name__, "evalue": str(evalue), "traceback": stb}
 
+    def _cell_source(self, number):
+        """The transformed source of cell `number` of this session, from the
+        history, or None.
+
+        Used to load back the source of cells evicted from linecache.
+        """
+        hm = self.history_manager
+        if hm is None:
+            return None
+        # the input history kept in memory, then the database, e.g. after
+        # %reset emptied the former
+        for _, _, source in hm.get_range(0, number, number + 1, raw=False):
+            return source
+        if isinstance(hm, HistoryAccessor):
+            for _, _, source in HistoryAccessor.get_range(
+                hm, hm.session_number, number, number + 1, raw=False
+            ):
+                return source
+        return None
+
     def transform_cell(self, raw_cell):
         """Transform an input cell before parsing it.
 
@@ -3609,11 +3922,23 @@ def transform_cell(self, raw_cell):
         see :meth:`transform_ast`.
         """
         # Static input transformations
-        cell = self.input_transformer_manager.transform_cell(raw_cell)
+        manager = self.input_transformer_manager
+        transformers = (
+            manager,
+            *manager.cleanup_transforms,
+            *manager.line_transforms,
+            *manager.token_transformers,
+        )
+        key = (raw_cell, tuple(map(id, transformers)))
+        with self._phase("transform_cell"):
+            cell = self._transform_cache.get(key, transformers)
+            if cell is None:
+                cell = manager.transform_cell(raw_cell)
+                self._transform_cache.put(key, cell, transformers)
 
         if len(cell.splitlines()) == 1:
             # Dynamic transformations - only applied for single line commands
-            with self.builtin_trap:
+            with self.builtin_trap, self._phase("prefilter"):
                 # use prefilter_lines to handle trailing newlines
                 # restore trailing newline for ast.parse
                 cell = self.prefilter_manager.prefilter_lines(cell) + '\n'
@@ -3657,6 +3982,8 @@ def transform_ast(self, node):
 
         if self.ast_transformers:
             ast.fix_missing_locations(node)
+        if self.lazy_ns:
+            self.lazy_ns.visit(node)
         return node
 
     async def run_ast_nodes(
@@ -3666,6 +3993,8 @@ async def run_ast_nodes(
         interactivity="last_expr",
         compiler=compile,
         result=None,
+        *,
+        compiled: list[tuple[types.CodeType, bool]] | None = None,
     ):
         """Run a sequence of AST nodes. The execution mode depends on the
         interactivity parameter.
@@ -3691,6 +4020,10 @@ async def run_ast_nodes(
           the AST nodes into code objects. Default is the built-in compile().
         result : ExecutionResult, optional
           An object to store exceptions that occur during execution.
+        compiled : list, optional
+          If given, the code objects run are appended to it, each with whether
+          it runs asynchronously, so that they can be run again with
+          :meth:`_run_compiled`.
 
         Returns
         -------
@@ -3741,26 +4074,47 @@ def compare(code):
 
             # refactor that to just change the mod constructor.
             to_run = []
-            for node in to_run_exec:
-                to_run.append((node, "exec"))
+            if self.batch_statements and to_run_exec:
+                to_run.append((to_run_exec, "exec"))
+            else:
+                to_run.extend(([node], "exec") for node in to_run_exec)
 
             for node in to_run_interactive:
-                to_run.append((node, "single"))
+                to_run.append(([node], "single"))
 
-            for node, mode in to_run:
+            while to_run:
+                nodes, mode = to_run.pop(0)
                 if mode == "exec":
-                    mod = Module([node], [])
+                    mod = Module(nodes, [])
                 elif mode == "single":
-                    mod = ast.Interactive([node])
+                    mod = ast.Interactive(nodes)
                 with compiler.extra_flags(
                     getattr(ast, "PyCF_ALLOW_TOP_LEVEL_AWAIT", 0x0)
                     if self.autoawait
                     else 0x0
                 ):
-                    code = compiler(mod, cell_name, mode)
-                    asy = compare(code)
-                if await self.run_code(code, result, async_=asy):
-                    return True
+                    try:
+                        with self._phase("compile"):
+                            code = compiler(mod, cell_name, mode)
+                    except Exception:
+                        if len(nodes) == 1:
+                            raise
+                        code = None
+                    asy = code is not None and compare(code)
+                if len(nodes) > 1 and (code is None or asy):
+                    # Split the batch, so that the statements before the one
+                    # which does not compile still run, and only the awaiting
+                    # ones run asynchronously.
+                    batches = self._batch_nodes(nodes) if asy else []
+                    if len(batches) < 2:
+                        batches = [[node] for node in nodes]
+                    to_run[:0] = [(batch, mode) for batch in batches]
+                    continue
+                if compiled is not None:
+                    compiled.append((code, asy))
+                with self._phase("run_code"):
+                    if await self.run_code(code, result, async_=asy):
+                        return True
 
             # Flush softspace
             if softspace(sys.stdout, 0):
@@ -3783,6 +4137,40 @@ def compare(code):
 
         return False
 
+    async def _run_compiled(
+        self, codes: list[tuple[types.CodeType, bool]], result=None
+    ) -> bool:
+        """Run code objects recorded by :meth:`run_ast_nodes`, in order.
+
+        Returns True if an exception occurred, as :meth:`run_ast_nodes`.
+        """
+        for code, is_async in codes:
+            with self._phase("run_code"):
+                if await self.run_code(code, result, async_=is_async):
+                    return True
+        if softspace(sys.stdout, 0):
+            print()
+        return False
+
+    def _batch_nodes(self, nodelist: list[stmt]) -> list[list[stmt]]:
+        """Group statements into maximal runs which can be compiled together.
+
+        Statements which may use top-level await are left on their own.
+        """
+        batches: list[list[stmt]] = []
+        batch: list[stmt] = []
+        for node in nodelist:
+            if self.autoawait and _may_await(node):
+                if batch:
+                    batches.append(batch)
+                    batch = []
+                batches.append([node])
+            else:
+                batch.append(node)
+        if batch:
+            batches.append(batch)
+        return batches
+
     async def run_code(self, code_obj, result=None, *, async_=False):
         """Execute a code object.
 
@@ -3968,7 +4356,9 @@ def enable_pylab(self, gui=None, import_all=True):
         # code in an empty namespace, and we update *both* user_ns and
         # user_ns_hidden with this information.
         ns = {}
-        import_pylab(ns, import_all)
+        import_pylab(
+            ns, import_all, lazy_ns=self.lazy_ns if self.lazy_pylab_imports else None
+        )
         # warn about clobbered names
         ignored = {"__builtins__"}
         both = set(ns).intersection(self.user_ns).difference(ignored)
@@ -0,0 +1,417 @@
+"""Names of the user namespace which are bound the first time they are used.
+
+Binding the names of ``%pylab`` or of the startup files which only import
+modules does not require importing the modules anymore: they are registered
+in the :class:`LazyNamespace` of the shell (``shell.lazy_ns``), and bound in
+the user namespace, importing their modules, before the first cell (or
+``%time``, ``%timeit``, ``%run -i`` file...) using them runs.
+
+The user namespace itself stays a plain dict, as CPython only looks up the
+globals of functions quickly in those. The names which are not bound yet are
+still known to the completer, ``%who`` and ``guarded_eval``, which only get
+their values when their modules have already been imported.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import ast
+import builtins
+import importlib
+import sys
+import typing as t
+
+if t.TYPE_CHECKING:
+    from IPython.core.interactiveshell import InteractiveShell
+
+
+class LazyImport:
+    """The value of a name bound by an import statement.
+
+    ``import a.b`` binds ``a`` once ``a.b`` is imported (``top=True``),
+    ``import a.b as c`` binds ``a.b`` and ``from a.b import c`` binds
+    ``a.b``'s attribute, or submodule, ``c``. ``modules`` are the modules
+    imported, for the value of the last one.
+    """
+
+    __slots__ = ("attr", "hidden", "modules", "top")
+
+    def __init__(
+        self,
+        module: str,
+        attr: str | None = None,
+        top: bool = False,
+        hidden: bool = True,
+    ) -> None:
+        self.modules: tuple[str, ...] = (module,)
+        self.attr = attr
+        self.top = top
+        self.hidden = hidden
+
+    @property
+    def module(self) -> str:
+        return self.modules[-1]
+
+    def value(self, import_: bool = True) -> t.Any:
+        """The value of the name, importing the modules if import_ is true.
+
+        Raises KeyError if the modules need to be imported and import_ is
+        false.
+        """
+        if not import_ and not all(m in sys.modules for m in self.modules):
+            raise KeyError(self.module)
+        for module in self.modules:
+            importlib.import_module(module)
+        if self.attr is None:
+            return sys.modules[self.module.partition(".")[0] if self.top else self.module]
+        try:
+            return getattr(sys.modules[self.module], self.attr)
+        except AttributeError:
+            if not import_:
+                raise KeyError(f"{self.module}.{self.attr}") from None
+            return importlib.import_module(f"{self.module}.{self.attr}")
+
+    def __repr__(self) -> str:
+        attr = f".{self.attr}" if self.attr is not None else ""
+        return f"<lazy import of {self.module}{attr}>"
+
+
+class LazyStarImport:
+    """The names bound by ``from module import *``.
+
+    ``shadowed`` are the names bound by the user since, which it does not
+    bind anymore.
+    """
+
+    __slots__ = ("hidden", "module", "shadowed")
+
+    def __init__(self, module: str, hidden: bool = True) -> None:
+        self.module = module
+        self.hidden = hidden
+        self.shadowed: set[str] = set()
+
+    def values(self, import_: bool = True) -> dict[str, t.Any]:
+        """The names and their values, see :meth:`LazyImport.value`."""
+        if import_:
+            module = importlib.import_module(self.module)
+        elif self.module in sys.modules:
+            module = sys.modules[self.module]
+        else:
+            raise KeyError(self.module)
+        ns = vars(module)
+        names = getattr(module, "__all__", None)
+        if names is None:
+            names = [name for name in ns if not name.startswith("_")]
+        return {
+            name: getattr(module, name) for name in names if name not in self.shadowed
+        }
+
+    def __repr__(self) -> str:
+        return f"<lazy import of * from {self.module}>"
+
+
+def import_bindings(
+    source: str | bytes, hidden: bool = True
+) -> list[tuple[str | None, LazyImport | LazyStarImport]] | None:
+    """The (name, binding) pairs of source, if it only imports modules.
+
+    Star imports have None as name. Returns None if source does anything else
+    than importing modules (docstrings are allowed), or if it has relative
+    imports.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    bindings: list[tuple[str | None, LazyImport | LazyStarImport]] = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname is None:
+                    name = alias.name.partition(".")[0]
+                    binding = LazyImport(alias.name, top=True, hidden=hidden)
+                else:
+                    name = alias.asname
+                    binding = LazyImport(alias.name, hidden=hidden)
+                bindings.append((name, binding))
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            if node.module == "__future__":
+                return None
+            for alias in node.names:
+                if alias.name == "*":
+                    bindings.append((None, LazyStarImport(node.module, hidden)))
+                else:
+                    binding = LazyImport(node.module, alias.name, hidden=hidden)
+                    bindings.append((alias.asname or alias.name, binding))
+        elif not (
+            isinstance(node, ast.Expr)
+            and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str)
+        ):
+            return None
+    return bindings
+
+
+def _used_names(node: ast.AST) -> set[str]:
+    """The global names code might load: the names loaded by node, except
+    the ones it binds itself."""
+    loaded: set[str] = set()
+    bound: set[str] = set()
+    for n in ast.walk(node):
+        if isinstance(n, ast.Name):
+            (loaded if isinstance(n.ctx, ast.Load) else bound).add(n.id)
+        elif isinstance(n, ast.arg):
+            bound.add(n.arg)
+        elif isinstance(n, ast.alias):
+            bound.add(n.asname or n.name.partition(".")[0])
+        elif isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(n.name)
+    return loaded - bound
+
+
+def _bound_names(node: ast.AST) -> set[str]:
+    """The global names code binds (or deletes): the names bound by node in
+    its own scope, not in the functions, classes, lambdas and comprehensions
+    it defines, unless they are declared global there."""
+    bound: set[str] = set()
+    todo = [node]
+    while todo:
+        n = todo.pop()
+        if isinstance(n, ast.Name):
+            if not isinstance(n.ctx, ast.Load):
+                bound.add(n.id)
+        elif isinstance(n, ast.alias):
+            if n.name != "*":
+                bound.add(n.asname or n.name.partition(".")[0])
+        elif isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(n.name)
+            continue
+        elif isinstance(n, ast.Lambda):
+            continue
+        elif isinstance(n, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            # only the assignment expressions bind names outside of them
+            bound.update(
+                c.target.id
+                for c in ast.walk(n)
+                if isinstance(c, ast.NamedExpr) and isinstance(c.target, ast.Name)
+            )
+            continue
+        elif isinstance(n, (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)):
+            if n.name is not None:
+                bound.add(n.name)
+        elif isinstance(n, ast.MatchMapping):
+            if n.rest is not None:
+                bound.add(n.rest)
+        todo.extend(ast.iter_child_nodes(n))
+    for n in ast.walk(node):
+        if isinstance(n, ast.Global):
+            bound.update(n.names)
+    return bound
+
+
+def code_names(node: ast.AST) -> tuple[set[str], set[str]]:
+    """The global names the code of node may load, and the ones it binds,
+    for :meth:`LazyNamespace.prepare`."""
+    return _used_names(node), _bound_names(node)
+
+
+class LazyNamespace:
+    """The names of the user namespace of a shell bound on first use.
+
+    The names imported explicitly are bound before code loading them runs,
+    if they are not defined in the user namespace then. The names of star
+    imports are not known before importing their module: star imports are
+    run before code loading a name which is neither defined in the user
+    namespace, nor a builtin, and only bind the names which are not defined.
+
+    Bindings whose modules have already been imported when they are added
+    are bound right away, as binding them costs nothing.
+    """
+
+    def __init__(self, shell: InteractiveShell) -> None:
+        self.shell = shell
+        self.imports: dict[str, LazyImport] = {}
+        self.star_imports: list[LazyStarImport] = []
+        # changes whenever the names change, for the completer
+        self.generation = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.imports or self.star_imports)
+
+    def __contains__(self, name: str) -> bool:
+        if name in self.imports:
+            return True
+        try:
+            self.peek(name)
+        except KeyError:
+            return False
+        return True
+
+    def names(self) -> list[str]:
+        """The names not bound yet, of star imports only if their module has
+        already been imported."""
+        names = list(self.imports)
+        for star in self.star_imports:
+            if star.module in sys.modules:
+                names.extend(star.values(import_=False))
+        return names
+
+    def visible_names(self) -> list[str]:
+        """The names not bound yet which %who shows."""
+        return [name for name, b in self.imports.items() if not b.hidden]
+
+    def add(
+        self,
+        name: str | None,
+        binding: LazyImport | LazyStarImport,
+        ns: dict | None = None,
+    ) -> None:
+        """Bind name (None for star imports) on first use.
+
+        If its module is already imported, it is bound right away, in ns if
+        given rather than in the user namespace.
+        """
+        self.generation += 1
+        if isinstance(binding, LazyStarImport):
+            try:
+                self._bind(binding.values(import_=False), binding.hidden, ns)
+            except KeyError:
+                self.star_imports.append(binding)
+            return
+        assert name is not None
+        previous = self.imports.pop(name, None)
+        if previous is not None and previous.top and binding.top:
+            # import a.b; import a.c
+            binding.modules = previous.modules + binding.modules
+        try:
+            value = binding.value(import_=False)
+        except KeyError:
+            self.imports[name] = binding
+        else:
+            self._bind({name: value}, binding.hidden, ns)
+
+    def add_source(
+        self, source: str | bytes, hidden: bool = True, ns: dict | None = None
+    ) -> bool:
+        """Add the bindings of source, if it only imports modules.
+
+        Returns whether it did, see :func:`import_bindings` and :meth:`add`.
+        """
+        bindings = import_bindings(source, hidden)
+        if bindings is None:
+            return False
+        for name, binding in bindings:
+            self.add(name, binding, ns)
+        return True
+
+    def peek(self, name: str, import_: bool = False) -> t.Any:
+        """The value name will be bound to, without binding it.
+
+        Raises KeyError if name is not a lazy binding, or if its module needs
+        to be imported and import_ is false.
+        """
+        if name in self.imports:
+            return self.imports[name].value(import_)
+        for star in reversed(self.star_imports):
+            if star.module in sys.modules or import_:
+                values = star.values(import_)
+                if name in values:
+                    return values[name]
+        raise KeyError(name)
+
+    def load(self, names: t.Iterable[str]) -> set[str]:
+        """Bind the names which are lazy bindings not defined yet.
+
+        Returns the names which were bound.
+        """
+        user_ns = self.shell.user_ns
+        missing = {name for name in names if name not in user_ns}
+        if not missing:
+            return set()
+        self.generation += 1
+        bound = set()
+        for name in sorted(missing & self.imports.keys()):
+            binding = self.imports.pop(name)
+            try:
+                value = binding.value()
+            except Exception:
+                self.shell.showtraceback()
+                continue
+            self._bind({name: value}, binding.hidden)
+            bound.add(name)
+        unknown = missing - bound - vars(builtins).keys()
+        if unknown and self.star_imports:
+            bound.update(self._load_star_imports())
+        return bound
+
+    def load_all(self) -> set[str]:
+        """Bind all the lazy bindings."""
+        bound = self.load(list(self.imports))
+        if self.star_imports:
+            self.generation += 1
+            bound.update(self._load_star_imports())
+        return bound
+
+    def _load_star_imports(self) -> set[str]:
+        user_ns = self.shell.user_ns
+        bound: set[str] = set()
+        stars, self.star_imports = self.star_imports, []
+        # the last star import wins, as when running them in order
+        for star in reversed(stars):
+            try:
+                values = star.values()
+            except Exception:
+                self.shell.showtraceback()
+                continue
+            values = {
+                k: v
+                for k, v in values.items()
+                if k not in user_ns and k not in self.imports
+            }
+            self._bind(values, star.hidden)
+            bound.update(values)
+        return bound
+
+    def visit(self, node: ast.AST) -> ast.AST:
+        """Bind the names the code of node may use, and forget the lazy
+        bindings of the names it binds itself, which replace them, see
+        :meth:`~IPython.core.interactiveshell.InteractiveShell.transform_ast`.
+        """
+        if self:
+            self.prepare(code_names(node))
+        return node
+
+    def prepare(self, names: tuple[t.Iterable[str], t.Iterable[str]]) -> None:
+        """Bind the names code may load, and forget the lazy bindings of the
+        names it binds, given by :func:`code_names`."""
+        used, bound = names
+        self.load(used)
+        self.shadow(bound)
+
+    def shadow(self, names: t.Iterable[str]) -> None:
+        """Forget the lazy bindings of names, which the user binds."""
+        names = set(names)
+        shadowed = names & self.imports.keys()
+        for name in shadowed:
+            del self.imports[name]
+        for star in self.star_imports:
+            star.shadowed.update(names)
+        if shadowed or self.star_imports:
+            self.generation += 1
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.imports.clear()
+        self.star_imports.clear()
+
+    def _bind(
+        self, values: dict[str, t.Any], hidden: bool, ns: dict | None = None
+    ) -> None:
+        if ns is not None:
+            ns.update(values)
+            return
+        self.shell.user_ns.update(values)
+        if hidden:
+            self.shell.user_ns_hidden.update(values)
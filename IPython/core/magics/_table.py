@@ -55,6 +55,7 @@
         "alias_magic": "IPython.core.magics.basic:BasicMagics",
         "colors": "IPython.core.magics.basic:BasicMagics",
         "doctest_mode": "IPython.core.magics.basic:BasicMagics",
+        "formatterstats": "IPython.core.magics.basic:BasicMagics",
         "gui": "IPython.core.magics.basic:BasicMagics",
         "lsmagic": "IPython.core.magics.basic:BasicMagics",
         "magic": "IPython.core.magics.basic:BasicMagics",
@@ -77,6 +78,7 @@
         "debug": "IPython.core.magics.execution:ExecutionMagics",
         "macro": "IPython.core.magics.execution:ExecutionMagics",
         "pdb": "IPython.core.magics.execution:ExecutionMagics",
+        "phasetimes": "IPython.core.magics.execution:ExecutionMagics",
         "prun": "IPython.core.magics.execution:ExecutionMagics",
         "run": "IPython.core.magics.execution:ExecutionMagics",
         "tb": "IPython.core.magics.execution:ExecutionMagics",
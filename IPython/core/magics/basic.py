@@ -576,6 +576,65 @@ def precision(self, s=''):
         ptformatter.float_precision = s
         return ptformatter.float_format
 
+    @line_magic
+    def formatterstats(self, parameter_s=""):
+        """Report which formatters the display of objects spends time in.
+
+        Usage::
+
+          %formatterstats [on|off] [-n N] [-r]
+
+        With ``on`` (or ``off``), start (or stop) recording how many times
+        each formatter runs and how long it takes, for each MIME type and type
+        of the displayed objects. This sets ``DisplayFormatter.record_stats``.
+
+        Otherwise, print the formatters which took the most time in total,
+        with how many times they ran, how many of them returned data, and the
+        total, mean and maximum time they took, in milliseconds.
+        ``mimebundle`` stands for ``_repr_mimebundle_``. The hits and misses of
+        the cache of the printers registered for each type are also shown.
+
+        Options:
+
+        -n N
+          Only show the N slowest formatters (default: 20).
+
+        -r
+          Reset the recorded times (after printing them).
+        """
+        opts, arg = self.parse_options(parameter_s, "n:r")
+        display_formatter = self.shell.display_formatter
+        stats = display_formatter.stats
+        arg = arg.strip()
+        if arg in ("on", "off"):
+            display_formatter.record_stats = arg == "on"
+        elif arg:
+            raise UsageError(f"%formatterstats: expected 'on' or 'off', got {arg!r}")
+        elif not stats.calls:
+            print(
+                "No formatter times recorded%s."
+                % ("" if display_formatter.record_stats else ", use %formatterstats on")
+            )
+        else:
+            try:
+                limit = int(opts.get("n", 20))
+            except ValueError as e:
+                raise UsageError("%formatterstats: -n expects an integer") from e
+            print("Times in ms")
+            print(stats.report(limit))
+            lookups = [
+                (format_type, formatter.lookup_hits, formatter.lookup_misses)
+                for format_type, formatter in display_formatter.formatters.items()
+                if getattr(formatter, "lookup_misses", 0)
+            ]
+            if lookups:
+                print()
+                print(f"{'printer lookups':<24}{'hits':>7}{'misses':>7}")
+                for format_type, hits, misses in lookups:
+                    print(f"{format_type:<24}{hits:>7}{misses:>7}")
+        if "r" in opts:
+            stats.clear()
+
     @magic_arguments.magic_arguments()
     @magic_arguments.argument(
         'filename', type=str,
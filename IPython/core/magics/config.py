@@ -56,12 +56,14 @@ def config(self, s):
             Available objects for config:
                 AliasManager
                 DisplayFormatter
+                DisplayPublisher
                 HistoryManager
                 IPCompleter
                 LoggingMagics
                 MagicsManager
                 OSMagics
                 PrefilterManager
+                RichPromptDisplayHook
                 ScriptMagics
                 TerminalInteractiveShell
 
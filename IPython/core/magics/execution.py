@@ -1548,6 +1548,50 @@ def macro(self, parameter_s=''):
             print("=== Macro contents: ===")
             print(macro, end=" ")
 
+    @line_magic
+    def phasetimes(self, parameter_s=""):
+        """Report where the time goes when running cells.
+
+        Usage::
+
+          %phasetimes [on|off] [-r]
+
+        With ``on`` (or ``off``), start (or stop) recording how long each phase
+        of running a cell takes: input transformations, prefiltering, parsing,
+        AST transformations, compiling, running the code, displaying the result,
+        writing history and calling the event callbacks. This sets
+        ``InteractiveShell.record_phase_times``.
+
+        Otherwise, print, for each phase, how many of the recorded cells went
+        through it, the total time spent in it, and percentiles of the time a
+        cell spent in it, in milliseconds. The time of phases nested in another
+        one (e.g. displaying the result of an expression while running the
+        code) is only counted for the nested phase. ``total`` is the whole
+        time spent running each cell.
+
+        Options:
+
+        -r
+          Reset the recorded times (after printing them).
+        """
+        opts, arg = self.parse_options(parameter_s, "r")
+        stats = self.shell.phase_stats
+        arg = arg.strip()
+        if arg in ("on", "off"):
+            self.shell.record_phase_times = arg == "on"
+        elif arg:
+            raise UsageError(f"%phasetimes: expected 'on' or 'off', got {arg!r}")
+        elif not stats.cells:
+            print(
+                "No cell times recorded%s."
+                % ("" if self.shell.record_phase_times else ", use %phasetimes on")
+            )
+        else:
+            print("%d cells, times in ms" % stats.cells)
+            print(stats.report())
+        if "r" in opts:
+            stats.clear()
+
     @magic_arguments.magic_arguments()
     @magic_arguments.argument(
         "output",
@@ -105,6 +105,14 @@ class HistoryMagics(Magics):
         help="""
         when searching history using `-g`, show only unique history.
         """)
+    @argument(
+        '-r', dest='rank', action='store_true',
+        help="""
+        when searching history using `-g`, show the entries containing all the
+        given words, in any order, sorted by relevance (best match last)
+        rather than by date. This is fastest with
+        `HistoryManager.full_text_search` enabled.
+        """)
     @argument('range', nargs='*')
     @skip_doctest
     @line_magic
@@ -196,7 +204,13 @@ def _format_lineno(session, line):
         limit = None if args.limit is _unspecified else args.limit
 
         range_pattern = False
-        if args.pattern is not None and not args.range:
+        if args.pattern and args.rank and not args.range:
+            hist = history_manager.search_text(
+                " ".join(args.pattern), raw=raw, output=get_output, n=limit
+            )
+            hist = reversed(list(hist))
+            print_nums = True
+        elif args.pattern is not None and not args.range:
             if args.pattern:
                 pattern = "*" + " ".join(args.pattern) + "*"
             else:
@@ -279,6 +279,13 @@ def who_ls(self, parameter_s=''):
         if typelist:
             typeset = set(typelist)
             out = [i for i in out if type(user_ns[i]).__name__ in typeset]
+        else:
+            # names bound on first use, whose type is not known yet
+            out.extend(
+                i
+                for i in self.shell.lazy_ns.visible_names()
+                if not i.startswith("_") and i not in user_ns
+            )
 
         out.sort()
         return out
@@ -418,7 +425,9 @@ def type_name(v):
             tn = type(v).__name__
             return abbrevs.get(tn,tn)
 
-        varlist = [self.shell.user_ns[n] for n in varnames]
+        user_ns = self.shell.user_ns
+        lazy_imports = self.shell.lazy_ns.imports
+        varlist = [user_ns[n] if n in user_ns else lazy_imports[n] for n in varnames]
 
         typelist = []
         for vv in varlist:
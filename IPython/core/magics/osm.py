@@ -209,13 +209,15 @@ def rehashx(self, parameter_s=''):
         '|'-separated string of extensions, stored in the IPython config
         variable win_exec_ext.  This defaults to 'exe|com|bat'.
 
-        This function also resets the root module cache of module completer,
-        used on slow filesystems.
+        This function also rebuilds the index of the modules used to complete
+        imports, in the background.
         """
         from IPython.core.alias import InvalidAliasError
 
-        # for the benefit of module completer in ipy_completers.py
-        del self.shell.db['rootmodules_cache']
+        module_index = getattr(self.shell, "module_index", None)
+        if module_index is not None:
+            module_index.clear()
+            module_index.refresh()
 
         path = [os.path.abspath(os.path.expanduser(p)) for p in
             os.environ.get('PATH','').split(os.pathsep)]
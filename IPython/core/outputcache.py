@@ -0,0 +1,246 @@
+"""The output history (``Out``/``_oh``), bounded by memory use.
+
+:class:`OutputCache` is the dictionary holding the results of the cells, by
+execution count. It keeps track of how much memory each result uses
+(approximately, see :func:`estimate_size`) while ``max_bytes`` is set, and
+evicts the least recently used results to stay under it. Evicted results can
+be pickled to a temporary directory instead of being lost, and are then loaded
+back when they are looked up again with ``Out[n]``.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import sys
+import typing as t
+import weakref
+from pathlib import Path
+
+# Containers are measured from at most this many of their items.
+_SAMPLE_SIZE = 100
+# ... and this many levels deep.
+_MAX_DEPTH = 2
+
+
+def estimate_size(obj: t.Any, _depth: int = 0) -> int:
+    """Approximate number of bytes used by obj, including what it holds.
+
+    NumPy arrays count their buffer (``nbytes``), pandas objects their
+    ``memory_usage()`` (without inspecting the Python objects in object
+    columns). Other objects count ``sys.getsizeof`` (so ``__sizeof__``
+    methods are honoured) plus, for builtin containers, an estimate of their
+    items made from a sample of them.
+    """
+    # Only check for NumPy and pandas objects if they are already imported:
+    # the result can't be one of theirs otherwise.
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(obj, np.ndarray):
+        return max(sys.getsizeof(obj), int(obj.nbytes))
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        try:
+            usage = obj.memory_usage(deep=False)
+            return int(usage.sum() if hasattr(usage, "sum") else usage)
+        except Exception:
+            pass
+    try:
+        size = sys.getsizeof(obj)
+    except Exception:
+        # e.g. a __sizeof__ returning something odd
+        return 0
+    if _depth >= _MAX_DEPTH:
+        return size
+    items: t.Iterable[t.Any]
+    if type(obj) in (list, tuple, set, frozenset):
+        items = obj
+    elif type(obj) is dict:
+        items = (x for item in obj.items() for x in item)
+    else:
+        return size
+    n = len(obj) * (2 if type(obj) is dict else 1)
+    if not n:
+        return size
+    sample = 0
+    counted = 0
+    for item in items:
+        sample += estimate_size(item, _depth + 1)
+        counted += 1
+        if counted >= _SAMPLE_SIZE:
+            break
+    return size + sample * n // counted
+
+
+def _remove_spill_dir(path: Path) -> None:
+    import shutil
+
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class OutputCache(dict):
+    """A dictionary of the results of cells, bounded by memory use.
+
+    Attributes
+    ----------
+    max_bytes : int
+        When positive, the least recently used entries are evicted whenever
+        the entries use more than this many bytes in total. The most recent
+        entry is never evicted.
+    spill : bool
+        If True, evicted entries are pickled to a temporary directory (if they
+        can be pickled), and loaded back by ``cache[n]``.
+    on_evict : callable or None
+        Called with the key of each evicted entry, e.g. to remove other
+        references to it.
+    nbytes : int
+        The estimated memory use of the entries held in memory. Only tracked
+        while ``max_bytes`` is positive, it is 0 otherwise.
+    """
+
+    max_bytes: int = 0
+    spill: bool = False
+    on_evict: t.Callable[[t.Any], None] | None = None
+
+    def __init__(self, *args: t.Any, **kwargs: t.Any) -> None:
+        super().__init__()
+        # key -> estimated size, least recently used first
+        self._sizes: dict[t.Any, int] = {}
+        # key -> pickle file of the evicted entries
+        self._spilled: dict[t.Any, Path] = {}
+        self._spill_dir: Path | None = None
+        self._n_spills = 0
+        self.nbytes = 0
+        # whether the sizes are estimated, i.e. max_bytes was set when the
+        # entries were added
+        self._measured = True
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key: t.Any, value: t.Any) -> None:
+        self._forget(key)
+        super().__setitem__(key, value)
+        if self.max_bytes > 0 and self._measured:
+            size = estimate_size(value)
+        else:
+            # measured by cull() once there is a limit
+            size = 0
+            self._measured = False
+        self._sizes[key] = size
+        self.nbytes += size
+        self.cull()
+
+    def __getitem__(self, key: t.Any) -> t.Any:
+        value = super().__getitem__(key)
+        if key in self._sizes:
+            # mark as recently used
+            self._sizes[key] = self._sizes.pop(key)
+        return value
+
+    def __missing__(self, key: t.Any) -> t.Any:
+        path = self._spilled.pop(key, None)
+        if path is None:
+            raise KeyError(key)
+        import pickle
+
+        with path.open("rb") as f:
+            value = pickle.load(f)
+        path.unlink()
+        self[key] = value
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return super().__contains__(key) or key in self._spilled
+
+    def __delitem__(self, key: t.Any) -> None:
+        if not super().__contains__(key) and key in self._spilled:
+            self._spilled.pop(key).unlink(missing_ok=True)
+            return
+        super().__delitem__(key)
+        self.nbytes -= self._sizes.pop(key, 0)
+
+    def get(self, key: t.Any, default: t.Any = None) -> t.Any:
+        if key in self:
+            return self[key]
+        return default
+
+    _marker = object()
+
+    def pop(self, key: t.Any, default: t.Any = _marker) -> t.Any:
+        # use del rather than pop to drop a spilled entry without loading it
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default is self._marker:
+            raise KeyError(key)
+        return default
+
+    def update(self, *args: t.Any, **kwargs: t.Any) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self) -> None:
+        super().clear()
+        self._sizes.clear()
+        self.nbytes = 0
+        self._measured = True
+        for path in self._spilled.values():
+            path.unlink(missing_ok=True)
+        self._spilled.clear()
+
+    @property
+    def spilled(self) -> list[t.Any]:
+        """The keys of the entries which are on disk."""
+        return list(self._spilled)
+
+    def cull(self) -> list[t.Any]:
+        """Evict the least recently used entries until under ``max_bytes``.
+
+        Returns the evicted keys.
+        """
+        evicted: list[t.Any] = []
+        if self.max_bytes <= 0:
+            return evicted
+        if not self._measured:
+            for key in self._sizes:
+                self._sizes[key] = estimate_size(super().__getitem__(key))
+            self.nbytes = sum(self._sizes.values())
+            self._measured = True
+        while self.nbytes > self.max_bytes and len(self._sizes) > 1:
+            key = next(iter(self._sizes))
+            value = super().pop(key)
+            self.nbytes -= self._sizes.pop(key)
+            if self.spill:
+                self._spill_entry(key, value)
+            evicted.append(key)
+            if self.on_evict is not None:
+                self.on_evict(key)
+        return evicted
+
+    def _forget(self, key: t.Any) -> None:
+        """Drop any previous entry for key."""
+        if super().__contains__(key):
+            super().__delitem__(key)
+            self.nbytes -= self._sizes.pop(key, 0)
+        elif key in self._spilled:
+            self._spilled.pop(key).unlink(missing_ok=True)
+
+    def _spill_entry(self, key: t.Any, value: t.Any) -> None:
+        import pickle
+
+        if self._spill_dir is None:
+            import tempfile
+
+            self._spill_dir = Path(tempfile.mkdtemp(prefix="ipython-output-"))
+            weakref.finalize(self, _remove_spill_dir, self._spill_dir)
+        self._n_spills += 1
+        path = self._spill_dir / ("%d.pickle" % self._n_spills)
+        try:
+            with path.open("wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # not picklable (or no space left): the entry is lost, as
+            # without spilling
+            path.unlink(missing_ok=True)
+            return
+        self._spilled[key] = path
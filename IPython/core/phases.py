@@ -0,0 +1,150 @@
+"""Timing the phases of running a cell.
+
+When ``InteractiveShell.record_phase_times`` is enabled, each cell run with
+:meth:`~IPython.core.interactiveshell.InteractiveShell.run_cell` gets a
+:class:`PhaseTimer`, which records when each phase of running it (input
+transformations, parsing, compiling, running the code, displaying the result,
+writing history, ...) starts and ends. The results end up on the
+:class:`~IPython.core.interactiveshell.ExecutionResult`, and in the
+:class:`PhaseStats` of the session, reported by ``%phasetimes``.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import math
+import time
+import typing as t
+
+# The phases, in the order they happen (and are reported).
+PHASES = (
+    "transform_cell",
+    "prefilter",
+    "ast_parse",
+    "transform_ast",
+    "compile",
+    "run_code",
+    "displayhook",
+    "history",
+    "events",
+)
+
+
+class _Phase:
+    __slots__ = ("name", "nested", "start", "timer")
+
+    def __init__(self, timer: PhaseTimer, name: str) -> None:
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.nested = 0.0
+        self.timer._stack.append(self)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        end = time.perf_counter()
+        timer = self.timer
+        timer._stack.pop()
+        timer.timestamps.append((self.name, self.start, end))
+        elapsed = end - self.start
+        timer.durations[self.name] = (
+            timer.durations.get(self.name, 0.0) + elapsed - self.nested
+        )
+        if timer._stack:
+            timer._stack[-1].nested += elapsed
+
+
+class PhaseTimer:
+    """Record the phases of running one cell.
+
+    Attributes
+    ----------
+    start, end : float
+        When running the cell started and ended, from :func:`time.perf_counter`.
+    timestamps : list of (name, start, end)
+        Every phase, in the order they ended. A phase can happen several times
+        (e.g. ``run_code`` for each statement), and phases can be nested (e.g.
+        ``displayhook`` in ``run_code``).
+    durations : dict
+        Time spent in each phase, in seconds, not counting the phases nested
+        in it.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.timestamps: list[tuple[str, float, float]] = []
+        self.durations: dict[str, float] = {}
+        self._stack: list[_Phase] = []
+
+    def phase(self, name: str) -> _Phase:
+        """A context manager timing the phase ``name``."""
+        return _Phase(self, name)
+
+    def stop(self) -> dict[str, float]:
+        """Stop the timer, and return the durations, with the ``total``."""
+        self.end = time.perf_counter()
+        durations = dict(self.durations)
+        durations["total"] = self.end - self.start
+        return durations
+
+
+def percentile(sorted_values: t.Sequence[float], p: float) -> float:
+    """The ``p``-th percentile of sorted_values (nearest rank)."""
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class PhaseStats:
+    """The durations of the phases of the cells run in a session."""
+
+    def __init__(self) -> None:
+        self.cells = 0
+        self.durations: dict[str, list[float]] = {}
+
+    def add(self, durations: dict[str, float]) -> None:
+        self.cells += 1
+        for name, duration in durations.items():
+            self.durations.setdefault(name, []).append(duration)
+
+    def clear(self) -> None:
+        self.cells = 0
+        self.durations.clear()
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Statistics of each phase, in seconds.
+
+        For each phase: how many cells went through it (``count``), the time
+        spent in it in total (``sum``), and the ``p50``, ``p90``, ``p99`` and
+        ``max`` of the time spent in it by a cell.
+        """
+        order = {name: i for i, name in enumerate(PHASES + ("total",))}
+        stats = {}
+        for name in sorted(self.durations, key=lambda n: (order.get(n, -1), n)):
+            values = sorted(self.durations[name])
+            stats[name] = {
+                "count": len(values),
+                "sum": sum(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+            }
+        return stats
+
+    def report(self) -> str:
+        """A table of :meth:`summary`, with times in milliseconds."""
+        columns = ("p50", "p90", "p99", "max")
+        lines = [
+            f"{'phase':<16}{'cells':>7}{'total':>11}"
+            + "".join(f"{c:>10}" for c in columns)
+        ]
+        for name, stats in self.summary().items():
+            lines.append(
+                f"{name:<16}{stats['count']:>7}{stats['sum'] * 1e3:>11.2f}"
+                + "".join(f"{stats[c] * 1e3:>10.3f}" for c in columns)
+            )
+        return "\n".join(lines)
@@ -402,31 +402,45 @@ def activate_matplotlib(backend):
     plt.draw_if_interactive = flag_calls(plt.draw_if_interactive)
 
 
-def import_pylab(user_ns, import_all=True):
+def import_pylab(user_ns, import_all=True, lazy_ns=None):
     """Populate the namespace with pylab-related values.
 
     Imports matplotlib, pylab, numpy, and everything from pylab and numpy.
 
     Also imports a few names from IPython (figsize, display, getfigs)
 
+    If lazy_ns, a :class:`~IPython.core.lazyns.LazyNamespace`, is given, the
+    names of the modules which are not imported yet are added to it, to be
+    bound when they are first used, rather than to user_ns.
     """
-
     # Import numpy as np/pyplot as plt are conventions we're trying to
     # somewhat standardize on.  Making them available to users by default
     # will greatly help this.
-    s = ("import numpy\n"
-          "import matplotlib\n"
-          "from matplotlib import pylab, mlab, pyplot\n"
-          "np = numpy\n"
-          "plt = pyplot\n"
-          )
-    exec(s, user_ns)
-
-    if import_all:
-        s = ("from matplotlib.pylab import *\n"
-             "from numpy import *\n")
+    if lazy_ns is not None:
+        s = ("import numpy\n"
+             "import matplotlib\n"
+             "from matplotlib import pylab, mlab, pyplot\n"
+             "import numpy as np\n"
+             "from matplotlib import pyplot as plt\n"
+             )
+        if import_all:
+            s += ("from matplotlib.pylab import *\n"
+                  "from numpy import *\n")
+        lazy_ns.add_source(s, ns=user_ns)
+    else:
+        s = ("import numpy\n"
+              "import matplotlib\n"
+              "from matplotlib import pylab, mlab, pyplot\n"
+              "np = numpy\n"
+              "plt = pyplot\n"
+              )
         exec(s, user_ns)
 
+        if import_all:
+            s = ("from matplotlib.pylab import *\n"
+                 "from numpy import *\n")
+            exec(s, user_ns)
+
     # IPython symbols to add
     user_ns['figsize'] = figsize
     from IPython.display import display
@@ -8,10 +8,12 @@
 
 from __future__ import annotations
 
+import fnmatch
 import glob
 from itertools import chain
 import os
 import sys
+import time
 from typing import Any
 
 from traitlets.config.application import boolean_flag
@@ -26,6 +28,8 @@
     List,
     Bool,
     CaselessStrEnum,
+    Tuple,
+    Float,
     observe,
     DottedObjectName,
     Undefined,
@@ -199,6 +203,30 @@ class InteractiveShellApp(Configurable):
     exec_lines = List(Unicode(),
         help="""lines of code to run at IPython startup."""
     ).tag(config=True)
+    cache_startup_files = Bool(
+        False,
+        help="""Cache the code compiled for the Python files run at startup
+        (startup files, exec_files and PYTHONSTARTUP if they are .py files) in
+        __pycache__ directories next to them, like imported modules, so that
+        they are only compiled again when they change.""",
+    ).tag(config=True)
+    deferred_startup_files = List(
+        Unicode(),
+        help="""Names or glob patterns (e.g. "*imports.py", matched against the
+        name and the full path of files) of Python startup files and
+        exec_files which only import modules. Instead of running them at
+        startup, the names they import are bound when they are first used
+        (see ``InteractiveShell.lazy_ns``), and their modules imported then.
+        Files which do anything else than importing modules, or have
+        relative imports, are run at startup.""",
+    ).tag(config=True)
+    report_startup_times = Bool(
+        False,
+        help="""Print how long running each startup file, exec_lines and
+        exec_files took, slowest first, once IPython has started.""",
+    ).tag(config=True)
+    # (file or line of code, seconds) for the code run at startup
+    startup_times = List(Tuple(Unicode(), Float()))
     code_to_run = Unicode("", help="Execute the given command string.").tag(config=True)
     module_to_run = Unicode("", help="Run the module as a script.").tag(config=True)
     gui = CaselessStrEnum(
@@ -354,6 +382,9 @@ def init_code(self):
         if self.hide_initial_ns:
             self.shell.user_ns_hidden.update(self.shell.user_ns)
 
+        if self.report_startup_times:
+            print(self._startup_report())
+
         # command-line execution (ipython -i script.py, ipython -m module)
         # should *not* be excluded from %whos
         self._run_cmd_line_code()
@@ -364,6 +395,26 @@ def init_code(self):
         sys.stderr.flush()
         self.shell._sys_modules_keys = set(sys.modules.keys())
 
+    def _startup_report(self):
+        """A table of startup_times, slowest first."""
+        lines = [f"{'ms':>10}  startup code"]
+        for name, seconds in sorted(self.startup_times, key=lambda x: -x[1]):
+            lines.append(f"{seconds * 1e3:>10.1f}  {name}")
+        total = sum(seconds for _, seconds in self.startup_times)
+        lines.append(f"{total * 1e3:>10.1f}  total")
+        cache = getattr(self, "_startup_code_cache", None)
+        if cache is not None:
+            lines.append(
+                f"compiled code cache: {cache.hits} hits, {cache.misses} misses"
+            )
+        lazy_ns = self.shell.lazy_ns
+        if lazy_ns:
+            names = sorted(lazy_ns.imports) + [
+                f"* from {star.module}" for star in lazy_ns.star_imports
+            ]
+            lines.append(f"bound on first use: {', '.join(names)}")
+        return "\n".join(lines)
+
     def _run_exec_lines(self):
         """Run lines of code in IPythonApp.exec_lines in the user's namespace."""
         if not self.exec_lines:
@@ -371,6 +422,7 @@ def _run_exec_lines(self):
         try:
             self.log.debug("Running code from IPythonApp.exec_lines...")
             for line in self.exec_lines:
+                start = time.perf_counter()
                 try:
                     self.log.info("Running code in user namespace: %s" %
                                   line)
@@ -379,20 +431,24 @@ def _run_exec_lines(self):
                     self.log.warning("Error in executing line in user "
                                   "namespace: %s" % line)
                     self.shell.showtraceback()
+                self.startup_times.append((line, time.perf_counter() - start))
         except Exception:
             self.log.warning("Unknown error in handling IPythonApp.exec_lines:")
             self.shell.showtraceback()
 
-    def _exec_file(self, fname, shell_futures=False):
+    def _exec_file(self, fname, shell_futures=False, defer=False):
         try:
             full_filename = filefind(fname, ['.', self.ipython_dir])
         except OSError:
             self.log.warning("File not found: %r"%fname)
             return
+        if defer and self._defer_file(full_filename):
+            return
         # Make sure that the running script gets a proper sys.argv as if it
         # were run from a system shell.
         save_argv = sys.argv
         sys.argv = [full_filename] + self.extra_args[1:]
+        start = time.perf_counter()
         try:
             if os.path.isfile(full_filename):
                 self.log.info("Running file in user namespace: %s" %
@@ -409,9 +465,47 @@ def _exec_file(self, fname, shell_futures=False):
                         self.shell.safe_execfile(full_filename,
                                                  self.shell.user_ns,
                                                  shell_futures=shell_futures,
-                                                 raise_exceptions=True)
+                                                 raise_exceptions=True,
+                                                 compiler=self._file_compiler(
+                                                     full_filename, shell_futures))
         finally:
             sys.argv = save_argv
+            self.startup_times.append((full_filename, time.perf_counter() - start))
+
+    def _file_compiler(self, filename, shell_futures):
+        """The compiler for a Python file run at startup, see cache_startup_files"""
+        if not (self.cache_startup_files and filename.endswith(".py")) or shell_futures:
+            return None
+        if getattr(self, "_startup_code_cache", None) is None:
+            from IPython.core.startupfiles import StartupCodeCache
+
+            self._startup_code_cache = StartupCodeCache()
+        return self._startup_code_cache
+
+    def _defer_file(self, filename):
+        """Defer running filename if it matches deferred_startup_files.
+
+        Returns whether it was deferred.
+        """
+        if not filename.endswith(".py") or not any(
+            fnmatch.fnmatch(os.path.basename(filename), pattern)
+            or fnmatch.fnmatch(filename, pattern)
+            for pattern in self.deferred_startup_files
+        ):
+            return False
+        try:
+            with open(filename, "rb") as f:
+                source = f.read()
+        except OSError:
+            return False
+        if not self.shell.lazy_ns.add_source(source, hidden=self.hide_initial_ns):
+            self.log.warning(
+                "Running %s at startup: it does more than importing modules.",
+                filename,
+            )
+            return False
+        self.log.debug("Binding the names imported by %s on first use.", filename)
+        return True
 
     def _run_startup_files(self):
         """Run files from profile startup directory"""
@@ -438,7 +532,7 @@ def _run_startup_files(self):
         self.log.debug("Running startup files from %s...", startup_dir)
         try:
             for fname in sorted(startup_files):
-                self._exec_file(fname)
+                self._exec_file(fname, defer=True)
         except Exception:
             self.log.warning("Unknown error in handling startup files:")
             self.shell.showtraceback()
@@ -451,7 +545,7 @@ def _run_exec_files(self):
         self.log.debug("Running files in IPythonApp.exec_files...")
         try:
             for fname in self.exec_files:
-                self._exec_file(fname)
+                self._exec_file(fname, defer=True)
         except Exception:
             self.log.warning("Unknown error in handling IPythonApp.exec_files:")
             self.shell.showtraceback()
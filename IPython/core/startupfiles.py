@@ -0,0 +1,92 @@
+"""Caching the code of the files run at IPython startup.
+
+See ``InteractiveShellApp.cache_startup_files``.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import importlib.util
+import marshal
+import os
+import sys
+from types import CodeType
+
+
+def _pyc_header(st: os.stat_result) -> bytes:
+    """The header of a timestamp based .pyc file for a source file with stat st."""
+    return b"".join(
+        [
+            importlib.util.MAGIC_NUMBER,
+            (0).to_bytes(4, "little"),
+            (int(st.st_mtime) & 0xFFFFFFFF).to_bytes(4, "little"),
+            (st.st_size & 0xFFFFFFFF).to_bytes(4, "little"),
+        ]
+    )
+
+
+class StartupCodeCache:
+    """A replacement for :func:`compile`, caching the code of files.
+
+    Code objects are cached in ``__pycache__`` directories, in the same format
+    and at the same place as the modules Python imports, and are used as long
+    as the modification time and size of the file are the same. This can be
+    passed as the ``compiler`` of
+    :meth:`~IPython.core.interactiveshell.InteractiveShell.safe_execfile`.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, source: str | bytes, filename: str, mode: str) -> CodeType:
+        filename = os.fspath(filename)
+        try:
+            cache_path = importlib.util.cache_from_source(filename)
+            header = _pyc_header(os.stat(filename))
+        except (NotImplementedError, ValueError, OSError):
+            return compile(source, filename, mode, dont_inherit=True)
+        code = self._load(cache_path, header, filename)
+        if code is not None:
+            self.hits += 1
+            return code
+        self.misses += 1
+        code = compile(source, filename, mode, dont_inherit=True)
+        if not sys.dont_write_bytecode:
+            self._write(cache_path, header + marshal.dumps(code))
+        return code
+
+    @staticmethod
+    def _load(cache_path: str, header: bytes, filename: str) -> CodeType | None:
+        try:
+            with open(cache_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if data[: len(header)] != header:
+            return None
+        try:
+            code = marshal.loads(data[len(header) :])
+        except (EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(code, CodeType) or code.co_filename != filename:
+            return None
+        return code
+
+    @staticmethod
+    def _write(cache_path: str, data: bytes) -> None:
+        # Written to a temporary file first, so that other processes starting
+        # at the same time never read a partial file.
+        tmp_path = f"{cache_path}.{os.getpid()}"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
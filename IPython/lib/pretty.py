@@ -95,6 +95,8 @@ def _repr_pretty_(self, p, cycle):
 
 from contextlib import contextmanager
 import datetime
+import heapq
+import itertools
 import os
 import re
 import sys
@@ -129,12 +131,22 @@ def _safe_getattr(obj, attr, default=None):
     except Exception:
         return default
 
-def _sorted_for_pprint(items):
+def _sorted_for_pprint(items, limit=0):
     """
     Sort the given items for pretty printing. Since some predictable
     sorting is better than no sorting at all, we sort on the string
     representation if normal sorting fails.
+
+    If limit is not 0, only the ``limit`` smallest items are returned.
     """
+    if limit and len(items) > limit:
+        try:
+            return heapq.nsmallest(limit, items)
+        except Exception:
+            try:
+                return heapq.nsmallest(limit, items, key=str)
+            except Exception:
+                return list(itertools.islice(items, limit))
     items = list(items)
     try:
         return sorted(items)
@@ -144,22 +156,30 @@ def _sorted_for_pprint(items):
         except Exception:
             return items
 
-def pretty(obj, verbose=False, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH):
+def pretty(obj, verbose=False, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH,
+           max_chars=0, max_lines=0, max_depth=0):
     """
     Pretty print the object's representation.
+
+    The output can be cut off after ``max_chars`` characters or ``max_lines``
+    lines, and the objects nested more than ``max_depth`` levels deep are
+    printed like cycles, see `RepresentationPrinter`.
     """
     stream = StringIO()
-    printer = RepresentationPrinter(stream, verbose, max_width, newline, max_seq_length=max_seq_length)
+    printer = RepresentationPrinter(stream, verbose, max_width, newline, max_seq_length=max_seq_length,
+                                    max_chars=max_chars, max_lines=max_lines, max_depth=max_depth)
     printer.pretty(obj)
     printer.flush()
     return stream.getvalue()
 
 
-def pprint(obj, verbose=False, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH):
+def pprint(obj, verbose=False, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH,
+           max_chars=0, max_lines=0, max_depth=0):
     """
     Like `pretty` but print to stdout.
     """
-    printer = RepresentationPrinter(sys.stdout, verbose, max_width, newline, max_seq_length=max_seq_length)
+    printer = RepresentationPrinter(sys.stdout, verbose, max_width, newline, max_seq_length=max_seq_length,
+                                    max_chars=max_chars, max_lines=max_lines, max_depth=max_depth)
     printer.pretty(obj)
     printer.flush()
     sys.stdout.write(newline)
@@ -192,9 +212,18 @@ class PrettyPrinter(_PrettyPrinterBase):
     generate pretty reprs of objects.  Contrary to the `RepresentationPrinter`
     this printer knows nothing about the default pprinters or the `_repr_pretty_`
     callback method.
+
+    If ``max_chars`` or ``max_lines`` are not 0, at most that many characters
+    or lines are written to the output, followed by ``...`` if it is cut off,
+    and the printer stops adding items of containers to the output once this
+    budget is spent.
     """
 
-    def __init__(self, output, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH):
+    def __init__(self, output, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH,
+                 max_chars=0, max_lines=0):
+        self._budget = None
+        if max_chars or max_lines:
+            self._budget = output = _OutputBudget(output, max_chars, max_lines, newline)
         self.output = output
         self.max_width = max_width
         self.newline = newline
@@ -287,9 +316,31 @@ def begin_group(self, indent=0, open=''):
         self.group_queue.enq(group)
         self.indentation += indent
 
+    def _budget_spent(self):
+        """Whether nothing more will be written to the output."""
+        budget = self._budget
+        if budget is None:
+            return False
+        return budget.spent or bool(
+            budget.max_chars and budget.chars + self.buffer_width > budget.max_chars
+        )
+
+    def _max_items(self):
+        """An upper bound on the number of items of a container which can be
+        shown, or 0 if there is none."""
+        limits = [self.max_seq_length] if self.max_seq_length else []
+        budget = self._budget
+        if budget is not None and budget.max_chars:
+            # all items but the first take a separator and at least 2 chars
+            left = budget.max_chars - budget.chars - self.buffer_width
+            limits.append(max(left // 3 + 1, 1))
+        return min(limits, default=0)
+
     def _enumerate(self, seq):
         """like enumerate, but with an upper limit on the number of items"""
         for idx, x in enumerate(seq):
+            if self._budget is not None and self._budget_spent():
+                return
             if self.max_seq_length and idx >= self.max_seq_length:
                 self.text(',')
                 self.breakable()
@@ -346,15 +397,24 @@ class RepresentationPrinter(PrettyPrinter):
     output.  For example the default instance repr prints all attributes and
     methods that are not prefixed by an underscore if the printer is in
     verbose mode.
+
+    If ``max_depth`` is not 0, the objects nested more than ``max_depth``
+    levels deep are printed as if they were part of a cycle, e.g. ``[...]``.
     """
 
     def __init__(self, output, verbose=False, max_width=79, newline='\n',
         singleton_pprinters=None, type_pprinters=None, deferred_pprinters=None,
-        max_seq_length=MAX_SEQ_LENGTH):
+        max_seq_length=MAX_SEQ_LENGTH, max_chars=0, max_lines=0, max_depth=0):
 
-        PrettyPrinter.__init__(self, output, max_width, newline, max_seq_length=max_seq_length)
+        PrettyPrinter.__init__(self, output, max_width, newline, max_seq_length=max_seq_length,
+                               max_chars=max_chars, max_lines=max_lines)
         self.verbose = verbose
+        self.max_depth = max_depth
         self.stack = []
+        # the ids of the objects in stack, to detect cycles
+        self._stack_ids = set()
+        self._printer_cache = {}
+        self._n_type_pprinters = self._n_deferred_pprinters = -1
         if singleton_pprinters is None:
             singleton_pprinters = _singleton_pprinters.copy()
         self.singleton_pprinters = singleton_pprinters
@@ -367,9 +427,14 @@ def __init__(self, output, verbose=False, max_width=79, newline='\n',
 
     def pretty(self, obj):
         """Pretty print the given object."""
+        if self._budget is not None and self._budget_spent():
+            return
         obj_id = id(obj)
-        cycle = obj_id in self.stack
+        in_stack = obj_id in self._stack_ids
+        if not in_stack:
+            self._stack_ids.add(obj_id)
         self.stack.append(obj_id)
+        cycle = in_stack or bool(self.max_depth and len(self.stack) > self.max_depth)
         self.begin_group()
         try:
             obj_class = _safe_getattr(obj, '__class__', None) or type(obj)
@@ -380,43 +445,71 @@ def pretty(self, obj):
                 pass
             else:
                 return printer(obj, self, cycle)
-            # Next walk the mro and check for either:
-            #   1) a registered printer
-            #   2) a _repr_pretty_ method
-            for cls in _get_mro(obj_class):
-                if cls in self.type_pprinters:
-                    # printer registered in self.type_pprinters
-                    return self.type_pprinters[cls](obj, self, cycle)
-                else:
-                    # deferred printer
-                    printer = self._in_deferred_types(cls)
-                    if printer is not None:
-                        return printer(obj, self, cycle)
-                    else:
-                        # Finally look for special method names.
-                        # Some objects automatically create any requested
-                        # attribute. Try to ignore most of them by checking for
-                        # callability.
-                        if '_repr_pretty_' in cls.__dict__:
-                            meth = cls._repr_pretty_
-                            if callable(meth):
-                                return meth(obj, self, cycle)
-                        if (
-                            cls is not object
-                            # check if cls defines __repr__
-                            and "__repr__" in cls.__dict__
-                            # check if __repr__ is callable.
-                            # Note: we need to test getattr(cls, '__repr__')
-                            #   instead of cls.__dict__['__repr__']
-                            #   in order to work with descriptors like partialmethod,
-                            and callable(_safe_getattr(cls, "__repr__", None))
-                        ):
-                            return _repr_pprint(obj, self, cycle)
-
-            return _default_pprint(obj, self, cycle)
+            # Then for the printer of the class, see _resolve_printer.
+            if (
+                len(self.type_pprinters) != self._n_type_pprinters
+                or len(self.deferred_pprinters) != self._n_deferred_pprinters
+            ):
+                # printers were added or removed
+                self._printer_cache.clear()
+            try:
+                registered, printer = self._printer_cache[obj_class]
+            except KeyError:
+                registered, printer = self._resolve_printer(obj_class)
+                self._printer_cache[obj_class] = registered, printer
+                # resolving may move deferred printers to the type registry
+                self._n_type_pprinters = len(self.type_pprinters)
+                self._n_deferred_pprinters = len(self.deferred_pprinters)
+            if registered is not None:
+                # looked up again, in case the printer was replaced
+                printer = self.type_pprinters.get(registered, printer)
+            return printer(obj, self, cycle)
         finally:
             self.end_group()
             self.stack.pop()
+            if not in_stack:
+                self._stack_ids.discard(obj_id)
+
+    def _resolve_printer(self, obj_class):
+        """Find the printer of the instances of obj_class.
+
+        Returns ``(cls, printer)`` if printer is the one registered in
+        `type_pprinters` for cls, and ``(None, printer)`` otherwise.
+        """
+        # Walk the mro and check for either:
+        #   1) a registered printer
+        #   2) a _repr_pretty_ method
+        for cls in _get_mro(obj_class):
+            if cls in self.type_pprinters:
+                # printer registered in self.type_pprinters
+                return cls, self.type_pprinters[cls]
+            else:
+                # deferred printer
+                printer = self._in_deferred_types(cls)
+                if printer is not None:
+                    return cls, printer
+                else:
+                    # Finally look for special method names.
+                    # Some objects automatically create any requested
+                    # attribute. Try to ignore most of them by checking for
+                    # callability.
+                    if '_repr_pretty_' in cls.__dict__:
+                        meth = cls._repr_pretty_
+                        if callable(meth):
+                            return None, meth
+                    if (
+                        cls is not object
+                        # check if cls defines __repr__
+                        and "__repr__" in cls.__dict__
+                        # check if __repr__ is callable.
+                        # Note: we need to test getattr(cls, '__repr__')
+                        #   instead of cls.__dict__['__repr__']
+                        #   in order to work with descriptors like partialmethod,
+                        and callable(_safe_getattr(cls, "__repr__", None))
+                    ):
+                        return None, _repr_pprint
+
+        return None, _default_pprint
 
     def _in_deferred_types(self, cls):
         """
@@ -437,6 +530,43 @@ class is not in the registry. Successful matches will be moved to the
         return printer
 
 
+class _OutputBudget:
+    """A stream writing at most ``max_chars`` characters and ``max_lines``
+    lines to ``output``, followed by ``...`` if the text is cut off."""
+
+    def __init__(self, output, max_chars=0, max_lines=0, newline='\n'):
+        self.output = output
+        self.max_chars = max_chars
+        self.max_lines = max_lines
+        self.newline = newline
+        self.chars = 0
+        self.newlines = 0
+        self.spent = False
+
+    def write(self, text):
+        if self.spent:
+            return
+        cut = None
+        if self.max_chars and self.chars + len(text) > self.max_chars:
+            cut = self.max_chars - self.chars
+        if self.max_lines and self.newline in text:
+            n = text.count(self.newline)
+            if self.newlines + n >= self.max_lines:
+                # cut after the newline ending the last line
+                end = -1
+                for _ in range(self.max_lines - self.newlines):
+                    end = text.index(self.newline, end + 1)
+                end += len(self.newline)
+                cut = end if cut is None else min(cut, end)
+            self.newlines += n
+        if cut is None:
+            self.output.write(text)
+            self.chars += len(text)
+        else:
+            self.output.write(text[:cut] + '...')
+            self.spent = True
+
+
 class Printable:
 
     def output(self, stream, output_width):
@@ -664,7 +794,8 @@ def inner(obj, p, cycle):
             p.begin_group(step, start)
             # Like dictionary keys, we will try to sort the items if there aren't too many
             if not (p.max_seq_length and len(obj) >= p.max_seq_length):
-                items = _sorted_for_pprint(obj)
+                # only the ones which can be shown
+                items = _sorted_for_pprint(obj, p._max_items())
             else:
                 items = obj
             for idx, x in p._enumerate(items):
@@ -1,8 +1,12 @@
 """IPython terminal interface using prompt_toolkit"""
 
+import asyncio
 import os
 import sys
 import inspect
+import time
+from collections import deque
+from collections.abc import Sequence
 from warnings import warn
 
 from IPython.core.async_helpers import get_asyncio_loop
@@ -34,7 +38,9 @@
 from traitlets.utils.importstring import import_item
 
 
+from prompt_toolkit.application.current import get_app
 from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+from prompt_toolkit.buffer import Buffer
 from prompt_toolkit.enums import DEFAULT_BUFFER, EditingMode
 from prompt_toolkit.filters import HasFocus, Condition, IsDone
 from prompt_toolkit.formatted_text import PygmentsTokens
@@ -163,39 +169,174 @@ def yapf_reformat_handler(text_before_cursor):
         return text_before_cursor
 
 
+class _HistoryStrings(Sequence[str]):
+    """A read-only view of the strings loaded by a :class:`PtkHistoryAdapter`,
+    oldest first, which prompt_toolkit asks for after every cell."""
+
+    def __init__(self, strings: deque[str]):
+        self._strings = strings
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._strings)[index]
+        return self._strings[index]
+
+    def __iter__(self):
+        return iter(self._strings)
+
+    def __reversed__(self):
+        return reversed(self._strings)
+
+
 class PtkHistoryAdapter(History):
     """
     Prompt toolkit has it's own way of handling history, Where it assumes it can
     Push/pull from history.
 
+    Cells accepted at the prompt are appended to an in-memory copy of the
+    history, and older entries are read from the database one page at a time.
+    Once connected to a prompt (see :meth:`connect`), the next page is read
+    right away when the user goes back through the history to the oldest entry
+    loaded, and otherwise in the background, once the text of the prompt has
+    not changed for ``idle_delay`` seconds; when not connected, the pages are
+    read one after the other when prompt_toolkit loads the history.
+
+    When the reverse search (Ctrl-R) does not match any entry loaded, the
+    history database is searched (through its full-text index, if enabled),
+    and the pages up to the most recent match are read right away.
     """
 
+    #: Number of entries read from the history database per query.
+    page_size = 1000
+
+    #: Seconds the prompt is left alone before the next pages are read.
+    idle_delay = 1.0
+
     def __init__(self, shell):
         super().__init__()
         self.shell = shell
-        self._refresh()
+        # Loaded entries, oldest first.
+        self._strings: deque[str] = deque()
+        # (session, line) of the oldest database entry read so far.
+        self._cursor: tuple[int, int] | None = None
+        self._n_read = 0
+        self._exhausted = False
+        # The buffer of the prompt the history is connected to, when its text
+        # last changed, and the event set when it reaches the oldest entry
+        # loaded.
+        self._buffer: Buffer | None = None
+        self._changed_at = 0.0
+        self._more: asyncio.Event | None = None
+        # (session, line) of the most recent database entry matching the
+        # reverse search, if it is not loaded yet.
+        self._wanted: tuple[int, int] | None = None
+        # Read the first page now, so that cells appended from here on are
+        # known to be newer than anything coming from the database.
+        self._load_page()
+
+    def connect(self, pt_app: PromptSession) -> None:
+        """Only read the next page when the prompt reaches the oldest entry,
+        or is idle."""
+        self._buffer = pt_app.default_buffer
+        self._buffer.on_text_changed.add_handler(self._check_position)
+        pt_app.search_buffer.on_text_changed.add_handler(self._check_search)
+        self._changed_at = time.monotonic()
+
+    def _check_position(self, buffer: Buffer) -> None:
+        self._changed_at = time.monotonic()
+        if self._more is not None and buffer.working_index == 0:
+            self._more.set()
+
+    def _check_search(self, search_buffer: Buffer) -> None:
+        text = search_buffer.text
+        if not text or self._exhausted or any(text in s for s in self._strings):
+            return
+        pattern = "".join(f"[{c}]" if c in "*?[" else c for c in text)
+        # the pages never reach the archived sessions
+        rows = list(
+            self.shell.history_manager.search(f"*{pattern}*", n=1, archived=False)
+        )
+        if rows and (self._cursor is None or rows[0][:2] < self._cursor):
+            self._wanted = rows[0][:2]
+            if self._more is not None:
+                self._more.set()
+
+    def _searching(self) -> bool:
+        """Whether a match of the reverse search is still to be read."""
+        if self._wanted is None:
+            return False
+        if self._cursor is not None and self._cursor <= self._wanted:
+            self._wanted = None
+            # show the match
+            get_app().invalidate()
+            return False
+        return True
 
     def append_string(self, string):
-        # we rely on sql for that.
-        self._loaded = False
-        self._refresh()
+        # The shell writes the cell to the database itself, so only the
+        # in-memory copy needs updating.
+        cell = string.rstrip()
+        # Ignore blank lines and consecutive duplicates
+        if cell and (not self._strings or self._strings[-1] != cell):
+            self._strings.append(cell)
 
-    def _refresh(self):
-        if not self._loaded:
-            self._loaded_strings = list(self.load_history_strings())
+    def get_strings(self):
+        return _HistoryStrings(self._strings)
 
-    def load_history_strings(self):
-        last_cell = ""
-        res = []
-        for __, ___, cell in self.shell.history_manager.get_tail(
-            self.shell.history_load_length, include_latest=True
-        ):
-            # Ignore blank lines and consecutive duplicates
+    def _load_page(self):
+        """Read the next page of older entries from the database.
+
+        Return the entries that were added, most recent first.
+        """
+        n = min(self.page_size, self.shell.history_load_length - self._n_read)
+        if self._exhausted or n <= 0:
+            self._exhausted = True
+            return []
+        rows = self.shell.history_manager.get_tail_page(n, before=self._cursor)
+        self._n_read += len(rows)
+        if len(rows) < n:
+            self._exhausted = True
+        added = []
+        for session, line, cell in rows:
+            self._cursor = (session, line)
             cell = cell.rstrip()
-            if cell and (cell != last_cell):
-                res.append(cell)
-                last_cell = cell
-        yield from res[::-1]
+            # Ignore blank lines and consecutive duplicates
+            if cell and (not self._strings or self._strings[0] != cell):
+                self._strings.appendleft(cell)
+                added.append(cell)
+        return added
+
+    async def load(self):
+        for cell in reversed(self._strings):
+            yield cell
+        while not self._exhausted:
+            if (
+                self._buffer is not None
+                and self._buffer.working_index != 0
+                and not self._searching()
+            ):
+                delay = self._changed_at + self.idle_delay - time.monotonic()
+                if delay > 0:
+                    self._more = asyncio.Event()
+                    try:
+                        await asyncio.wait_for(self._more.wait(), delay)
+                    except TimeoutError:
+                        # check whether the prompt is still idle
+                        continue
+                    finally:
+                        self._more = None
+            # let prompt_toolkit handle input between two pages
+            await asyncio.sleep(0)
+            for cell in self._load_page():
+                yield cell
+
+    def load_history_strings(self):
+        yield from reversed(list(self._strings))
+        while not self._exhausted:
+            yield from self._load_page()
 
     def store_string(self, string: str) -> None:
         pass
@@ -806,6 +947,13 @@ def init_display_formatter(self):
             ):
                 self.mime_renderers = terminal_default_mime_renderers
 
+    def init_display_pub(self):
+        super().init_display_pub()
+        # the terminal only displays plain text, and the types of mime_renderers
+        config = self.config
+        if not ("DisplayPublisher" in config and "mime_types" in config.DisplayPublisher):
+            self.display_pub.mime_types = ["text/plain", *self.mime_renderers]
+
     def init_prompt_toolkit_cli(self):
         if self.simple_prompt:
             # Fall back to plain non-interactive output for tests.
@@ -850,6 +998,7 @@ def prompt():
             tempfile_suffix=".py",
             **self._extra_prompt_options(),
         )
+        history.connect(self.pt_app)
         if isinstance(self.auto_suggest, NavigableAutoSuggestFromHistory):
             self.auto_suggest.connect(self.pt_app)
 
@@ -1041,6 +1190,9 @@ def interact(self):
             else:
                 if code:
                     self.run_cell(code, store_history=True)
+                    # the output is shown: call the deferred event callbacks
+                    # before prompting for the next cell
+                    self.events.run_deferred()
 
     def mainloop(self):
         # An extra layer of protection in case someone mashing Ctrl-C breaks
@@ -10,6 +10,7 @@
 
 import linecache
 import sys
+import traceback
 
 import pytest
 
@@ -63,3 +64,56 @@ def test_compiler_check_cache():
     assert any(
         k.startswith("<ipython-input-99") for k in linecache.cache
     ), "Entry for input-99 missing from linecache"
+
+
+def test_linecache_eviction():
+    cp = compilerop.CachingCompiler()
+    cp.linecache_max_cells = 2
+    sources = {n: "evicted_var_%d = %d\n" % (n, n) for n in range(1000, 1006)}
+    cp.source_loader = sources.get
+    names = {}
+    for n, src in sources.items():
+        names[n] = cp.cache(src, n)
+        code = cp(src, names[n], "exec")
+        if n == 1001:
+            # a live code object keeps its cell in linecache
+            kept = code
+    assert names[1001] in linecache.cache
+    assert names[1005] in linecache.cache
+    assert names[1000] not in linecache.cache
+    # evicted cells are loaded back when asked for
+    assert linecache.getline(names[1000], 1) == sources[1000]
+    assert names[1000] in linecache.cache
+    # ... unless the source found no longer matches
+    sources[1002] = "changed = 1\n"
+    assert linecache.getlines(names[1002]) == []
+    del kept
+
+
+def test_linecache_eviction_traceback():
+    cp = compilerop.CachingCompiler()
+    cp.linecache_max_cells = 1
+    sources = {n: "1 / 0  # evicted cell %d\n" % n for n in range(2000, 2003)}
+    cp.source_loader = sources.get
+    names = {n: cp.cache(src, n) for n, src in sources.items()}
+    assert names[2000] not in linecache.cache
+    # a traceback through the evicted cell still shows its source
+    try:
+        exec(compile(sources[2000], names[2000], "exec"), {})
+    except ZeroDivisionError as e:
+        tb = "".join(traceback.format_exception(e))
+    assert "evicted cell 2000" in tb
+
+
+def test_linecache_eviction_bounded(monkeypatch):
+    monkeypatch.setattr(compilerop, "_EVICTED_MAX", 3)
+    cp = compilerop.CachingCompiler()
+    cp.linecache_max_cells = 1
+    sources = {n: "evicted_bound_%d = 1\n" % n for n in range(3000, 3010)}
+    cp.source_loader = sources.get
+    names = [cp.cache(src, n) for n, src in sources.items()]
+    assert len(compilerop._evicted) == 3
+    assert names[-3] in compilerop._evicted
+    # entries dropped from the bound are not loaded back anymore
+    assert linecache.getlines(names[0]) == []
+    assert linecache.getlines(names[-3]) == [sources[3007]]
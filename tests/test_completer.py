@@ -8,6 +8,8 @@
 import pytest
 import sys
 import textwrap
+import threading
+import time
 import types
 import random
 
@@ -1793,6 +1795,53 @@ def test_object_key_completion():
     assert "qwerty" in matches
     assert "qwick" in matches
 
+def test_completion_cache():
+    """Longer prefixes filter the cached candidates, until the namespace changes"""
+    ip = get_ipython()
+    completer = ip.Completer
+    cache = completer._completion_cache
+    calls = []
+
+    class Counted(KeyCompletable):
+        def _ipython_key_completions_(self):
+            calls.append(1)
+            return super()._ipython_key_completions_()
+
+    ip.push({"counted": Counted(["qwerty", "qwick", "asdf"])})
+    hits = cache.hits
+    _, matches = completer.complete(line_buffer="counted['q")
+    assert set(matches) == {"qwerty", "qwick"}
+    _, matches = completer.complete(line_buffer="counted['qwe")
+    assert matches == ["qwerty"]
+    assert len(calls) == 1
+    assert cache.hits > hits
+
+    # names: narrowing keeps the abbreviated snake_case matches
+    ip.push({"cache_test_name": 1, "c_t_other": 2})
+    assert {"cache_test_name", "c_t_other"} <= set(completer.global_matches("c_"))
+    assert {"cache_test_name", "c_t_other"} <= set(completer.global_matches("c_t_"))
+    assert set(completer.global_matches("c_t_o")) == {"c_t_other"}
+
+    # changing the namespace invalidates the cache
+    ip.run_cell("ctn_new = 3")
+    assert "ctn_new" in completer.global_matches("ctn")
+    ip.run_cell("counted.things.append('qwertz')")
+    _, matches = completer.complete(line_buffer="counted['qwe")
+    assert set(matches) == {"qwerty", "qwertz"}
+    assert len(calls) == 2
+    ip.del_var("ctn_new")
+    assert "ctn_new" not in completer.global_matches("ctn")
+    ip.run_cell("del counted, cache_test_name, c_t_other")
+
+    completer.completion_cache_size = 0
+    try:
+        assert len(cache) == 0
+        assert completer.global_matches("ctn") == []
+        assert len(cache) == 0
+    finally:
+        completer.completion_cache_size = 256
+
+
 def test_class_key_completion():
     ip = get_ipython()
     NamedInstanceClass("qwerty")
@@ -2094,6 +2143,122 @@ def _(expected):
         a_matcher.matcher_priority = 3
         _(["completion_a"])
 
+def test_parallel_matchers():
+    release = threading.Event()
+
+    @completion_matcher(identifier="slow_matcher", priority=2, api_version=2)
+    def slow_matcher(context):
+        release.wait(5)
+        return {"completions": [SimpleCompletion("completion_slow")]}
+
+    @completion_matcher(identifier="a_matcher", priority=1, api_version=2)
+    def a_matcher(context):
+        result = {"completions": [SimpleCompletion("completion_a")]}
+        if context.token == "suppress":
+            result["suppress"] = True
+        return result
+
+    @completion_matcher(identifier="b_matcher")
+    def b_matcher(text):
+        return ["completion_b"]
+
+    def _(text, expected):
+        s, matches = c.complete(text)
+        assert expected == matches
+
+    ip = get_ipython()
+    c = ip.Completer
+    try:
+        with custom_matchers([slow_matcher, a_matcher, b_matcher]):
+            c.use_jedi = False
+            c.parallel_matchers = True
+            c.matcher_timeouts = {"slow_matcher": 0.05}
+
+            # the slow matcher is skipped, without holding up the others
+            start = time.monotonic()
+            _("completion_", ["completion_a", "completion_b"])
+            _("suppress", ["completion_a"])
+            assert time.monotonic() - start < 2
+
+            # results are merged as when run sequentially
+            release.set()
+            c._matcher_futures["slow_matcher"].result(timeout=5)
+            c.matcher_timeouts = {}
+            _("completion_", ["completion_a", "completion_b", "completion_slow"])
+            _("suppress", ["completion_a"])
+            c.parallel_matchers = False
+            _("completion_", ["completion_a", "completion_b", "completion_slow"])
+            _("suppress", ["completion_a"])
+    finally:
+        release.set()
+        c.parallel_matchers = False
+        c.matcher_timeouts = {}
+
+def test_parallel_matchers_hung():
+    release = threading.Event()
+    calls = []
+
+    @completion_matcher(identifier="hung_matcher", priority=2, api_version=2)
+    def hung_matcher(context):
+        calls.append(context.token)
+        release.wait(10)
+        return {"completions": [SimpleCompletion("completion_hung")]}
+
+    @completion_matcher(identifier="fast_matcher", priority=1, api_version=2)
+    def fast_matcher(context):
+        return {"completions": [SimpleCompletion("completion_fast")]}
+
+    ip = get_ipython()
+    c = ip.Completer
+    try:
+        with custom_matchers([hung_matcher, fast_matcher]):
+            c.use_jedi = False
+            c.parallel_matchers = True
+            c.matcher_timeouts = {"hung_matcher": 0.05}
+            # the hung matcher is not run again while it is still running, so
+            # it does not take all the workers keystroke after keystroke
+            for _ in range(10):
+                _, matches = c.complete("completion_")
+                assert matches == ["completion_fast"]
+            assert calls == ["completion_"]
+    finally:
+        release.set()
+        c.parallel_matchers = False
+        c.matcher_timeouts = {}
+
+
+def test_matcher_pool_stuck_workers():
+    pool = completer._MatcherPool(max_workers=1)
+    release = threading.Event()
+    try:
+        # a worker running a task past its deadline does not count
+        stuck = pool.submit(release.wait, 5, deadline=time.monotonic())
+        while not stuck.running():
+            time.sleep(0.01)
+        assert pool.submit(lambda: "done").result(timeout=2) == "done"
+        assert not stuck.done()
+    finally:
+        release.set()
+    assert stuck.result(timeout=5)
+
+def test_matcher_pool_blocked_workers():
+    pool = completer._MatcherPool(max_workers=2)
+    gate = threading.Event()
+    # more tasks than workers
+    futures = [pool.submit(gate.wait, 5) for _ in range(3)]
+    gate.set()
+    assert all(f.result(timeout=5) for f in futures)
+    release = threading.Event()
+    try:
+        blocked = [pool.submit(release.wait, 5) for _ in range(2)]
+        # all the workers are busy, a new one runs the next matcher
+        pool.max_workers = 3
+        assert pool.submit(lambda: "done").result(timeout=2) == "done"
+        assert not any(f.done() for f in blocked)
+    finally:
+        release.set()
+    assert all(f.result(timeout=5) for f in blocked)
+
 def test_private_attr_completions():
     ip = get_ipython()
     ip.user_ns["Test"] = type("Test", (), {"_test1": 1, "__test2": 2})
@@ -5,10 +5,17 @@
 import sys
 from os.path import join
 from tempfile import TemporaryDirectory
+from types import SimpleNamespace
 
 import pytest
 
-from IPython.core.completerlib import magic_run_completer, module_completion, try_import
+from IPython import get_ipython
+from IPython.core.completerlib import (
+    ModuleIndex,
+    magic_run_completer,
+    module_completion,
+    try_import,
+)
 from IPython.testing.decorators import onlyif_unicode_paths
 
 
@@ -85,6 +92,8 @@ def test_import_invalid_module():
             filename = os.path.join(tmpdir, name + ".py")
             open(filename, "w", encoding="utf-8").close()
 
+        # the new sys.path entry is indexed in the background
+        assert get_ipython().module_index.wait(10)
         s = set(module_completion("import foo"))
         intersection = s.intersection(invalid_module_names)
         assert intersection == set()
@@ -135,3 +144,54 @@ def test_valid_exported_submodules():
     results = module_completion("import os.pa")
     assert "os.path" in results
     assert "os.pathconf" not in results
+
+
+def test_module_index(tmp_path, monkeypatch):
+    (tmp_path / "index_mod_a.py").write_text("", encoding="utf-8")
+    (tmp_path / "index_pkg").mkdir()
+    (tmp_path / "index_pkg" / "__init__.py").write_text("", encoding="utf-8")
+    (tmp_path / "index_pkg" / "sub.py").write_text("", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    shell = SimpleNamespace(db={})
+    index = ModuleIndex(shell)
+    # the index is built from the first time it is refreshed (as the shell
+    # does when it starts) or used
+    assert get_ipython().module_index._thread is not None
+    assert index._thread is None
+    index.root_modules()
+    assert index._thread is not None
+    assert index.wait(10)
+    modules = index.root_modules()
+    assert {"index_mod_a", "index_pkg"} <= set(modules)
+    assert index.submodules("index_pkg") == ["sub"]
+    assert str(tmp_path) in shell.db[ModuleIndex.db_key]
+
+    # and not refreshed again while it is fresh
+    thread = index._thread
+    index.root_modules()
+    index.submodules("index_pkg")
+    assert index._thread is thread
+
+    # only the modified entries are scanned again
+    (tmp_path / "index_mod_b.py").write_text("", encoding="utf-8")
+    (tmp_path / "index_pkg" / "sub2.py").write_text("", encoding="utf-8")
+    os.utime(tmp_path, ns=(0, 0))
+    os.utime(tmp_path / "index_pkg", ns=(0, 0))
+    assert index.wait(10)
+    assert "index_mod_b" in index.root_modules()
+    assert sorted(index.submodules("index_pkg")) == ["sub", "sub2"]
+
+    # a new session starts from the persisted index, read right away
+    index = ModuleIndex(shell)
+    index._refresh = lambda: None
+    assert sorted(index.submodules("index_pkg")) == ["sub", "sub2"]
+
+    index.clear()
+    assert ModuleIndex.db_key not in shell.db
+
+
+def test_module_index_timeouts():
+    from IPython.core.completerlib import TIMEOUT_GIVEUP, TIMEOUT_STORAGE
+
+    assert TIMEOUT_STORAGE < TIMEOUT_GIVEUP
@@ -114,3 +114,24 @@ def test_capture_display_hook_format():
     captured = CapturedIO(sys.stdout, sys.stderr, hook.outputs)
     # Should not raise with RichOutput transformation error
     captured.outputs
+
+
+def test_output_cache_memory_limit():
+    """Results over cache_max_bytes are evicted, and spilled ones reloaded"""
+    hook = ip.displayhook
+    ip.run_cell("1", store_history=True)
+    try:
+        hook.cache_max_bytes = 150_000
+        hook.cache_spill = True
+        ip.run_cell("b'a' * 100_000", store_history=True)
+        first = ip.execution_count - 1
+        ip.run_cell("b'b' * 100_000", store_history=True)
+        # the first result is gone from memory, and from the namespace
+        assert "_%d" % first not in ip.user_ns
+        assert first in ip.user_ns["Out"].spilled
+        ip.run_cell("reloaded = Out[%d]" % first)
+        assert ip.user_ns["reloaded"] == b"a" * 100_000
+    finally:
+        hook.cache_max_bytes = 0
+        hook.cache_spill = False
+        ip.run_cell("del reloaded")
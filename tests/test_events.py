@@ -1,3 +1,6 @@
+import time
+import warnings
+
 import pytest
 from unittest.mock import Mock
 
@@ -86,3 +89,81 @@ def func3(*_):
     em.trigger("ping_received")
     assert [True, True, False] == invoked
     assert [func3] == em.callbacks["ping_received"]
+
+
+def test_callbacks_snapshot(em):
+    cb = Mock()
+    em.register("ping_received", cb)
+    em.trigger("ping_received")
+    # callbacks added to the list directly are still called
+    cb2 = Mock()
+    em.callbacks["ping_received"].append(cb2)
+    em.trigger("ping_received")
+    assert cb.call_count == 2
+    assert cb2.call_count == 1
+    # and so are the ones replaced in the list
+    cb3 = Mock()
+    em.callbacks["ping_received"][0] = cb3
+    em.trigger("ping_received")
+    assert cb.call_count == 2
+    assert cb2.call_count == 2
+    assert cb3.call_count == 1
+    # or the lists replacing them
+    em.callbacks["ping_received"] = [cb]
+    em.trigger("ping_received")
+    assert cb.call_count == 3
+    em.callbacks["ping_received"] += [cb2]
+    em.trigger("ping_received")
+    assert (cb.call_count, cb2.call_count, cb3.call_count) == (4, 3, 1)
+    del em.callbacks["ping_received"][:]
+    em.trigger("ping_received")
+    assert (cb.call_count, cb2.call_count, cb3.call_count) == (4, 3, 1)
+
+
+def test_deferred_callbacks(em):
+    calls = []
+    em.register("event_with_argument", lambda arg: calls.append(("now", arg)))
+    em.register(
+        "event_with_argument", lambda arg: calls.append(("later", arg)), deferred=True
+    )
+    em.trigger("event_with_argument", 1)
+    em.trigger("event_with_argument", 2)
+    assert calls == [("now", 1), ("now", 2)]
+    assert em.pending == 2
+    em.run_deferred()
+    assert calls[2:] == [("later", 1), ("later", 2)]
+    assert em.pending == 0
+
+
+def test_async_callbacks_are_deferred(em):
+    calls = []
+
+    async def cb():
+        calls.append(1)
+
+    em.register("ping_received", cb)
+    em.trigger("ping_received")
+    assert calls == []
+    em.run_deferred()
+    assert calls == [1]
+
+
+def test_slow_callback_warning(em):
+    def slow():
+        time.sleep(0.02)
+
+    em.register("ping_received", slow)
+    em.trigger("ping_received")
+    assert em.callback_stats == {}
+
+    em.slow_callback_threshold = 0.01
+    with pytest.warns(RuntimeWarning, match="took"):
+        em.trigger("ping_received")
+    # only once
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        em.trigger("ping_received")
+    ((key, (calls, total, longest)),) = em.callback_stats.items()
+    assert key == ("ping_received", slow.__module__ + "." + slow.__qualname__)
+    assert calls == 2
+    assert total >= longest >= 0.02
@@ -1,5 +1,8 @@
 """Tests for the Formatters."""
 
+import gc
+import threading
+import weakref
 from math import pi
 
 try:
@@ -16,6 +19,7 @@
     PDFFormatter,
     _mod_name_key,
     DisplayFormatter,
+    FormatterWarning,
     JSONFormatter,
 )
 from IPython.utils.io import capture_output
@@ -459,6 +463,27 @@ def test_pretty_max_seq_length():
     assert len(lines) == 1024
 
 
+def test_pretty_output_budget():
+    f = PlainTextFormatter()
+    # large nested containers are cut off by default
+    text = f([list(range(1000)) for _ in range(1000)])
+    assert len(text.splitlines()) == f.max_lines + 1
+    assert text.endswith("\n...")
+    f.max_lines = 2
+    assert f(list(range(3))) == "[0, 1, 2]"
+    assert f(list(range(100))) == "[0,\n 1,\n..."
+    f.max_chars = 5
+    assert f("abcdefgh") == "'abcd..."
+    f.max_chars = 0
+    # deep data does not look cyclic by default
+    nested: list = []
+    for _ in range(200):
+        nested = [nested]
+    assert "..." not in f(nested)
+    f.max_depth = 1
+    assert f([[1], 2]) == "[[...], 2]"
+
+
 def test_ipython_display_formatter():
     """Objects with _ipython_display_ defined bypass other formatters"""
     f = get_ipython().display_formatter
@@ -607,3 +632,231 @@ class Foo(NamedTuple):
     f = PlainTextFormatter()
     assert f.pprint
     assert f(foo) == "Hello World"
+
+
+def test_negotiate_mime_types(monkeypatch):
+    ip = get_ipython()
+    calls = []
+
+    class Rich:
+        def _repr_html_(self):
+            calls.append("html")
+            return "<b>rich</b>"
+
+        def _repr_latex_(self):
+            calls.append("latex")
+            return "$rich$"
+
+        def _repr_mimebundle_(self, include=None, exclude=None):
+            calls.append(include)
+            return {}
+
+    f = DisplayFormatter(parent=ip)
+    monkeypatch.setattr(ip.display_pub, "mime_types", ["text/plain", "text/html"])
+    assert sorted(f.format(Rich())[0]) == ["text/html", "text/latex", "text/plain"]
+    assert calls == [None, "html", "latex"]
+
+    del calls[:]
+    f.negotiate_mime_types = True
+    assert sorted(f.format(Rich())[0]) == ["text/html", "text/plain"]
+    assert calls == [["text/plain", "text/html"], "html"]
+    # explicit include wins
+    assert list(f.format(Rich(), include={"text/latex"})[0]) == ["text/latex"]
+    # the frontend displays anything
+    monkeypatch.setattr(ip.display_pub, "mime_types", None)
+    assert "text/latex" in f.format(Rich())[0]
+
+
+def test_format_cache():
+    calls = []
+
+    class Versioned:
+        version = 0
+
+        def _repr_version_(self):
+            return self.version
+
+        def _repr_html_(self):
+            calls.append(self.version)
+            return "<b>%d</b>" % self.version
+
+    f = DisplayFormatter()
+    obj = Versioned()
+    assert f.format(obj)[0]["text/html"] == "<b>0</b>"
+    d, md = f.format(obj)
+    assert d["text/html"] == "<b>0</b>"
+    assert calls == [0]
+    # the returned dicts are copies
+    d["text/html"] = "changed"
+    assert f.format(obj)[0]["text/html"] == "<b>0</b>"
+
+    obj.version = 1
+    assert f.format(obj)[0]["text/html"] == "<b>1</b>"
+    assert calls == [0, 1]
+    f.formatters["text/html"].for_type(Versioned, lambda obj: "<i>registered</i>")
+    assert f.format(obj)[0]["text/html"] == "<i>registered</i>"
+    f.formatters["text/html"].pop(Versioned)
+    f.formatters["text/plain"].max_width = 10
+    assert f.format(obj)[0]["text/html"] == "<b>1</b>"
+    assert calls == [0, 1, 1]
+
+    # objects which may have changed are formatted again
+    class Unversioned(Versioned):
+        _repr_version_ = None
+
+    obj = Unversioned()
+    f.format(obj)
+    f.format(obj)
+    assert calls == [0, 1, 1, 0, 0]
+
+    # nor are large objects, or objects with large format data
+    f._cache.clear()
+    f.format("x" * 2_000_000)
+    f.format(tuple(range(200_000)))
+    obj = Versioned()
+    obj._repr_html_ = lambda: "x" * 2_000_000
+    f.format(obj)
+    assert f._cache == {}
+    f.format("x" * 1000)
+    assert len(f._cache) == 1
+
+    # the format data depends on max_size
+    calls.clear()
+    obj = Versioned()
+    f.max_size = 3
+    assert "text/html" not in f.format(obj)[0]
+    f.max_size = 100
+    assert f.format(obj)[0]["text/html"] == "<b>0</b>"
+    f.max_size = 3
+    assert "text/html" not in f.format(obj)[0]
+    assert calls == [0, 0]
+    f.max_size = 0
+
+    f.cache_size = 0
+    assert f._cache == {}
+    assert f.format("text") == ({"text/plain": "'text'"}, {})
+    assert f._cache == {}
+
+
+def test_lookup_cache():
+    f = HTMLFormatter()
+    f.for_type(A, lambda obj: "A")
+    f.lookup_hits = f.lookup_misses = 0
+    assert f.lookup(B()) is f.type_printers[A]
+    assert f.lookup(B()) is f.type_printers[A]
+    assert (f.lookup_hits, f.lookup_misses) == (1, 1)
+    with pytest.raises(KeyError):
+        f.lookup(C())
+    with pytest.raises(KeyError):
+        f.lookup(C())
+    assert (f.lookup_hits, f.lookup_misses) == (2, 2)
+
+    # registering printers clears the cache
+    f.for_type(B, lambda obj: "B")
+    assert f.lookup(B()) is f.type_printers[B]
+    f.for_type_by_name(__name__, "C", lambda obj: "C")
+    assert f.lookup(C()) is f.type_printers[C]
+    f.pop(B)
+    assert f.lookup(B()) is f.type_printers[A]
+    # and so do direct changes to the registries
+    f.type_printers[B] = lambda obj: "B again"
+    assert f.lookup(B())(B()) == "B again"
+    f.type_printers[A] = lambda obj: "A again"
+    assert f.lookup(A())(A()) == "A again"
+    # even when they keep the sizes of the registries
+    del f.type_printers[B]
+    assert f.lookup(B())(B()) == "A again"
+    del f.type_printers[C]
+    f.type_printers[B] = lambda obj: "B in place of C"
+    assert f.lookup(B())(B()) == "B in place of C"
+    f.type_printers = {B: lambda obj: "B once more"}
+    assert f.lookup(B())(B()) == "B once more"
+    f.type_printers.update({A: lambda obj: "A once more"})
+    assert f.lookup(A())(A()) == "A once more"
+
+
+def test_lookup_cache_weak():
+    f = HTMLFormatter()
+    f.for_type(A, lambda obj: "A")
+    cls = type("D", (A,), {})
+    assert f.lookup(cls())(cls()) == "A"
+    ref = weakref.ref(cls)
+    del cls
+    gc.collect()
+    assert ref() is None
+
+
+class Slow:
+    """An object whose representations take until release is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def _repr_version_(self):
+        return 0
+
+    def _repr_html_(self):
+        self.release.wait(10)
+        return "<b>slow</b>"
+
+    def _repr_mimebundle_(self, include=None, exclude=None):
+        self.release.wait(10)
+        return {"text/markdown": "**slow**"}
+
+    def __repr__(self):
+        self.release.wait(10)
+        return "Slow()"
+
+
+def test_formatter_timeout():
+    f = DisplayFormatter()
+    for formatter in [*f.formatters.values(), f.mimebundle_formatter]:
+        formatter.timeout = 0.05
+    obj = Slow()
+    try:
+        with pytest.warns(FormatterWarning) as record:
+            d, md = f.format(obj)
+    finally:
+        obj.release.set()
+    assert sorted(str(w.message).split()[0] for w in record) == [
+        "HTMLFormatter",
+        "MimeBundleFormatter",
+        "PlainTextFormatter",
+    ]
+    assert d == {"text/plain": object.__repr__(obj)}
+
+    assert f.formatters["text/html"].timeouts == 1
+    assert f._cache == {}
+
+    # finishing in time
+    assert f.format(obj)[0]["text/html"] == "<b>slow</b>"
+    assert f.formatters["text/plain"](obj) == "Slow()"
+
+    class Bad:
+        def _repr_html_(self):
+            raise ValueError("bad")
+
+    # errors are still reported
+    with capture_output() as captured:
+        assert f.formatters["text/html"](Bad()) is None
+    assert "ValueError" in captured.stdout + captured.stderr
+
+
+def test_max_size():
+    class Huge:
+        def _repr_html_(self):
+            return "<p>" * 100, {"isolated": True}
+
+        def _repr_markdown_(self):
+            return "small"
+
+        def __repr__(self):
+            return "x" * 100
+
+    f = DisplayFormatter(max_size=50)
+    with pytest.warns(FormatterWarning, match="max_size"):
+        d, md = f.format(Huge())
+    assert d == {"text/plain": "x" * 50 + "...", "text/markdown": "small"}
+    assert md == {}
+    f.max_size = 0
+    assert "text/html" in f.format(Huge())[0]
@@ -5,6 +5,7 @@
 # -----------------------------------------------------------------------------
 
 # stdlib
+import fnmatch
 import io
 import gc
 import os
@@ -22,10 +23,12 @@
 # our own packages
 from traitlets.config.loader import Config
 
+from IPython.core import history as history_module
 from IPython.core.history import (
     HistoryAccessor,
     HistoryManager,
     HistorySavingThread,
+    StreamCapture,
     extract_hist_ranges,
 )
 
@@ -404,6 +407,144 @@ def boom(*args, **kwargs):
         gc.collect()
 
 
+def test_journal_mode_and_synchronous(hmmax2, tmp_path):
+    hist_file = tmp_path / "history.sqlite"
+    with HistoryManager(
+        shell=get_ipython(),
+        hist_file=hist_file,
+        journal_mode="wal",
+        synchronous="normal",
+    ) as hm:
+        assert hm.db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        # NORMAL
+        assert hm.db.execute("PRAGMA synchronous").fetchone()[0] == 1
+        thread_conn = _wait_for_thread_db(hm.save_thread)
+        assert thread_conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+    # the default leaves an existing database alone
+    with HistoryAccessor(hist_file=hist_file) as ha:
+        assert ha.db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_flush_interval(hmmax2, tmp_path):
+    """With db_flush_interval, the cache is written out even when small"""
+    hist_file = tmp_path / "history.sqlite"
+    with HistoryManager(
+        shell=get_ipython(),
+        hist_file=hist_file,
+        db_cache_size=100,
+        db_flush_interval=0.05,
+    ) as hm:
+        for i in range(1, 4):
+            hm.store_inputs(i, "a = %d" % i)
+        deadline = time.monotonic() + 5
+        while hm.write_stats.inputs_written < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert hm.queue_depth == 0
+        assert hm.write_stats.max_latency >= 0.05
+        rows = hm.db.execute(
+            "SELECT line, source FROM history WHERE session == ?",
+            (hm.session_number,),
+        ).fetchall()
+        assert rows == [(1, "a = 1"), (2, "a = 2"), (3, "a = 3")]
+
+
+def _queued_history_manager(tmp_path, **kwargs):
+    """A HistoryManager whose saving thread is stopped, so that its entries
+    stay in the queue until writeout_cache is called."""
+    hm = HistoryManager(
+        shell=get_ipython(),
+        hist_file=tmp_path / "history.sqlite",
+        db_cache_size=100,
+        connection_options=dict(check_same_thread=False, timeout=0),
+        **kwargs,
+    )
+    hm._stop_save_thread()
+    return hm
+
+
+def _db_lines(hm):
+    return [
+        line
+        for (line,) in hm.db.execute(
+            "SELECT line FROM history WHERE session == ?", (hm.session_number,)
+        )
+    ]
+
+
+def test_pending_entries_are_visible(hmmax2, tmp_path):
+    """Lookups see the entries which are not written out yet"""
+    with _queued_history_manager(tmp_path) as hm:
+        hm.store_inputs(1, "a = 1")
+        hm.writeout_cache()
+        hm.store_inputs(2, "b = a")
+        hm.store_inputs(3, "a = 3")
+        assert _db_lines(hm) == [1]
+        assert hm.queue_depth == 2
+
+        session = hm.session_number
+        assert list(hm.search("a*")) == [(session, 1, "a = 1"), (session, 3, "a = 3")]
+        assert list(hm.search("a*", n=1)) == [(session, 3, "a = 3")]
+        assert [line for _, line, _ in hm.search_text("a")] == [3, 2, 1]
+        assert list(hm.get_tail(3, include_latest=True)) == [
+            (session, 1, "a = 1"),
+            (session, 2, "b = a"),
+            (session, 3, "a = 3"),
+        ]
+        assert [line for _, line, _ in hm.get_tail_page(2)] == [3, 2]
+        assert [line for _, line, _ in hm.get_tail_page(2, before=(session, 3))] == [
+            2,
+            1,
+        ]
+        # nothing was written by the lookups
+        assert _db_lines(hm) == [1]
+
+        hm.writeout_cache()
+        assert _db_lines(hm) == [1, 2, 3]
+        assert hm.write_stats.flushes == 2
+        assert hm.write_stats.inputs_written == 3
+        assert list(hm.search("a*", n=1)) == [(session, 3, "a = 3")]
+
+
+def test_writeout_locked_db(hmmax2, tmp_path):
+    """Entries are kept for later when another process locks the database"""
+    with _queued_history_manager(tmp_path) as hm:
+        hm.store_inputs(1, "a = 1")
+        other = sqlite3.connect(hm.hist_file, isolation_level=None)
+        try:
+            other.execute("BEGIN EXCLUSIVE")
+            with pytest.raises(sqlite3.OperationalError):
+                hm.writeout_cache()
+            assert hm.db_input_cache == [(1, "a = 1", "a = 1")]
+            assert hm.write_stats.failures == 1
+            # a lookup doesn't fail, nor mistake the lock for a corrupt database
+            assert list(hm.search("a*")) == []
+            # nor returns an empty list instead of a session
+            with pytest.raises(sqlite3.OperationalError):
+                hm.get_session_info(1)
+            other.execute("COMMIT")
+        finally:
+            other.close()
+        assert hm.hist_file.exists()
+
+        hm.store_inputs(2, "a = 2")
+        hm.writeout_cache()
+        assert _db_lines(hm) == [1, 2]
+        assert hm.queue_depth == 0
+        assert hm.write_stats.flushes == 1
+
+
+def test_queue_limit(hmmax2, tmp_path):
+    with _queued_history_manager(tmp_path, db_queue_limit=3) as hm:
+        for i in range(1, 6):
+            hm.store_inputs(i, "a = %d" % i)
+        assert [line for line, _, _ in hm.db_input_cache] == [3, 4, 5]
+        assert hm.write_stats.dropped == 2
+        assert hm.write_stats.max_queue_depth == 3
+        # they are still in the session's history
+        assert len(list(hm.get_range())) == 5
+
+
 def test_history_manager_context_manager(hmmax2, tmp_path):
     """Using a HistoryManager as a context manager stops the saving thread and
     closes both connections on exit."""
@@ -492,6 +633,8 @@ def test_get_tail_session_awareness(hmmax3):
             for i, h in enumerate(hist1 + [""], start=1):
                 hm1.store_inputs(i, h)
             assert list(map(get_source, hm1.get_tail())) == hist1
+            # other connections only see what was written out
+            hm1.writeout_cache()
             assert list(map(get_source, ha.get_tail())) == hist1
             sid1 = hm1_last_sid()
             assert sid1 is not None
@@ -507,6 +650,7 @@ def test_get_tail_session_awareness(hmmax3):
                 hm2.store_inputs(i, h)
             tail = hm2.get_tail(n=3)
             assert list(map(get_source, tail)) == hist2
+            hm2.writeout_cache()
             tail = ha.get_tail(n=3)
             assert list(map(get_source, tail)) == hist2
             sid2 = hm2_last_sid()
@@ -535,6 +679,90 @@ def test_get_tail_session_awareness(hmmax3):
             assert ha_last_sid() == sid2
 
 
+def test_get_tail_page(hmmax3, tmp_path):
+    """Paging through .get_tail_page() walks the same entries as .get_tail()"""
+    ip = get_ipython()
+    hist_file = tmp_path / "history.sqlite"
+    with ExitStack() as stack:
+        hm1 = stack.enter_context(HistoryManager(shell=ip, hist_file=hist_file))
+        for i in range(1, 6):
+            hm1.store_inputs(i, "a=%d" % i)
+        hm1.writeout_cache()
+        hm2 = stack.enter_context(HistoryManager(shell=ip, hist_file=hist_file))
+        for i in range(1, 4):
+            hm2.store_inputs(i, "b=%d" % i)
+
+        expected = list(hm2.get_tail(n=100, include_latest=True))[::-1]
+        assert len(expected) == 8
+        pages = []
+        before = None
+        while True:
+            page = hm2.get_tail_page(3, before=before)
+            if not page:
+                break
+            assert len(page) <= 3
+            pages.append(page)
+            before = page[-1][:2]
+        assert [row for page in pages for row in page] == expected
+        assert [len(page) for page in pages] == [3, 3, 2]
+
+        # hm1 sees its own session first, then the others
+        hm2.writeout_cache()
+        assert [row[2] for row in hm1.get_tail_page(6)] == [
+            "a=5",
+            "a=4",
+            "a=3",
+            "a=2",
+            "a=1",
+            "b=3",
+        ]
+
+
+@pytest.mark.parametrize("fts", [True, False])
+def test_search_full_text(hmmax2, tmp_path, fts):
+    """Searches give the same answers with and without the full-text index"""
+    ip = get_ipython()
+    hist_file = tmp_path / "history.sqlite"
+    cells = [
+        "import numpy as np",
+        "x = np.arange(10)",
+        "plot(x, x**2)",
+        "np.sum(x)  # total of x",
+        "print('Sum')",
+    ]
+    with HistoryManager(shell=ip, hist_file=hist_file) as hm:
+        for i, cell in enumerate(cells, start=1):
+            hm.store_inputs(i, cell)
+        hm.writeout_cache()
+
+    with HistoryAccessor(hist_file=hist_file, full_text_search=fts) as ha:
+        if fts and not ha._fts:
+            pytest.skip("SQLite has no FTS5 trigram support")
+        assert ha._fts is fts
+        get_source = lambda rows: [row[2] for row in rows]
+
+        for pattern in ["*np*", "*Sum*", "*x*", "x*", "*", "*nothing*"]:
+            expected = [c for c in cells if fnmatch.fnmatchcase(c, pattern)]
+            assert get_source(ha.search(pattern)) == expected
+        assert get_source(ha.search("*sum*", n=1)) == [cells[3]]
+
+        assert get_source(ha.search_text("nothing here")) == []
+        assert sorted(get_source(ha.search_text("x np"))) == sorted(cells[1:2] + cells[3:4])
+        if fts:
+            # ranked by BM25, which favours the shorter entry here
+            assert get_source(ha.search_text("sum")) == [cells[4], cells[3]]
+        else:
+            # most recent first
+            assert get_source(ha.search_text("x")) == cells[3:0:-1]
+        assert len(list(ha.search_text("np", n=1))) == 1
+
+        # entries written by anyone are indexed
+        with closing(sqlite3.connect(hist_file)) as con, con:
+            con.execute("INSERT INTO history VALUES (99, 1, '', 'find_me()')")
+        assert get_source(ha.search("*find_me*")) == ["find_me()"]
+        assert get_source(ha.search_text("find_me")) == ["find_me()"]
+
+
 def test_calling_run_cell(hmmax2):
     ip = get_ipython()
     with TemporaryDirectory() as tmpdir:
@@ -633,6 +861,21 @@ def test_history_magic_grep(hist_magic_shell, capsys):
     assert out.count("grepable_alpha") == 1
 
 
+def test_history_magic_grep_ranked(hist_magic_shell, capsys):
+    ip = hist_magic_shell
+    hm = ip.history_manager
+    hm.store_inputs(1, "alpha_rank + beta_rank")
+    hm.store_inputs(2, "beta_rank = 2")
+    hm.store_inputs(3, "beta_rank + alpha_rank")
+    capsys.readouterr()
+
+    # -r matches all the words, in any order
+    ip.run_line_magic("history", "-g alpha_rank beta_rank -r")
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 2
+    assert "beta_rank = 2" not in "".join(lines)
+
+
 def test_history_magic_limit(hist_magic_shell, capsys):
     ip = hist_magic_shell
     hm = ip.history_manager
@@ -855,3 +1098,156 @@ def test_history_trim_cli(tmp_path, subcommand, kept):
     with closing(sqlite3.connect(hist_file)) as con:
         rows = list(con.execute("SELECT source FROM history"))
     assert len(rows) == kept
+
+
+def test_schema_migration(tmp_path):
+    """Old databases get the indexes, and are marked as up to date"""
+    hist_file = tmp_path / "history.sqlite"
+    _make_history_db(hist_file, 5)
+    with HistoryAccessor(hist_file=hist_file) as ha:
+        version = ha.db.execute("PRAGMA user_version").fetchone()[0]
+        assert version == len(history_module._MIGRATIONS) > 0
+        indexes = {
+            row[0]
+            for row in ha.db.execute("SELECT name FROM sqlite_master WHERE type == 'index'")
+        }
+        assert {"history_source_raw", "sessions_start"} <= indexes
+        assert len(list(ha.search("*code*"))) == 5
+
+
+def _query_plans(db, call):
+    """Run call(), and return the query plan of each SELECT it ran on db."""
+    queries = []
+    db.set_trace_callback(queries.append)
+    try:
+        list(call())
+    finally:
+        db.set_trace_callback(None)
+    plans = {}
+    for sql in queries:
+        if sql.lstrip().upper().startswith("SELECT"):
+            plan = db.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+            # older SQLite versions say "SCAN TABLE x" rather than "SCAN x"
+            plans[sql] = [row[3].replace(" TABLE ", " ") for row in plan]
+    assert plans, "no query was traced"
+    return plans
+
+
+# Every query the accessor builds, and whether it is allowed to read the whole
+# table. Only substring searches without the full-text index have to.
+_PLANNED_CALLS = {
+    "get_tail": (lambda ha, hm: ha.get_tail(3), False),
+    "get_tail output": (lambda ha, hm: ha.get_tail(3, output=True), False),
+    "get_last_session_id": (lambda ha, hm: [ha.get_last_session_id()], False),
+    "get_session_info": (lambda ha, hm: [ha.get_session_info(1)], False),
+    "get_range": (lambda ha, hm: ha.get_range(1, 2, 4), False),
+    "get_range output": (lambda ha, hm: ha.get_range(1, 2, output=True), False),
+    "search prefix": (lambda ha, hm: ha.search("code 1*"), False),
+    "search prefix n": (lambda ha, hm: ha.search("code*", n=2), False),
+    "search": (lambda ha, hm: ha.search("*1*"), True),
+    "search unique": (lambda ha, hm: ha.search("*1*", unique=True), True),
+    "search unique n": (lambda ha, hm: ha.search("*1*", unique=True, n=2), True),
+    "search translated": (lambda ha, hm: ha.search("*1*", search_raw=False), True),
+    "search_text": (lambda ha, hm: ha.search_text("code 1"), True),
+    "manager get_tail": (lambda ha, hm: hm.get_tail(3), False),
+    "manager get_tail_page": (lambda ha, hm: hm.get_tail_page(2), False),
+    "manager get_tail_page before": (
+        lambda ha, hm: hm.get_tail_page(2, before=(1, 3)),
+        False,
+    ),
+}
+
+
+@pytest.mark.parametrize("name", _PLANNED_CALLS)
+@pytest.mark.parametrize("fts", [False, True])
+def test_query_plans(hmmax2, tmp_path, name, fts):
+    """No history query reads a whole table, or sorts it to group it.
+
+    Scanning an index is fine when the query stops after a LIMIT, as for
+    the most recent entries.
+    """
+    call, full_scan_ok = _PLANNED_CALLS[name]
+    hist_file = tmp_path / "history.sqlite"
+    _make_history_db(hist_file, 20)
+    with (
+        HistoryAccessor(hist_file=hist_file, full_text_search=fts) as ha,
+        HistoryManager(shell=get_ipython(), hist_file=hist_file) as hm,
+    ):
+        if fts and not ha._fts:
+            pytest.skip("SQLite has no FTS5 trigram support")
+        db = hm.db if name.startswith("manager") else ha.db
+        for sql, plan in _query_plans(db, lambda: call(ha, hm)).items():
+            if "history_fts" in sql:
+                # only the matches found by the full-text index are read
+                continue
+            if "archived_sessions" in sql:
+                # one row per archived session, read to search the archives
+                continue
+            for step in plan:
+                assert "TEMP B-TREE FOR GROUP BY" not in step, (sql, plan)
+                if not step.startswith("SCAN "):
+                    continue
+                if not full_scan_ok:
+                    assert "INDEX" in step and "LIMIT" in sql, (sql, plan)
+
+
+def test_stream_capture():
+    capture = StreamCapture()
+    for i in range(10000):
+        capture.write("line %d\n" % i)
+    capture.close()
+    # the chunks are coalesced into a few strings
+    assert len(capture.parts) < 20
+    assert "".join(capture.parts) == "".join("line %d\n" % i for i in range(10000))
+    assert capture.kept == capture.length
+    assert not capture.truncated
+
+
+@pytest.mark.parametrize("tail", [0, 4])
+def test_stream_capture_limit(tail):
+    capture = StreamCapture(limit=10, tail=tail)
+    for c in "abcdefghijklmnopqrstuvwxyz":
+        capture.write(c * 2)
+    capture.close()
+    assert capture.truncated
+    assert capture.length == 52
+    assert capture.kept == 10
+    text = "".join(capture.parts)
+    head = "aabbccddeeffgghhiijjkkll"[: 10 - tail]
+    assert text.startswith(head + "\n[... 42 characters truncated ...]\n")
+    assert text.endswith("yyzz"[4 - tail :] if tail else "]\n")
+
+
+@pytest.mark.parametrize("tail", [0, 4])
+@pytest.mark.parametrize("chunks", [["abcdefghij"], ["abcdefgh", "ij"], list("abcdefghij")])
+def test_stream_capture_limit_boundary(tmp_path, chunks, tail):
+    capture = StreamCapture(limit=10, tail=tail, spill_dir=tmp_path)
+    for chunk in chunks:
+        capture.write(chunk)
+    capture.close()
+    assert not capture.truncated
+    assert capture.spill_path is None
+    assert "".join(capture.parts) == "abcdefghij"
+    assert capture.kept == capture.length == 10
+
+    capture.write("k")
+    capture.close()
+    assert capture.truncated
+    assert capture.kept == 10
+    text = "".join(capture.parts)
+    marker = "\n[... 1 characters truncated, full output in"
+    assert text.startswith("abcdefghij"[: 10 - tail] + marker)
+    assert text.endswith("ghijk"[-tail:] if tail else " ...]\n")
+
+
+def test_stream_capture_spill(tmp_path):
+    capture = StreamCapture(limit=10, spill_dir=tmp_path)
+    for i in range(100):
+        capture.write("%d," % i)
+    capture.close()
+    assert capture.spill_path is not None
+    assert capture.spill_path.parent == tmp_path
+    full = "".join("%d," % i for i in range(100))
+    assert capture.spill_path.read_text(encoding="utf-8") == full
+    assert str(capture.spill_path) in "".join(capture.parts)
+    assert "".join(capture.parts).startswith(full[:10])
@@ -1,6 +1,7 @@
 # coding: utf-8
 """Tests for IPython.core.historyapp"""
 
+import datetime
 import sqlite3
 import sys
 from contextlib import closing
@@ -9,7 +10,8 @@
 
 from traitlets.config.configurable import SingletonConfigurable
 
-from IPython.core.historyapp import HistoryApp, HistoryClear, HistoryTrim
+from IPython.core.history import HistoryAccessor
+from IPython.core.historyapp import HistoryApp, HistoryClear, HistoryCompact, HistoryTrim
 
 
 def _clear_singleton(inst):
@@ -175,3 +177,122 @@ def test_history_app_trim_subcommand(ipython_dir, capsys):
     out = capsys.readouterr().out
     assert "Trimming history to the most recent 4 entries." in out
     assert len(_input_sources(hist_file)) == 4
+
+
+def _make_sessions_db(hist_file):
+    """Replace the history with two old sessions, a recent one, and an old one
+    which is still running."""
+    old = (datetime.datetime.now() - datetime.timedelta(days=100)).isoformat(" ")
+    recent = datetime.datetime.now().isoformat(" ")
+    with closing(sqlite3.connect(hist_file)) as db:
+        for table in ("sessions", "history", "output_history"):
+            db.execute("DELETE FROM %s" % table)
+        db.executemany(
+            "INSERT INTO sessions VALUES (?, ?, ?, NULL, '')",
+            [(1, old, old), (2, old, old), (3, recent, None), (4, old, None)],
+        )
+        db.executemany(
+            "INSERT INTO history VALUES (?, ?, ?, ?)",
+            [
+                (1, 1, "a = 1", "a = 1"),
+                (1, 2, "b = 1", "b = 1"),
+                (2, 1, "a = 1", "a = 1"),
+                (3, 1, "b = 1", "b = 1"),
+                (3, 2, "c = 1", "c = 1"),
+                (4, 1, "d = 1", "d = 1"),
+            ],
+        )
+        db.execute("INSERT INTO output_history VALUES (1, 1, '1')")
+        db.commit()
+
+
+def test_history_compact_dedupe(ipython_dir, capsys):
+    hist_file = ipython_dir / "profile_default" / "history.sqlite"
+    _make_sessions_db(hist_file)
+    app = HistoryCompact()
+    app.initialize([])
+    app.start()
+    assert "Removed 2 duplicate entries." in capsys.readouterr().out
+    # only the last occurrence of each input is kept
+    assert _input_sources(hist_file) == ["a = 1", "b = 1", "c = 1", "d = 1"]
+    with closing(sqlite3.connect(hist_file)) as db:
+        assert db.execute("SELECT session, line FROM history").fetchall() == [
+            (2, 1),
+            (3, 1),
+            (3, 2),
+            (4, 1),
+        ]
+        # the output of a removed input goes too
+        assert db.execute("SELECT * FROM output_history").fetchall() == []
+
+
+def test_history_compact_archive(ipython_dir, capsys):
+    profile_dir = ipython_dir / "profile_default"
+    hist_file = profile_dir / "history.sqlite"
+    _make_sessions_db(hist_file)
+    app = HistoryCompact()
+    app.initialize(["--archive-days=30", "--no-dedupe", "--backup"])
+    app.start()
+    out = capsys.readouterr().out
+    assert "Archived 2 sessions" in out
+    assert len(_input_sources(profile_dir / "history.sqlite.old.1")) == 6
+    # the old session which is still running is not archived
+    assert _input_sources(hist_file) == ["b = 1", "c = 1", "d = 1"]
+    archives = list((profile_dir / "history-archive").glob("*.jsonl.gz"))
+    assert len(archives) == 1
+
+    # archived sessions can still be read
+    with HistoryAccessor(hist_file=hist_file) as ha:
+        assert list(ha.get_range(1)) == [(1, 1, "a = 1"), (1, 2, "b = 1")]
+        assert list(ha.get_range(1, 2, output=True)) == [(1, 2, ("b = 1", None))]
+        assert list(ha.get_range(1, 1, 2, output=True)) == [(1, 1, ("a = 1", "1"))]
+        assert list(ha.get_range(2)) == [(2, 1, "a = 1")]
+        assert list(ha.get_range(3)) == [(3, 1, "b = 1"), (3, 2, "c = 1")]
+        assert ha.get_session_info(1)[0] == 1
+        # and searched, when the database has too few matches
+        assert list(ha.search("a*")) == [(1, 1, "a = 1"), (2, 1, "a = 1")]
+        assert list(ha.search("a*", unique=True)) == [(2, 1, "a = 1")]
+        assert list(ha.search("b*", n=1)) == [(3, 1, "b = 1")]
+        assert list(ha.search("b*", n=2)) == [(1, 2, "b = 1"), (3, 1, "b = 1")]
+        assert list(ha.search("b*", archived=False)) == [(3, 1, "b = 1")]
+        assert list(ha.search("a*", output=True)) == [
+            (1, 1, ("a = 1", "1")),
+            (2, 1, ("a = 1", None)),
+        ]
+        assert list(ha.search_text("b")) == [(3, 1, "b = 1"), (1, 2, "b = 1")]
+        assert list(ha.search_text("b", n=1)) == [(3, 1, "b = 1")]
+
+    # running again does not archive anything twice
+    app = HistoryCompact()
+    app.initialize(["--archive-days=30"])
+    app.start()
+    assert "Archived 0 sessions" in capsys.readouterr().out
+
+
+def test_history_compact_archive_not_upgraded(ipython_dir, capsys, monkeypatch):
+    hist_file = ipython_dir / "profile_default" / "history.sqlite"
+    _make_sessions_db(hist_file)
+    # _migrate cannot create the archive table when the database is locked
+    monkeypatch.setattr(HistoryAccessor, "_migrate", lambda self: None)
+    app = HistoryCompact()
+    app.initialize(["--archive-days=30", "--no-dedupe"])
+    app.start()
+    assert "Could not archive sessions" in capsys.readouterr().out
+    assert len(_input_sources(hist_file)) == 6
+
+
+def test_history_compact_vacuum_locked(ipython_dir, capsys):
+    hist_file = ipython_dir / "profile_default" / "history.sqlite"
+    _make_sessions_db(hist_file)
+    other = sqlite3.connect(hist_file)
+    try:
+        # another session reading the database
+        other.execute("BEGIN")
+        other.execute("SELECT * FROM history").fetchall()
+        app = HistoryCompact()
+        app.config.HistoryAccessor.connection_options = {"timeout": 0.1}
+        app.initialize(["--no-dedupe"])
+        app.start()
+    finally:
+        other.close()
+    assert "Could not vacuum the history database" in capsys.readouterr().out
@@ -451,3 +451,76 @@ def counter(lines):
     manager.line_transforms.insert(0, counter)
     assert manager.check_complete("b=1\n") == ("complete", None)
     assert count == 0
+
+
+@pytest.mark.parametrize(
+    "cell",
+    [
+        "x = '%d' % 1\ny = x != 2\n",
+        "%time x\n!ls\na = %who_ls\nb = !echo hi\nobj?\n%magic?\n",
+        "if x:\n    %time y\n    z = 2\n",
+        # the special syntax throws the tokenizer off
+        '!echo "unterminated\nx = 1\n%foo\n',
+        "%time f(\n%x)\n!!ls\n",
+        "%x)\nd = {\n/f a b\n!!ls\n}\n",
+        "s = '''\n%in string\n'''\n%foo \\\n   bar\n,f a b\n;f a b\n",
+        "c = (1,\n%x)\na = b = %foo\ndef g():\n    return x?\n",
+        # the transforms of a line raise SyntaxError
+        "print(1)?\n!ls\n",
+        "lambda: 1?\n%time x\nx.y?\n",
+        "%time lambda: 1?\n%magic?\nx.y?\n",
+    ],
+)
+def test_token_transforms_one_pass(cell):
+    """Transforms applied in one pass, or none for plain Python, are the same
+    as when tokenizing the cell again after each transform."""
+    manager = ipt2.TransformerManager()
+    lines = cell.splitlines(keepends=True)
+    assert manager.do_token_transforms(lines) == manager._do_token_transforms_loop(
+        lines
+    )
+
+
+def test_token_transforms_plain_python(monkeypatch):
+    def fail(lines):
+        raise AssertionError("tokenized")
+
+    monkeypatch.setattr(ipt2, "make_tokens_by_line", fail)
+    manager = ipt2.TransformerManager()
+    cell = "def f(x):\n    return '%s' % x != 'a=b'\n"
+    assert manager.transform_cell(cell) == cell
+
+
+def test_check_complete_incremental():
+    """check_complete gives the same results when only tokenizing the lines
+    which changed since the last call, as the cell is being edited."""
+    manager = ipt2.TransformerManager()
+    lines = [
+        "def f(x):\n",
+        "    y = (x,\n",
+        "2)\n",
+        "    return y\n",
+        "%time f(1)\n",
+        "s = '''\n",
+        "'''\n",
+        "d = {\n",
+        "}\n",
+        "2)\n",
+        "d = {\n",
+        "# c\n",
+        "    x = 1\n",
+        "for i in range(3):\n",
+        "    pass\n",
+    ]
+    edits = [lambda lines: None]
+    for i in range(len(lines)):
+        edits.append(lambda lines, i=i: lines.__setitem__(i, lines[i] + "    "))
+        edits.append(lambda lines, i=i: lines.__delitem__(i))
+        edits.append(lambda lines, i=i: lines.insert(i, "if x:\n"))
+    for edit in edits:
+        cell = list(lines)
+        edit(cell)
+        for n in range(1, len(cell) + 1):
+            text = "".join(cell[:n])
+            expected = ipt2.TransformerManager().check_complete(text)
+            assert manager.check_complete(text) == expected, text
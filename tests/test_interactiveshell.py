@@ -199,6 +199,55 @@ def test_future_flags():
         ip.compile.reset_compiler_flags()
 
 
+def test_batch_statements():
+    """Statements run together keep their line numbers and their order"""
+    res = ip.run_cell("bs_a = 1\nbs_b = 2\n1 / 0\nbs_c = 3\n")
+    assert isinstance(res.error_in_exec, ZeroDivisionError)
+    assert res.error_in_exec.__traceback__.tb_next.tb_lineno == 3
+    assert ip.user_ns["bs_b"] == 2
+    assert "bs_c" not in ip.user_ns
+
+    # a statement which does not compile only fails once the ones before it ran
+    res = ip.run_cell("bs_d = 4\nreturn 5\nbs_e = 5\n")
+    assert isinstance(res.error_before_exec, SyntaxError)
+    assert ip.user_ns["bs_d"] == 4
+    assert "bs_e" not in ip.user_ns
+
+    # top-level await between regular statements
+    res = ip.run_cell(
+        "import asyncio\nbs_f = 6\nawait asyncio.sleep(0)\nbs_g = bs_f + 1\n"
+    )
+    assert res.success
+    assert ip.user_ns["bs_g"] == 7
+
+
+def test_stream_capture_limit():
+    """The output of a cell is only kept in history up to a limit"""
+    hm = ip.history_manager
+    hm.stream_capture_limit = 100
+    count = ip.execution_count
+    try:
+        hm.outputs.pop(count, None)
+        ip.run_cell("for i in range(1000):\n    print(i)\nprint('end')")
+        (output,) = hm.outputs[count]
+        text = "".join(output.bundle["stream"])
+        assert text.startswith("0\n1\n2\n")
+        assert "characters truncated" in text
+        assert "end" not in text
+
+        hm.stream_capture_tail = 10
+        hm.outputs.pop(count)
+        ip.run_cell("for i in range(1000):\n    print(i)\nprint('end')")
+        (output,) = hm.outputs[count]
+        text = "".join(output.bundle["stream"])
+        assert text.startswith("0\n1\n2\n")
+        assert text.endswith("999\nend\n")
+    finally:
+        hm.outputs.pop(count, None)
+        hm.stream_capture_limit = 1_000_000
+        hm.stream_capture_tail = 0
+
+
 def test_can_pickle():
     "Can we pickle objects defined interactively (GH-29)"
     ip = get_ipython()
@@ -849,6 +898,107 @@ def ast_negator_transform():
     ip.ast_transformers.remove(negator)
 
 
+def test_cell_cache():
+    """Running the same cell again reuses its compiled code"""
+    cell_cache = ip.compile.cell_cache
+    cell = "cc_x = cc_y * 2\n"
+    ip.user_ns["cc_y"] = 1
+    ip.run_cell(cell, store_history=True)
+    hits = cell_cache.hits
+    ip.user_ns["cc_y"] = 2
+    ip.run_cell(cell, store_history=True)
+    assert cell_cache.hits == hits + 1
+    assert ip.user_ns["cc_x"] == 4
+
+    # tracebacks point at the cell run, not at the one the code comes from
+    ip.user_ns["cc_y"] = None
+    res = ip.run_cell(cell, store_history=True)
+    assert isinstance(res.error_in_exec, TypeError)
+    filename = res.error_in_exec.__traceback__.tb_next.tb_frame.f_code.co_filename
+    assert ip.compile._filename_map[filename] == res.execution_count
+
+    # so does registering an input transformer
+    def triple(lines):
+        return [line.replace("* 2", "* 3") for line in lines]
+
+    ip.input_transformers_cleanup.append(triple)
+    try:
+        ip.user_ns["cc_y"] = 1
+        ip.run_cell(cell)
+        assert ip.user_ns["cc_x"] == 3
+    finally:
+        ip.input_transformers_cleanup.remove(triple)
+
+    # AST transformers run every time the cell does
+    negator = Negator()
+    ip.ast_transformers.append(negator)
+    try:
+        ip.user_ns["cc_y"] = 1
+        ip.run_cell(cell)
+        assert ip.user_ns["cc_x"] == -2
+        hits = cell_cache.hits
+        ip.run_cell(cell)
+        assert cell_cache.hits == hits
+    finally:
+        ip.ast_transformers.remove(negator)
+    ip.run_cell(cell)
+    assert ip.user_ns["cc_x"] == 2
+
+    class Rejecter(ast.NodeTransformer):
+        reject = False
+
+        def visit_Name(self, node):
+            if self.reject and node.id == "cc_y":
+                raise InputRejected("cc_y rejected")
+            return node
+
+    rejecter = Rejecter()
+    ip.ast_transformers.append(rejecter)
+    try:
+        assert ip.run_cell(cell).success
+        rejecter.reject = True
+        res = ip.run_cell(cell)
+        assert isinstance(res.error_before_exec, InputRejected)
+    finally:
+        ip.ast_transformers.remove(rejecter)
+
+
+def test_phase_times():
+    results = []
+    ip.events.register("phase_times", results.append)
+    ip.record_phase_times = True
+    try:
+        res = ip.run_cell("pt_x = 1\npt_x", store_history=True)
+        silent = ip.run_cell("pt_y = 2", silent=True)
+    finally:
+        ip.record_phase_times = False
+        ip.events.unregister("phase_times", results.append)
+    assert results == [res, silent]
+    times = res.phase_times
+    for phase in ["transform_cell", "ast_parse", "compile", "run_code", "displayhook"]:
+        assert times[phase] >= 0
+    assert times["total"] >= sum(t for p, t in times.items() if p != "total")
+    assert all(start <= end for _, start, end in res.phase_timestamps)
+
+    res = ip.run_cell("pt_x = 2")
+    assert res.phase_times is None
+
+
+def test_deferred_post_run_cell():
+    results = []
+    ip.events.register("post_run_cell", results.append, deferred=True)
+    try:
+        first = ip.run_cell("dpr_x = 1")
+        assert results == []
+        # frontends run them once the output is shown, or before the next cell
+        second = ip.run_cell("dpr_x = 2")
+        assert results == [first]
+        ip.events.run_deferred()
+        assert results == [first, second]
+    finally:
+        ip.events.unregister("post_run_cell", results.append)
+
+
 def test_ast_transform_non_int_const(ast_negator_transform):
     with tt.AssertPrints("hello"):
         ip.run_cell('print("hello")')
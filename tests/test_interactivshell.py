@@ -3,16 +3,22 @@
 # Copyright (c) IPython Development Team.
 # Distributed under the terms of the Modified BSD License.
 
+import asyncio
 import sys
 import os
+from fnmatch import fnmatchcase
+from types import SimpleNamespace
 
 import pytest
 
 from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+from prompt_toolkit.buffer import Buffer
 
 
 from IPython.testing import tools as tt
 
+from IPython.terminal.interactiveshell import PtkHistoryAdapter
+
 from IPython.terminal.ptutils import _elide, _adjust_completion_text_based_on_context
 from IPython.terminal.shortcuts.auto_suggest import NavigableAutoSuggestFromHistory
 
@@ -27,6 +33,164 @@ def test_changing_provider():
     assert isinstance(ip.auto_suggest, NavigableAutoSuggestFromHistory)
 
 
+class _PagedHistory:
+    """Minimal stand-in for HistoryManager.get_tail_page, counting queries."""
+
+    def __init__(self, cells):
+        # (session, line, cell), oldest first
+        self.rows = [(1, i, cell) for i, cell in enumerate(cells, start=1)]
+        self.queries = 0
+
+    def get_tail_page(self, n, before=None):
+        self.queries += 1
+        rows = self.rows[::-1]
+        if before is not None:
+            rows = [r for r in rows if r[:2] < before]
+        return rows[:n]
+
+    def search(self, pattern, n=None, archived=True):
+        self.queries += 1
+        rows = [r for r in self.rows[::-1] if fnmatchcase(r[2], pattern)]
+        return rows[:n]
+
+
+def _make_adapter(cells, load_length=1000, page_size=3):
+    hm = _PagedHistory(cells)
+    shell = SimpleNamespace(history_manager=hm, history_load_length=load_length)
+    PtkHistoryAdapter.page_size, old = page_size, PtkHistoryAdapter.page_size
+    try:
+        return PtkHistoryAdapter(shell), hm
+    finally:
+        PtkHistoryAdapter.page_size = old
+
+
+async def _load_all(history):
+    return [cell async for cell in history.load()]
+
+
+def test_ptk_history_adapter_pages():
+    cells = ["a", "b", "b", "", "c", "d", "e", "f", "g"]
+    history, hm = _make_adapter(cells)
+    # only the first page is read up front
+    assert hm.queries == 1
+    assert list(history.get_strings()) == ["e", "f", "g"]
+
+    loaded = asyncio.run(_load_all(history))
+    assert loaded == ["g", "f", "e", "d", "c", "b", "a"]
+    assert list(history.get_strings()) == ["a", "b", "c", "d", "e", "f", "g"]
+
+    # once everything is loaded, the database is not queried again
+    queries = hm.queries
+    assert asyncio.run(_load_all(history)) == loaded
+    assert hm.queries == queries
+
+
+def test_ptk_history_adapter_append():
+    history, hm = _make_adapter(["a", "b"])
+    queries = hm.queries
+    strings = history.get_strings()
+    history.append_string("c")
+    history.append_string("c\n")
+    history.append_string("  ")
+    history.append_string("d")
+    assert hm.queries == queries
+    assert list(history.get_strings()) == ["a", "b", "c", "d"]
+    # a view of the loaded strings, not a copy
+    history.append_string("e")
+    assert strings[-1] == "e"
+
+
+def test_ptk_history_adapter_on_demand():
+    cells = [str(i) for i in range(10)]
+    history, hm = _make_adapter(cells)
+    buffer = Buffer(history=history)
+    history.connect(SimpleNamespace(default_buffer=buffer, search_buffer=Buffer()))
+
+    async def main():
+        buffer.load_history_if_not_yet_loaded()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        # only the first page is loaded
+        assert hm.queries == 1
+        assert list(buffer._working_lines) == ["7", "8", "9", ""]
+        buffer.history_backward(count=2)
+        await asyncio.sleep(0)
+        assert hm.queries == 1
+        # the next page is read once the oldest entry loaded is reached
+        buffer.history_backward()
+        assert buffer.text == "7"
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert hm.queries == 2
+        buffer.history_backward()
+        assert buffer.text == "6"
+        buffer.reset()
+
+    asyncio.run(main())
+
+
+def test_ptk_history_adapter_idle():
+    cells = [str(i) for i in range(10)]
+    history, hm = _make_adapter(cells)
+    history.page_size = 3
+    history.idle_delay = 0.2
+    buffer = Buffer(history=history)
+    history.connect(SimpleNamespace(default_buffer=buffer, search_buffer=Buffer()))
+
+    async def main():
+        buffer.load_history_if_not_yet_loaded()
+        # typing keeps the prompt busy
+        for text in "abc":
+            await asyncio.sleep(0.1)
+            buffer.insert_text(text)
+        assert hm.queries == 1
+        # the other pages are read once it is idle, e.g. for reverse search
+        await asyncio.sleep(0.5)
+        assert hm.queries == 4
+        assert list(buffer._working_lines)[:-1] == cells
+        buffer.reset()
+
+    asyncio.run(main())
+
+
+def test_ptk_history_adapter_search():
+    cells = ["x = 1", "y[0]", "a", "b", "c", "d", "e", "f", "g", "h"]
+    history, hm = _make_adapter(cells)
+    history.page_size = 2
+    buffer = Buffer(history=history)
+    search_buffer = Buffer()
+    history.connect(SimpleNamespace(default_buffer=buffer, search_buffer=search_buffer))
+
+    async def main():
+        buffer.load_history_if_not_yet_loaded()
+        await asyncio.sleep(0.1)
+        assert hm.queries == 1
+        # matches already loaded do not need the database
+        search_buffer.insert_text("f")
+        await asyncio.sleep(0.1)
+        assert hm.queries == 1
+        # the pages up to the most recent match are read
+        search_buffer.text = "y[0"
+        await asyncio.sleep(0.1)
+        assert "y[0]" in buffer._working_lines
+        assert "x = 1" not in buffer._working_lines
+        # and no more for entries which are not there
+        queries = hm.queries
+        search_buffer.text = "zzz"
+        await asyncio.sleep(0.1)
+        assert hm.queries == queries + 1
+        assert "x = 1" not in buffer._working_lines
+        buffer.reset()
+
+    asyncio.run(main())
+
+
+def test_ptk_history_adapter_load_length():
+    history, hm = _make_adapter([str(i) for i in range(20)], load_length=5)
+    assert list(history.load_history_strings()) == ["19", "18", "17", "16", "15"]
+    assert hm.queries == 2
+
+
 def test_elide():
     _elide("concatenate((a1, a2, ...), axis", "", min_elide=30)  # do not raise
     _elide("concatenate((a1, a2, ..), . axis", "", min_elide=30)  # do not raise
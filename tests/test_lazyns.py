@@ -0,0 +1,221 @@
+"""Tests for the names of the user namespace bound on first use."""
+
+import ast
+import sys
+
+import pytest
+
+from IPython.core.completer import provisionalcompleter
+from IPython.core.lazyns import (
+    LazyImport,
+    LazyStarImport,
+    _bound_names,
+    import_bindings,
+)
+
+
+@pytest.fixture
+def lazy_module(tmp_path, monkeypatch):
+    """A package which is not imported yet, and clean namespaces."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+    pkg = tmp_path / "zzz_lazy_pkg"
+    pkg.mkdir()
+    (pkg / "sub.py").write_text(
+        "zzz_one = 1\nzzz_two = 2\nzzz_three = 3\n_private = 0\n"
+    )
+    (pkg / "__init__.py").write_text("from .sub import zzz_one, zzz_two\n")
+    (pkg / "other.py").write_text("__all__ = ['zzz_two']\nzzz_two = 'other'\n")
+    before = set(ip.user_ns)
+    yield "zzz_lazy_pkg"
+    ip.lazy_ns.clear()
+    for name in set(ip.user_ns) - before:
+        del ip.user_ns[name]
+        ip.user_ns_hidden.pop(name, None)
+    for name in list(sys.modules):
+        if name.startswith("zzz_lazy_pkg"):
+            del sys.modules[name]
+
+
+@pytest.mark.parametrize(
+    "source, bindings",
+    [
+        (
+            '"""doc"""\nimport os.path\nimport numpy as np\n',
+            [("os", "os.path", None, True), ("np", "numpy", None, False)],
+        ),
+        (
+            "from os import path, sep as s\n",
+            [("path", "os", "path", False), ("s", "os", "sep", False)],
+        ),
+        ("from os import *\n", [(None, "os", None, False)]),
+        ("import os\nx = 1\n", None),
+        ("import os\nif True:\n    import sys\n", None),
+        ("from . import x\n", None),
+        ("from __future__ import annotations\n", None),
+    ],
+)
+def test_import_bindings(source, bindings):
+    result = import_bindings(source)
+    if bindings is None:
+        assert result is None
+        return
+    assert [
+        (
+            name,
+            b.module,
+            getattr(b, "attr", None),
+            getattr(b, "top", False),
+        )
+        for name, b in result
+    ] == bindings
+    assert all(
+        isinstance(b, LazyStarImport if name is None else LazyImport)
+        for name, b in result
+    )
+
+
+def test_lazy_imports(lazy_module):
+    lazy = ip.lazy_ns
+    lazy.add_source(
+        "import zzz_lazy_pkg.sub\n"
+        "import zzz_lazy_pkg as zzz_pkg\n"
+        "from zzz_lazy_pkg.sub import zzz_three\n"
+        "from zzz_lazy_pkg import other as zzz_other\n"
+        "import sys as zzz_sys\n"
+    )
+    # already imported, bound right away
+    assert ip.user_ns["zzz_sys"] is sys
+    assert set(lazy.names()) == {"zzz_lazy_pkg", "zzz_pkg", "zzz_three", "zzz_other"}
+    assert "zzz_three" in lazy
+    with pytest.raises(KeyError):
+        lazy.peek("zzz_three")
+
+    ip.run_cell("zzz_three = 'mine'")
+    ip.run_cell("def zzz_f(zzz_other):\n    return zzz_other\nzzz_x = 1")
+    assert "zzz_lazy_pkg" not in sys.modules
+
+    ip.run_cell("zzz_x = zzz_pkg.zzz_one + zzz_three.count('m')")
+    assert ip.user_ns["zzz_x"] == 2
+    assert "zzz_lazy_pkg" in sys.modules
+    assert "zzz_lazy_pkg.other" not in sys.modules
+    # the module is imported now
+    assert lazy.peek("zzz_lazy_pkg").sub.zzz_three == 3
+
+    ip.run_cell("zzz_x = zzz_lazy_pkg.sub.zzz_three, zzz_other.zzz_two")
+    assert ip.user_ns["zzz_x"] == (3, "other")
+    assert ip.user_ns["zzz_three"] == "mine"
+    assert "zzz_other" in ip.user_ns_hidden
+
+
+def test_lazy_star_imports(lazy_module):
+    lazy = ip.lazy_ns
+    lazy.add(None, LazyStarImport("zzz_lazy_pkg.sub"))
+    lazy.add(None, LazyStarImport("zzz_lazy_pkg.other"))
+    assert lazy.names() == []
+
+    # builtins and defined names do not import the modules
+    ip.run_cell("zzz_x = len('a')")
+    ip.run_cell("zzz_one = 'mine'\nzzz_x = zzz_one")
+    assert "zzz_lazy_pkg" not in sys.modules
+
+    ip.run_cell("zzz_x = zzz_two, zzz_three, zzz_one")
+    assert ip.user_ns["zzz_x"] == ("other", 3, "mine")
+    assert "_private" not in ip.user_ns
+    assert not lazy
+
+
+def test_lazy_names_shadowed(lazy_module):
+    lazy = ip.lazy_ns
+    lazy.add("zzz_pkg", LazyImport("zzz_lazy_pkg"))
+    lazy.add(None, LazyStarImport("zzz_lazy_pkg.sub"))
+    # the names bound by the user replace the lazy bindings, even once deleted
+    ip.run_cell("zzz_pkg = zzz_one = 5")
+    ip.run_cell("del zzz_pkg, zzz_one")
+    result = ip.run_cell("zzz_pkg")
+    assert isinstance(result.error_in_exec, NameError)
+    result = ip.run_cell("zzz_one")
+    assert isinstance(result.error_in_exec, NameError)
+    assert "zzz_pkg" not in lazy
+    # but not the names bound in functions
+    ip.run_cell("def zzz_f(zzz_two):\n    zzz_three = zzz_two\n")
+    ip.run_cell("zzz_x = zzz_two, zzz_three")
+    assert ip.user_ns["zzz_x"] == (2, 3)
+
+
+def test_lazy_names_cell_cache(lazy_module):
+    cell_cache = ip.compile.cell_cache
+    lazy = ip.lazy_ns
+    lazy.add("zzz_pkg", LazyImport("zzz_lazy_pkg"))
+    lazy.add("zzz_unused", LazyImport("zzz_lazy_pkg", "missing"))
+    cell = "zzz_x = zzz_pkg.zzz_two\n"
+    ip.run_cell(cell)
+    # the cached code of the cells is used while there are lazy names
+    del ip.user_ns["zzz_pkg"]
+    lazy.add("zzz_pkg", LazyImport("zzz_lazy_pkg.other"))
+    hits = cell_cache.hits
+    ip.run_cell(cell)
+    assert cell_cache.hits == hits + 1
+    # and still binds the ones they use
+    assert ip.user_ns["zzz_x"] == "other"
+    # or forgets the ones they bind
+    ip.run_cell("zzz_unused = 1")
+    lazy.add("zzz_unused", LazyImport("zzz_lazy_pkg", "missing"))
+    ip.run_cell("zzz_unused = 1")
+    assert cell_cache.hits == hits + 2
+    assert "zzz_unused" not in lazy
+
+
+@pytest.mark.parametrize(
+    "source, bound",
+    [
+        ("a = b\ndel c\nd += 1\nfor e in f: pass", {"a", "c", "d", "e"}),
+        (
+            "import g.h, i as j\nfrom k import l, m as n\nfrom k import *",
+            {"g", "j", "l", "n"},
+        ),
+        ("def o(p):\n    q = p\nclass r:\n    s = 1", {"o", "r"}),
+        ("def t():\n    global u\n    u = v = 1", {"t", "u"}),
+        ("w = lambda x: x\ny = [z for z in (aa := [1])]", {"w", "y", "aa"}),
+        ("try:\n    pass\nexcept E as bb:\n    pass", {"bb"}),
+        ("with cc as (dd, ee): pass", {"dd", "ee"}),
+    ],
+)
+def test_bound_names(source, bound):
+    assert _bound_names(ast.parse(source)) == bound
+
+
+def test_lazy_names_completion_and_who(lazy_module, monkeypatch):
+    lazy = ip.lazy_ns
+    lazy.add("zzz_hidden", LazyImport("zzz_lazy_pkg"))
+    lazy.add("zzz_visible", LazyImport("zzz_lazy_pkg", "sub", hidden=False))
+    monkeypatch.setattr(ip.Completer, "use_jedi", False)
+    with provisionalcompleter():
+        matches = ip.Completer.completions("zzz_", 4)
+        assert {"zzz_hidden", "zzz_visible"} <= {c.text for c in matches}
+        # attributes need the module
+        assert list(ip.Completer.completions("zzz_visible.", 12)) == []
+    assert "zzz_visible" in ip.run_line_magic("who_ls", "")
+    assert "zzz_hidden" not in ip.run_line_magic("who_ls", "")
+    ip.run_line_magic("whos", "")
+    assert "zzz_lazy_pkg" not in sys.modules
+
+    ip.run_cell("zzz_hidden")
+    with provisionalcompleter():
+        matches = ip.Completer.completions("zzz_visible.", 12)
+        assert ".zzz_three" in {c.text for c in matches}
+
+
+def test_lazy_names_reset(lazy_module):
+    ip.lazy_ns.add("zzz_pkg", LazyImport("zzz_lazy_pkg"))
+    ip.run_line_magic("reset", "-f")
+    assert not ip.lazy_ns
+    ip.run_cell("zzz_x = 'zzz_pkg' in globals()")
+    assert ip.user_ns["zzz_x"] is False
+
+
+def test_lazy_names_run_interactive(lazy_module, tmp_path):
+    ip.lazy_ns.add("zzz_pkg", LazyImport("zzz_lazy_pkg"))
+    script = tmp_path / "zzz_script.py"
+    script.write_text("zzz_x = zzz_pkg.zzz_two\n")
+    ip.run_line_magic("run", f"-i {script}")
+    assert ip.user_ns["zzz_x"] == 2
@@ -933,6 +933,45 @@ def test_timeit_quiet():
         _ip.run_cell("%timeit -n1 -r1 -q 1")
 
 
+def test_phasetimes():
+    _ip.phase_stats.clear()
+    with tt.AssertPrints("use %phasetimes on"):
+        _ip.run_line_magic("phasetimes", "")
+    _ip.run_line_magic("phasetimes", "on")
+    try:
+        assert _ip.record_phase_times
+        _ip.run_cell("1 + 1")
+        _ip.run_cell("2 + 2")
+    finally:
+        _ip.run_line_magic("phasetimes", "off")
+    assert not _ip.record_phase_times
+    with tt.AssertPrints("2 cells"):
+        _ip.run_line_magic("phasetimes", "-r")
+    assert _ip.phase_stats.cells == 0
+    with pytest.raises(UsageError):
+        _ip.run_line_magic("phasetimes", "maybe")
+
+
+def test_formatterstats():
+    stats = _ip.display_formatter.stats
+    stats.clear()
+    with tt.AssertPrints("use %formatterstats on"):
+        _ip.run_line_magic("formatterstats", "")
+    _ip.run_line_magic("formatterstats", "on")
+    try:
+        assert _ip.display_formatter.record_stats
+        _ip.display_formatter.format(1.5)
+        _ip.display_formatter.format(2.5)
+    finally:
+        _ip.run_line_magic("formatterstats", "off")
+    assert stats.calls[("text/plain", "float")][:2] == [2, 2]
+    with tt.AssertPrints("float"):
+        _ip.run_line_magic("formatterstats", "-n 5 -r")
+    assert not stats.calls
+    with pytest.raises(UsageError):
+        _ip.run_line_magic("formatterstats", "maybe")
+
+
 def test_timeit_return_quiet():
     with tt.AssertNotPrints("loops"):
         res = _ip.run_line_magic("timeit", "-n1 -r1 -q -o 1")
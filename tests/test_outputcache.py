@@ -0,0 +1,134 @@
+import sys
+
+import pytest
+
+from IPython.core.outputcache import OutputCache, estimate_size
+
+
+class Sized:
+    def __init__(self, size):
+        self.size = size
+
+    def __sizeof__(self):
+        return self.size
+
+
+def test_estimate_size_containers():
+    assert estimate_size(Sized(1000)) >= 1000
+    # the items count, not just the list
+    items = [Sized(1000) for _ in range(10)]
+    assert estimate_size(items) >= 10 * 1000
+    assert estimate_size({"a": Sized(1000)}) >= 1000
+    # large containers are estimated from a sample
+    big = [Sized(100)] * 10_000
+    assert estimate_size(big) >= 100 * 10_000
+    assert estimate_size([]) == sys.getsizeof([])
+
+
+def test_estimate_size_numpy():
+    np = pytest.importorskip("numpy")
+    a = np.zeros(1000, dtype=np.float64)
+    assert estimate_size(a) >= 8000
+    # a view counts its data too
+    assert estimate_size(a[:500]) >= 4000
+
+
+def test_evicts_least_recently_used():
+    cache = OutputCache()
+    cache.max_bytes = 3500
+    evicted = []
+    cache.on_evict = evicted.append
+    cache[1] = Sized(1000)
+    cache[2] = Sized(1000)
+    cache[3] = Sized(1000)
+    cache[1]  # used, so 2 goes first
+    cache[4] = Sized(1000)
+    assert evicted == [2]
+    assert sorted(cache) == [1, 3, 4]
+    assert 2 not in cache
+    assert cache.get(2) is None
+    with pytest.raises(KeyError):
+        cache[2]
+    assert 3000 <= cache.nbytes <= 3500
+
+
+def test_keeps_latest_entry():
+    cache = OutputCache()
+    cache.max_bytes = 100
+    cache[1] = Sized(1000)
+    cache[2] = Sized(1000)
+    assert list(cache) == [2]
+
+
+def test_spill_and_reload(tmp_path):
+    cache = OutputCache()
+    cache.max_bytes = 1500
+    cache.spill = True
+    cache[1] = list(range(100))
+    cache[2] = bytes(1000)
+    cache[3] = bytes(1000)
+    assert cache.spilled == [1, 2]
+    assert 1 in cache
+    # loaded back transparently, evicting another entry
+    assert cache[1] == list(range(100))
+    assert 1 not in cache.spilled
+    assert cache.get(2) == bytes(1000)
+    spill_dir = cache._spill_dir
+    assert spill_dir is not None and spill_dir.exists()
+    cache.clear()
+    assert cache.spilled == []
+    assert list(spill_dir.iterdir()) == []
+
+
+def test_unpicklable_entries_are_dropped():
+    cache = OutputCache()
+    cache.max_bytes = 1
+    cache.spill = True
+    cache[1] = lambda: None
+    cache[2] = 2
+    assert 1 not in cache
+    assert cache.spilled == []
+
+
+def test_dict_interface():
+    cache = OutputCache({1: "a"}, b=2)
+    assert cache == {1: "a", "b": 2}
+    assert cache.pop(1) == "a"
+    assert cache.pop(1, None) is None
+    del cache["b"]
+    assert cache == {}
+    assert cache.nbytes == 0
+
+
+def test_sizes_measured_with_a_limit(monkeypatch):
+    calls = []
+    monkeypatch.setattr(Sized, "__sizeof__", lambda self: calls.append(1) or self.size)
+    cache = OutputCache()
+    cache[1] = Sized(1000)
+    cache[2] = Sized(1000)
+    assert calls == []
+    assert cache.nbytes == 0
+    # setting a limit measures the entries already there
+    cache.max_bytes = 1500
+    assert cache.cull() == [1]
+    assert len(calls) == 2
+    assert 1000 <= cache.nbytes <= 1500
+    cache[3] = Sized(1000)
+    assert len(calls) == 3
+    assert list(cache) == [3]
+
+
+def test_del_spilled_entry_without_loading(monkeypatch):
+    import pickle
+
+    cache = OutputCache()
+    cache.max_bytes = 1500
+    cache.spill = True
+    cache[1] = bytes(1000)
+    cache[2] = bytes(1000)
+    assert cache.spilled == [1]
+    path = cache._spilled[1]
+    monkeypatch.setattr(pickle, "load", None)
+    del cache[1]
+    assert 1 not in cache
+    assert not path.exists()
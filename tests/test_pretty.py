@@ -609,3 +609,72 @@ def test_custom_repr():
     assert "OrderedCounter(OrderedDict" in pretty.pretty(oc)
 
     assert pretty.pretty(MySet()) == "mine"
+
+
+def test_printer_cache_sees_registrations():
+    class Point:
+        def __init__(self, x):
+            self.x = x
+
+        def __repr__(self):
+            return "Point(%r)" % self.x
+
+    def point_pprint(obj, p, cycle):
+        p.text("<%r>" % obj.x)
+
+    class Registering:
+        def _repr_pretty_(self, p, cycle):
+            p.type_pprinters[Point] = point_pprint
+            p.text("registered")
+
+    stream = StringIO()
+    printer = pretty.RepresentationPrinter(stream, max_width=200)
+    printer.deferred_pprinters[(__name__, "Point")] = lambda obj, p, cycle: p.text(
+        "deferred"
+    )
+    printer.pretty([Point(1), Point(2)])
+    printer.deferred_pprinters.clear()
+    printer.type_pprinters.pop(Point)
+    printer.pretty([Point(3), Registering(), Point(4)])
+    printer.flush()
+    assert stream.getvalue() == "[deferred, deferred][Point(3), registered, <4>]"
+
+
+def test_shared_objects_are_not_cycles():
+    shared = [1]
+    a = [shared, [shared, shared]]
+    a.append(a)
+    assert pretty.pretty(a) == "[[1], [[1], [1]], [...]]"
+
+
+def test_max_lines():
+    output = pretty.pretty(list(range(100000)), max_lines=3, max_seq_length=0)
+    assert output == "[0,\n 1,\n 2,\n..."
+    # not cut off if it fits
+    assert pretty.pretty(list(range(3)), max_lines=1) == "[0, 1, 2]"
+
+
+def test_max_chars():
+    class Counting:
+        printed = 0
+
+        def _repr_pretty_(self, p, cycle):
+            Counting.printed += 1
+            p.text("counting")
+
+    output = pretty.pretty([Counting() for _ in range(1000)], max_chars=30)
+    assert output == "[counting, counting, counting,..."
+    # containers stop once the budget is spent
+    assert Counting.printed < 10
+    assert pretty.pretty("x" * 100, max_chars=5) == "'xxxx..."
+
+
+def test_max_chars_sorts_shown_set_items_only():
+    output = pretty.pretty(set(range(10000, 0, -1)), max_chars=20, max_seq_length=0)
+    assert output == "{1, 2, 3, 4, 5, 6, 7..."
+
+
+def test_max_depth():
+    a = [[[[1]], 2], {"a": {"b": {}}}, MyList([MyList([])])]
+    assert pretty.pretty(a, max_depth=2) == "[[[...], 2], {'a': {...}}, MyList(MyList(...))]"
+    assert pretty.pretty(a, max_depth=0) == pretty.pretty(a)
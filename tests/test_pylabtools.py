@@ -180,6 +180,22 @@ def test_import_pylab():
     assert ns["np"] == np
 
 
+def test_import_pylab_lazy(monkeypatch):
+    from IPython.core.lazyns import LazyNamespace
+
+    monkeypatch.delitem(sys.modules, "matplotlib.pylab", raising=False)
+    monkeypatch.delattr(matplotlib, "pylab", raising=False)
+    lazy = LazyNamespace(get_ipython())
+    ns = {}
+    pt.import_pylab(ns, import_all=True, lazy_ns=lazy)
+    # numpy is already imported, but not matplotlib.pylab
+    assert ns["np"] is np
+    assert ns["sin"] is np.sin
+    assert "matplotlib.pylab" not in sys.modules
+    assert "pylab" in lazy.imports
+    assert [star.module for star in lazy.star_imports] == ["matplotlib.pylab"]
+
+
 @pytest.fixture
 def shell_pylab_fixture(hmmax3):
     import matplotlib
@@ -15,6 +15,7 @@
 # -----------------------------------------------------------------------------
 # Imports
 # -----------------------------------------------------------------------------
+import os
 import sys
 
 import pytest
@@ -141,3 +142,65 @@ def test_init_shell_not_implemented():
 
     with pytest.raises(NotImplementedError):
         InteractiveShellApp().init_shell()
+
+
+def test_startup_code_cache(tmp_path, monkeypatch):
+    from IPython.core.startupfiles import StartupCodeCache
+
+    monkeypatch.setattr(sys, "dont_write_bytecode", False)
+    fname = tmp_path / "startup.py"
+    fname.write_text("x = 1\n", encoding="utf-8")
+    cache = StartupCodeCache()
+    code = cache(fname.read_bytes(), fname, "exec")
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    cache = StartupCodeCache()
+    ns = {}
+    exec(cache(fname.read_bytes(), fname, "exec"), ns)
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert ns["x"] == 1
+    assert code.co_filename == str(fname)
+
+    fname.write_text("x = 22\n", encoding="utf-8")
+    exec(cache(fname.read_bytes(), fname, "exec"), ns)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert ns["x"] == 22
+
+
+def test_deferred_startup_files(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / "zzz_startup_mod.py").write_text("VALUE = 42\n")
+    monkeypatch.delitem(sys.modules, "zzz_startup_mod", raising=False)
+    app = TerminalIPythonApp()
+    app.shell = ip
+    imports = tmp_path / "00-imports.py"
+    imports.write_text(
+        "import zzz_startup_mod as zzz_mod\nimport os as zzz_os\n"
+        "from zzz_startup_mod import VALUE as zzz_value\n"
+    )
+    other = tmp_path / "01-other-imports.py"
+    other.write_text("import os as zzz_os2\nzzz_x = 1\n")
+    app.deferred_startup_files = ["*imports.py"]
+    app.exec_files = [str(imports), str(other)]
+    try:
+        ip.user_ns["zzz_value"] = "mine"
+        app._run_exec_files()
+        # only the file only importing modules is deferred, and the modules
+        # already imported are bound right away
+        assert ip.user_ns["zzz_x"] == 1
+        assert [name for name, _ in app.startup_times] == [str(other)]
+        assert ip.user_ns["zzz_os"] is os
+        assert "zzz_mod" not in ip.user_ns
+        assert "zzz_startup_mod" not in sys.modules
+
+        ip.run_cell("zzz_y = 2")
+        assert "zzz_mod" not in ip.user_ns
+        ip.run_cell("zzz_y = zzz_mod.VALUE + zzz_y")
+        assert ip.user_ns["zzz_y"] == 44
+        assert "zzz_mod" in ip.user_ns_hidden
+        assert ip.user_ns["zzz_value"] == "mine"
+    finally:
+        ip.lazy_ns.clear()
+        for name in ("zzz_mod", "zzz_os", "zzz_os2", "zzz_value", "zzz_x", "zzz_y"):
+            ip.user_ns.pop(name, None)
+            ip.user_ns_hidden.pop(name, None)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Measure the per-cell cost of history writes with concurrent IPython processes.
+
+Several worker processes share one history database, as IPython sessions
+started from the same profile do. Each worker runs the same trivial cells,
+first without storing history, to get a baseline, then storing history, and
+reports how much longer the cells took on average. The time taken by the
+final write out of each session is reported separately, because with the
+history saving thread most of the database work happens off the main thread.
+
+Each configuration is run against a fresh database::
+
+    python tools/benchmark_history_writes.py
+    python tools/benchmark_history_writes.py -p 10 -n 500
+
+Extra ``--HistoryManager.*`` options can be given after ``--`` to benchmark
+another configuration, in addition to the builtin ones::
+
+    python tools/benchmark_history_writes.py -- --HistoryManager.db_cache_size=20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CONFIGURATIONS = {
+    "default": [],
+    "wal": [
+        "--HistoryManager.journal_mode=WAL",
+        "--HistoryManager.synchronous=NORMAL",
+    ],
+    "wal+batched": [
+        "--HistoryManager.journal_mode=WAL",
+        "--HistoryManager.synchronous=NORMAL",
+        "--HistoryManager.db_cache_size=20",
+        "--HistoryManager.db_flush_interval=1",
+    ],
+}
+
+
+def worker(hist_file: str, n_cells: int, start_at: float, options: list[str]) -> None:
+    """Run in a subprocess: time n_cells cells with and without history."""
+    from traitlets.config.loader import KVArgParseConfigLoader
+
+    from IPython.core.interactiveshell import InteractiveShell
+
+    config = KVArgParseConfigLoader(options).load_config()
+    config.HistoryManager.hist_file = hist_file
+    shell = InteractiveShell.instance(config=config)
+
+    # start all the workers at once, so that they contend for the database
+    time.sleep(max(0, start_at - time.time()))
+
+    timings = {}
+    for store_history in (False, True):
+        t0 = time.perf_counter()
+        for i in range(n_cells):
+            shell.run_cell("x = %d" % i, store_history=store_history)
+        timings[store_history] = (time.perf_counter() - t0) / n_cells
+    t0 = time.perf_counter()
+    shell.history_manager.end_session()
+    flush = time.perf_counter() - t0
+    print(json.dumps({"overhead": timings[True] - timings[False], "flush": flush}))
+
+
+def run(n_procs: int, n_cells: int, options: list[str]) -> list[dict[str, float]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        hist_file = str(Path(tmp) / "history.sqlite")
+        start_at = time.time() + 2
+        procs = [
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    __file__,
+                    "--worker",
+                    hist_file,
+                    str(n_cells),
+                    str(start_at),
+                    "--",
+                    *options,
+                ],
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            for _ in range(n_procs)
+        ]
+        return [json.loads(p.communicate()[0].splitlines()[-1]) for p in procs]
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        hist_file, n_cells, start_at = sys.argv[2:5]
+        worker(hist_file, int(n_cells), float(start_at), sys.argv[6:])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-p", "--processes", type=int, default=10)
+    parser.add_argument("-n", "--cells", type=int, default=200)
+    parser.add_argument("options", nargs="*", help="extra HistoryManager options")
+    args = parser.parse_args()
+
+    configurations = dict(CONFIGURATIONS)
+    if args.options:
+        configurations["custom"] = args.options
+
+    print(
+        f"{args.processes} processes, {args.cells} cells each\n"
+        f"{'configuration':<15}{'overhead/cell (median)':>24}{'(max)':>10}"
+        f"{'final flush (max)':>20}"
+    )
+    for name, options in configurations.items():
+        results = run(args.processes, args.cells, options)
+        overheads = [r["overhead"] * 1e6 for r in results]
+        flush = max(r["flush"] for r in results) * 1e3
+        print(
+            f"{name:<15}{statistics.median(overheads):>21.0f} us"
+            f"{max(overheads):>7.0f} us{flush:>17.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Measure how long pretty printing nested containers and records takes.
+
+``IPython.lib.pretty.pretty`` is timed on nested lists and dicts, on deeply
+nested lists, and on lists of records with many fields, against the previous implementation of
+``RepresentationPrinter.pretty``, which walked the MRO of the class of every
+object printed and looked for cycles in a list::
+
+    python tools/benchmark_pretty.py
+    python tools/benchmark_pretty.py -n 5000 -d 10 -f 50 -r 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from io import StringIO
+
+
+def nested(n: int, depth: int) -> list:
+    """n leaves, in lists and dicts nested depth deep."""
+    leaves = [(i, "s%d" % i, i / 3, None) for i in range(n)]
+    obj: list = leaves
+    for level in range(depth):
+        obj = [{"level": level, "items": obj[i::2]} for i in range(2)]
+    return obj
+
+
+def deep(n: int, depth: int) -> list:
+    """Lists of n leaves nested depth deep, where cycle detection is slow."""
+    obj: list = list(range(n))
+    for _ in range(depth):
+        obj = [obj]
+    return obj
+
+
+def records(n: int, n_fields: int) -> list:
+    """n records with n_fields fields, printed with their _repr_pretty_.
+
+    The fields are of types which are not registered, and whose printer is
+    found further down their MRO.
+    """
+    import datetime
+    import enum
+    import fractions
+    import pathlib
+
+    from IPython.lib.pretty import CallExpression
+
+    class Color(enum.IntEnum):
+        RED = 1
+
+    values = [
+        Color.RED,
+        pathlib.PurePosixPath("/tmp"),
+        fractions.Fraction(1, 3),
+        datetime.date(2000, 1, 1),
+        KeyError("key"),
+        True,
+    ]
+
+    class Record:
+        def __init__(self, i):
+            for f in range(n_fields):
+                setattr(self, "field%d" % f, values[(i + f) % len(values)])
+
+        def _repr_pretty_(self, p, cycle):
+            ctor = CallExpression.factory("Record")
+            p.pretty(ctor(**vars(self)))
+
+    return [Record(i) for i in range(n)]
+
+
+def previous_printer():
+    from IPython.lib import pretty
+
+    class PreviousPrinter(pretty.RepresentationPrinter):
+        def pretty(self, obj):
+            obj_id = id(obj)
+            cycle = obj_id in self.stack
+            self.stack.append(obj_id)
+            self.begin_group()
+            try:
+                obj_class = pretty._safe_getattr(obj, "__class__", None) or type(obj)
+                try:
+                    printer = self.singleton_pprinters[obj_id]
+                except (TypeError, KeyError):
+                    pass
+                else:
+                    return printer(obj, self, cycle)
+                for cls in pretty._get_mro(obj_class):
+                    if cls in self.type_pprinters:
+                        return self.type_pprinters[cls](obj, self, cycle)
+                    printer = self._in_deferred_types(cls)
+                    if printer is not None:
+                        return printer(obj, self, cycle)
+                    if "_repr_pretty_" in cls.__dict__:
+                        meth = cls._repr_pretty_
+                        if callable(meth):
+                            return meth(obj, self, cycle)
+                    if (
+                        cls is not object
+                        and "__repr__" in cls.__dict__
+                        and callable(pretty._safe_getattr(cls, "__repr__", None))
+                    ):
+                        return pretty._repr_pprint(obj, self, cycle)
+                return pretty._default_pprint(obj, self, cycle)
+            finally:
+                self.end_group()
+                self.stack.pop()
+
+    return PreviousPrinter
+
+
+def make_pretty(printer_class):
+    def pretty(obj):
+        stream = StringIO()
+        printer = printer_class(stream, max_seq_length=0)
+        printer.pretty(obj)
+        printer.flush()
+        return stream.getvalue()
+
+    return pretty
+
+
+def time_pretty(pretty, obj, repeat: int) -> float:
+    """Best time to pretty print obj, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        pretty(obj)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--items", type=int, default=2000)
+    parser.add_argument("-d", "--depth", type=int, default=6, help="nesting depth")
+    parser.add_argument(
+        "--deep", type=int, default=150, help="nesting depth of the deep lists"
+    )
+    parser.add_argument(
+        "-f", "--fields", type=int, default=20, help="number of fields per record"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from IPython.lib.pretty import RepresentationPrinter
+
+    current = make_pretty(RepresentationPrinter)
+    previous = make_pretty(previous_printer())
+    cases = [
+        ("nested", nested(args.items, args.depth)),
+        ("deep", deep(args.items, args.deep)),
+        ("records", records(args.items, args.fields)),
+    ]
+
+    print(f"{'case':>8}{'previous':>14}{'current':>14}{'speedup':>10}")
+    for name, obj in cases:
+        assert current(obj) == previous(obj)
+        before = time_pretty(previous, obj, args.repeat)
+        after = time_pretty(current, obj, args.repeat)
+        print(
+            f"{name:>8}{before * 1e3:>11.1f} ms{after * 1e3:>11.1f} ms"
+            f"{before / after:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
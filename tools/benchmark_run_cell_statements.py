@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Measure how long cells with many top-level statements take to run.
+
+Each cell is made of simple assignments, as in generated code or in a script
+pasted into the shell, and is run with ``InteractiveShell.batch_statements``
+on and off::
+
+    python tools/benchmark_run_cell_statements.py
+    python tools/benchmark_run_cell_statements.py -n 10 1000 50000 -r 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+
+def make_cell(n_statements: int) -> str:
+    return "".join("x%d = %d + 1\n" % (i % 100, i) for i in range(n_statements))
+
+
+def time_cell(shell, cell: str, repeat: int) -> float:
+    """Best time to run cell, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = shell.run_cell(cell, store_history=False)
+        best = min(best, time.perf_counter() - t0)
+        result.raise_error()
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-n",
+        "--statements",
+        type=int,
+        nargs="+",
+        default=[10, 1000, 50000],
+        help="number of statements per cell",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from IPython.core.interactiveshell import InteractiveShell
+
+    shell = InteractiveShell.instance()
+    print(f"{'statements':>10}{'one by one':>14}{'batched':>14}{'speedup':>10}")
+    for n in args.statements:
+        cell = make_cell(n)
+        timings = {}
+        for batch in (False, True):
+            shell.batch_statements = batch
+            timings[batch] = time_cell(shell, cell, args.repeat)
+        print(
+            f"{n:>10}{timings[False] * 1e3:>11.2f} ms{timings[True] * 1e3:>11.2f} ms"
+            f"{timings[False] / timings[True]:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Measure how long the input transformations of large cells take.
+
+``TransformerManager.transform_cell`` is timed on cells of plain Python, and
+on cells with a magic every few lines, against the previous implementation of
+the token transforms, which tokenized the whole cell again after each
+transformation::
+
+    python tools/benchmark_transform_cell.py
+    python tools/benchmark_transform_cell.py -n 2000 -m 0 20 1000 -r 1
+
+The previous implementation gives up after 500 transformations, so cells with
+more magics than that are only timed with the current one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+
+def make_cell(n_lines: int, n_magics: int) -> str:
+    lines = []
+    every = n_lines // n_magics if n_magics else 0
+    for i in range(n_lines):
+        if every and i % every == 0:
+            lines.append("%%time x%d = %d\n" % (i % 100, i))
+        else:
+            lines.append("x%d = '%%d' %% %d\n" % (i % 100, i))
+    return "".join(lines)
+
+
+def time_transform(transform, cell: str, repeat: int) -> float:
+    """Best time to transform cell, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        transform(cell)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--lines", type=int, default=10000)
+    parser.add_argument(
+        "-m",
+        "--magics",
+        type=int,
+        nargs="+",
+        default=[0, 1, 20, 100],
+        help="number of magics per cell",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from IPython.core.inputtransformer2 import TRANSFORM_LOOP_LIMIT, TransformerManager
+
+    manager = TransformerManager()
+    previous = TransformerManager()
+    previous.do_token_transforms = previous._do_token_transforms_loop
+
+    print(f"{args.lines} lines per cell")
+    print(f"{'magics':>8}{'previous':>14}{'current':>14}{'speedup':>10}")
+    for n_magics in args.magics:
+        cell = make_cell(args.lines, n_magics)
+        current = time_transform(manager.transform_cell, cell, args.repeat)
+        if n_magics < TRANSFORM_LOOP_LIMIT:
+            assert manager.transform_cell(cell) == previous.transform_cell(cell)
+            before = time_transform(previous.transform_cell, cell, args.repeat)
+            print(
+                f"{n_magics:>8}{before * 1e3:>11.1f} ms{current * 1e3:>11.1f} ms"
+                f"{before / current:>9.1f}x"
+            )
+        else:
+            print(f"{n_magics:>8}{'-':>14}{current * 1e3:>11.1f} ms")
+
+
+if __name__ == "__main__":
+    main()